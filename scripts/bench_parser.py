@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Any, Callable
+
+import fitz
+import pdfplumber
+
+from aca_sbc.parse import (
+    ENGINE_CHOICES,
+    ParsedBenefits,
+    _extract_ded_oop_from_tables,
+    _extract_iop_outpatient_from_tables,
+    _extract_tables,
+    _locate_pages,
+    engines_for,
+    extract_document,
+    parse_extraction,
+    parse_pdf,
+)
+from aca_sbc.timing import recording
+from synthetic_sbc import LAYOUTS, SyntheticDoc, generate_corpus
+
+FIELDS = [f.name for f in fields(ParsedBenefits)]
+
+
+def _rate(seconds: float, docs: int, pages: int) -> dict[str, float | None]:
+    return {
+        "seconds": seconds,
+        "docs_per_sec": docs / seconds if seconds > 0 else None,
+        "ms_per_page": seconds * 1000 / pages if pages else None,
+        "ms_per_doc": seconds * 1000 / docs if docs else None,
+    }
+
+
+def _time_each(docs: list[SyntheticDoc], fn: Callable[[SyntheticDoc], Any], repeat: int = 1) -> tuple[float, list[float], list[Any]]:
+    per_doc = []
+    results = []
+    for doc in docs:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = fn(doc)
+        per_doc.append((time.perf_counter() - start) / repeat)
+        results.append(result)
+    return sum(per_doc), per_doc, results
+
+
+def _extract_tables_only(doc: SyntheticDoc) -> list:
+    # Same page targeting as the pdfplumber engine, minus the text pass.
+    pages = _locate_pages(str(doc.path))
+    with pdfplumber.open(str(doc.path)) as pdf:
+        return _extract_tables(pdf, pages)
+
+
+def _accuracy(docs: list[SyntheticDoc], parsed: list[ParsedBenefits], sample_limit: int) -> dict[str, Any]:
+    per_field = {name: {"correct": 0, "total": 0} for name in FIELDS}
+    per_layout = {layout: {"correct": 0, "total": 0} for layout in LAYOUTS}
+    mismatches = []
+    for doc, result in zip(docs, parsed):
+        values = asdict(result)
+        for name in FIELDS:
+            ok = values[name] == doc.expected.get(name)
+            for bucket in (per_field[name], per_layout[doc.layout]):
+                bucket["total"] += 1
+                bucket["correct"] += ok
+            if not ok and len(mismatches) < sample_limit:
+                mismatches.append({"doc": doc.name, "layout": doc.layout, "field": name, "expected": doc.expected.get(name), "got": values[name]})
+    for bucket in (*per_field.values(), *per_layout.values()):
+        bucket["accuracy"] = bucket["correct"] / bucket["total"] if bucket["total"] else None
+    correct = sum(b["correct"] for b in per_field.values())
+    total = sum(b["total"] for b in per_field.values())
+    return {
+        "overall": correct / total if total else None,
+        "fields": per_field,
+        "layouts": per_layout,
+        "mismatches": mismatches,
+    }
+
+
+def run_bench(docs: list[SyntheticDoc], engine: str, rule_repeat: int, sample_limit: int = 50) -> dict[str, Any]:
+    n = len(docs)
+    pages = sum(doc.pages for doc in docs)
+    # Warm imports and font caches so the first document does not skew the timings.
+    parse_pdf(str(docs[0].path), engine)
+
+    stage_totals: dict[str, float] = {}
+
+    def parse_recorded(doc: SyntheticDoc) -> ParsedBenefits:
+        with recording() as timing:
+            parsed = parse_pdf(str(doc.path), engine)
+        for name, seconds in timing.stages.items():
+            stage_totals[name] = stage_totals.get(name, 0.0) + seconds
+        return parsed
+
+    parse_seconds, parse_per_doc, parsed = _time_each(docs, parse_recorded)
+    tables_seconds, _, _ = _time_each(docs, _extract_tables_only)
+
+    # The rules run over the selected engine's tables (auto: PyMuPDF's, which every
+    # document gets; pdfplumber only fills blanks).
+    rules_engine = engines_for(engine)[0]
+    extractions = [extract_document(str(doc.path), rules_engine) for doc in docs]
+    by_doc = dict(zip((doc.name for doc in docs), extractions))
+    ded_oop_seconds, _, _ = _time_each(docs, lambda doc: _extract_ded_oop_from_tables(by_doc[doc.name].tables), rule_repeat)
+    iop_seconds, _, _ = _time_each(docs, lambda doc: _extract_iop_outpatient_from_tables(by_doc[doc.name].tables), rule_repeat)
+    rules_seconds, _, _ = _time_each(docs, lambda doc: parse_extraction(by_doc[doc.name]), rule_repeat)
+
+    return {
+        "timings": {
+            "parse_pdf": {**_rate(parse_seconds, n, pages), "p50_ms": statistics.median(parse_per_doc) * 1000, "max_ms": max(parse_per_doc) * 1000},
+            "extract_tables": _rate(tables_seconds, n, pages),
+            "rules.ded_oop": _rate(ded_oop_seconds, n, pages),
+            "rules.iop_outpatient": _rate(iop_seconds, n, pages),
+            "rules.parse_extraction": _rate(rules_seconds, n, pages),
+        },
+        "parse_pdf_stages": {name: _rate(seconds, n, pages) for name, seconds in sorted(stage_totals.items())},
+        "accuracy": _accuracy(docs, parsed, sample_limit),
+    }
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any], max_slowdown: float) -> list[str]:
+    # Regressions against an earlier bench JSON: any field or layout losing accuracy,
+    # or any timed section whose docs/sec fell by more than max_slowdown.
+    problems = []
+    old_acc, new_acc = baseline.get("accuracy", {}), report["accuracy"]
+    for group in ("fields", "layouts"):
+        for name, stats in new_acc[group].items():
+            before = old_acc.get(group, {}).get(name, {}).get("accuracy")
+            if before is not None and stats["accuracy"] is not None and stats["accuracy"] < before:
+                problems.append(f"accuracy {group[:-1]} {name}: {before:.2%} -> {stats['accuracy']:.2%}")
+    for name, stats in report["timings"].items():
+        before = baseline.get("timings", {}).get(name, {}).get("docs_per_sec")
+        after = stats["docs_per_sec"]
+        if before and after and after < before * (1 - max_slowdown):
+            problems.append(f"throughput {name}: {before:.1f} -> {after:.1f} docs/sec ({after / before - 1:+.0%})")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark parser throughput and accuracy on a synthetic SBC corpus.")
+    parser.add_argument("--docs", type=int, default=60, help="Number of synthetic PDFs to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus RNG seed (same seed, same corpus)")
+    parser.add_argument("--engine", choices=ENGINE_CHOICES, default="pdfplumber", help="Engine used for the parse_pdf and rule timings")
+    parser.add_argument("--corpus-dir", default=None, help="Write the corpus here instead of a temp dir")
+    parser.add_argument("--rule-repeat", type=int, default=20, help="Repeat each rule call N times for stable timings")
+    parser.add_argument("--min-accuracy", type=float, default=1.0, help="Fail when overall field accuracy is below this")
+    parser.add_argument("--baseline", default=None, help="Earlier bench JSON to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=0.15, help="Allowed docs/sec drop vs --baseline before failing")
+    parser.add_argument("--json-out", default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="sbc_bench_") as tmp:
+        corpus_dir = Path(args.corpus_dir) if args.corpus_dir else Path(tmp)
+        docs = generate_corpus(corpus_dir, max(1, args.docs), seed=args.seed)
+        report = run_bench(docs, args.engine, max(1, args.rule_repeat))
+
+    report["config"] = {"docs": len(docs), "pages": sum(doc.pages for doc in docs), "seed": args.seed, "engine": args.engine, "rules_engine": engines_for(args.engine)[0], "layouts": list(LAYOUTS)}
+    report["environment"] = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "pdfplumber": pdfplumber.__version__,
+        "pymupdf": fitz.VersionBind,
+    }
+
+    for name, stats in report["timings"].items():
+        print(f"{name}: {stats['docs_per_sec']:.1f} docs/sec {stats['ms_per_page']:.3f} ms/page")
+    accuracy = report["accuracy"]
+    print(f"accuracy={accuracy['overall']:.2%}")
+    for layout, stats in accuracy["layouts"].items():
+        print(f"  {layout}: {stats['accuracy']:.2%}")
+    for miss in accuracy["mismatches"][:10]:
+        print(f"  miss {miss['doc']} {miss['field']}: expected={miss['expected']!r} got={miss['got']!r}")
+
+    problems = []
+    if accuracy["overall"] < args.min_accuracy:
+        problems.append(f"accuracy {accuracy['overall']:.2%} below --min-accuracy {args.min_accuracy:.2%}")
+    if args.baseline:
+        problems.extend(compare(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.max_slowdown))
+    report["regressions"] = problems
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+
+    if args.json_out:
+        out_path = Path(args.json_out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
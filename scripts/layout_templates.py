@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+from aca_sbc.layouts import layout_fingerprint, load_templates, save_templates
+from aca_sbc.parse import ENGINE_CHOICES, _scan_tables, _scan_template, derive_template, extract_document
+
+VALUES = ("deductible", "oop", "inn_coi", "inn_cop", "oon_coi", "oon_cop")
+
+
+def _values(found) -> tuple:
+    return tuple(getattr(found, name) for name in VALUES)
+
+
+def cluster_pdfs(pdfs: list[Path], engine: str, sample: int) -> dict[str, dict]:
+    # Fingerprint every PDF; keep the tables of up to `sample` members per cluster for
+    # deriving and checking its template.
+    clusters: dict[str, dict] = {}
+    for path in pdfs:
+        try:
+            extraction = extract_document(str(path), engine)
+        except Exception:
+            continue
+        fingerprint = layout_fingerprint(extraction.tables, engine)
+        cluster = clusters.setdefault(fingerprint, {"docs": 0, "examples": [], "tables": []})
+        cluster["docs"] += 1
+        if len(cluster["tables"]) < sample:
+            cluster["examples"].append(str(path))
+            cluster["tables"].append(extraction.tables)
+    return clusters
+
+
+def check_template(template, members: list[list]) -> int:
+    # Members where the fast path declines or disagrees with the generic scan.
+    failures = 0
+    for tables in members:
+        fast = _scan_template(tables, template)
+        if fast is None or _values(fast) != _values(_scan_tables(tables)):
+            failures += 1
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cluster SBC PDFs by layout fingerprint and register fast-path templates.")
+    parser.add_argument("--pdf-dir", required=True, help="Directory of SBC PDFs, e.g. the --cache-dir blobs (searched recursively)")
+    parser.add_argument("--engine", choices=[e for e in ENGINE_CHOICES if e != "auto"], default="pdfplumber", help="Extraction engine the templates are for")
+    parser.add_argument("--min-docs", type=int, default=5, help="Only register layouts shared by at least N PDFs")
+    parser.add_argument("--sample", type=int, default=25, help="Members per cluster used to derive and parity-check a template")
+    parser.add_argument("--templates", required=True, help="Template registry JSON to create or update (runs load it with --layout-templates)")
+    parser.add_argument("--dry-run", action="store_true", help="Report clusters without writing the registry")
+    parser.add_argument("--json-out", default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    templates_path = Path(args.templates)
+    templates = load_templates(templates_path) if templates_path.exists() else {}
+    clusters = cluster_pdfs(sorted(Path(args.pdf_dir).rglob("*.pdf")), args.engine, max(1, args.sample))
+
+    report = []
+    for fingerprint, cluster in sorted(clusters.items(), key=lambda item: item[1]["docs"], reverse=True):
+        entry = {"layout": fingerprint, "docs": cluster["docs"], "example": cluster["examples"][0]}
+        if fingerprint in templates:
+            entry["status"] = "registered"
+            entry["failures"] = check_template(templates[fingerprint], cluster["tables"])
+        elif cluster["docs"] < args.min_docs:
+            entry["status"] = "too_few"
+        else:
+            template = derive_template(cluster["tables"][0], f"{args.engine}-{fingerprint[:8]}")
+            if template is None:
+                entry["status"] = "fields_missing"
+            else:
+                entry["failures"] = check_template(template, cluster["tables"])
+                # Only layouts where the fast path matches the generic scan on every
+                # sampled member are registered.
+                entry["status"] = "mismatch" if entry["failures"] else "added"
+                if not entry["failures"]:
+                    templates[fingerprint] = template
+        report.append(entry)
+
+    added = sum(entry["status"] == "added" for entry in report)
+    covered = sum(entry["docs"] for entry in report if entry["status"] in ("added", "registered"))
+    total = sum(entry["docs"] for entry in report)
+    print(f"documents={total} layouts={len(report)} added={added} covered_docs={covered}")
+    for entry in report[:20]:
+        print(f"  {entry['layout']} docs={entry['docs']} {entry['status']} failures={entry.get('failures', '-')} e.g. {entry['example']}")
+    if added and not args.dry_run:
+        save_templates(templates, templates_path)
+        print(f"wrote {len(templates)} templates to {templates_path}")
+
+    if args.json_out:
+        out_path = Path(args.json_out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps({"documents": total, "covered_documents": covered, "layouts": report}, indent=2), encoding="utf-8")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from dataclasses import asdict, fields
+from pathlib import Path
+
+from aca_sbc.parse import ParsedBenefits, extract_document, parse_extraction
+
+ENGINES = ("pdfplumber", "pymupdf")
+FIELDS = [f.name for f in fields(ParsedBenefits)]
+
+
+def _parse_timed(path: Path, engine: str) -> tuple[dict | None, float, str | None]:
+    start = time.perf_counter()
+    try:
+        parsed = parse_extraction(extract_document(str(path), engine))
+    except Exception as exc:
+        return None, time.perf_counter() - start, str(exc)
+    return asdict(parsed), time.perf_counter() - start, None
+
+
+def build_report(pdfs: list[Path], sample_limit: int = 50) -> dict:
+    per_field = {name: {"agree": 0, "both_blank": 0, "pdfplumber_only": 0, "pymupdf_only": 0, "differ": 0} for name in FIELDS}
+    seconds = {engine: 0.0 for engine in ENGINES}
+    errors = {engine: 0 for engine in ENGINES}
+    mismatches = []
+    compared = 0
+
+    for path in pdfs:
+        results = {}
+        for engine in ENGINES:
+            values, elapsed, error = _parse_timed(path, engine)
+            seconds[engine] += elapsed
+            if error:
+                errors[engine] += 1
+            results[engine] = values
+        if results["pdfplumber"] is None or results["pymupdf"] is None:
+            continue
+        compared += 1
+        for name in FIELDS:
+            a = results["pdfplumber"][name]
+            b = results["pymupdf"][name]
+            stats = per_field[name]
+            if a == b:
+                stats["both_blank" if a is None else "agree"] += 1
+            elif b is None:
+                stats["pdfplumber_only"] += 1
+            elif a is None:
+                stats["pymupdf_only"] += 1
+            else:
+                stats["differ"] += 1
+            if a != b and len(mismatches) < sample_limit:
+                mismatches.append({"pdf": str(path), "field": name, "pdfplumber": a, "pymupdf": b})
+
+    for stats in per_field.values():
+        stats["agreement_rate"] = (stats["agree"] + stats["both_blank"]) / compared if compared else None
+
+    return {
+        "documents": len(pdfs),
+        "compared": compared,
+        "errors": errors,
+        "seconds_per_doc": {engine: (seconds[engine] / len(pdfs) if pdfs else None) for engine in ENGINES},
+        "fields": per_field,
+        "mismatch_samples": mismatches,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare pdfplumber and PyMuPDF extraction field-by-field on a PDF sample.")
+    parser.add_argument("--pdf-dir", required=True, help="Directory of SBC PDFs (searched recursively)")
+    parser.add_argument("--limit", type=int, default=None, help="Only compare the first N PDFs (sorted by path)")
+    parser.add_argument("--json-out", default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    pdfs = sorted(Path(args.pdf_dir).rglob("*.pdf"))
+    if args.limit is not None:
+        pdfs = pdfs[: args.limit]
+    report = build_report(pdfs)
+
+    print(f"documents={report['documents']} compared={report['compared']}")
+    for engine in ENGINES:
+        per_doc = report["seconds_per_doc"][engine]
+        print(f"{engine}: errors={report['errors'][engine]} sec_per_doc={per_doc:.3f}" if per_doc is not None else f"{engine}: no documents")
+    for name, stats in report["fields"].items():
+        rate = stats["agreement_rate"]
+        print(
+            f"{name}: agreement={rate:.2%} pdfplumber_only={stats['pdfplumber_only']} "
+            f"pymupdf_only={stats['pymupdf_only']} differ={stats['differ']}"
+            if rate is not None
+            else f"{name}: n/a"
+        )
+
+    if args.json_out:
+        out_path = Path(args.json_out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
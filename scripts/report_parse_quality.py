@@ -2,10 +2,15 @@ from __future__ import annotations
 
 import argparse
 import json
+from itertools import zip_longest
 from pathlib import Path
+from typing import Iterable, Iterator
 
+import numpy as np
 import pandas as pd
 
+from aca_sbc.normalize import Flag, typed_frame
+
 KEY_FIELDS = [
     "INN DED",
     "INN OOP",
@@ -18,6 +23,31 @@ KEY_FIELDS = [
 ]
 
 
+# Which typed column each field is judged on, and its plausible range (dollars or
+# percent). Values outside the range are counted, not dropped.
+FIELD_UNITS = {
+    "DED": ("cents", 0, 50_000),
+    "OOP": ("cents", 0, 50_000),
+    "COP": ("cents", 0, 5_000),
+    "COI": ("pct", 0, 100),
+}
+# (name, left field, right field): rows where left < right are flagged.
+CONSISTENCY_CHECKS = [
+    ("oon_ded_below_inn_ded", "OON DED", "INN DED"),
+    ("oon_oop_below_inn_oop", "OON OOP", "INN OOP"),
+    ("inn_oop_below_inn_ded", "INN OOP", "INN DED"),
+    ("oon_oop_below_oon_ded", "OON OOP", "OON DED"),
+    ("oon_coi_below_inn_coi", "OON COI", "INN COI"),
+]
+SAMPLE_ROWS = 20
+# Diff mode: rows are matched on STATE + PAYER NAME/PLAN + row index and compared a
+# chunk at a time, so memory depends on the chunk size, not the output size.
+ROW_KEY = ["STATE", "PAYER NAME/PLAN"]
+DIFF_CHUNK_ROWS = 100_000
+REGRESSED_SAMPLE = 1000
+REGRESSED_COLUMNS = ["row", *ROW_KEY, "field", "before", "after"]
+
+
 def _blank_rate(series: pd.Series) -> float:
     text = series.fillna("").astype(str).str.strip()
     if len(text) == 0:
@@ -26,35 +56,285 @@ def _blank_rate(series: pd.Series) -> float:
     return float(blanks) / float(len(text))
 
 
-def build_report(df: pd.DataFrame) -> dict:
+def _profile_summary(profile: dict) -> dict:
+    # Throughput view of the <output>.profile.json sidecar written by aca_sbc.cli.
+    return {
+        "rows": profile.get("rows"),
+        "documents_timed": profile.get("documents_timed"),
+        "wall_seconds": profile.get("wall_seconds"),
+        "rows_per_second": profile.get("rows_per_second"),
+        "document_seconds": profile.get("document_seconds"),
+        "download_seconds": profile.get("download_seconds"),
+        "stages": profile.get("stages", {}),
+        "pages": profile.get("pages"),
+        "slowest": profile.get("slowest", [])[:10],
+        "layouts": profile.get("layouts"),
+    }
+
+
+def _numeric(typed: pd.DataFrame, field: str) -> pd.Series:
+    # Field value in report units (dollars or percent) as float with NaN for missing.
+    unit = FIELD_UNITS[field.split()[-1]][0]
+    values = typed[f"{field} {unit}"].astype("Float64").to_numpy(dtype=float, na_value=np.nan)
+    return pd.Series(values / 100 if unit == "cents" else values, index=typed.index)
+
+
+def _distribution(values: pd.Series) -> dict:
+    present = values.dropna().to_numpy()
+    if present.size == 0:
+        return {"count": 0}
+    p5, p50, p95 = np.percentile(present, [5, 50, 95])
+    return {
+        "count": int(present.size),
+        "min": float(present.min()),
+        "p5": float(p5),
+        "p50": float(p50),
+        "p95": float(p95),
+        "max": float(present.max()),
+        "mean": float(present.mean()),
+    }
+
+
+def _typed_checks(df: pd.DataFrame) -> tuple[dict, dict]:
+    # Typed columns for every key field in one vectorized pass, then range,
+    # cross-field consistency and distribution checks as column operations.
+    present = [field for field in KEY_FIELDS if field in df.columns]
+    typed = typed_frame(df, present)
+    numeric = {field: _numeric(typed, field) for field in present}
+
+    per_field = {}
+    for field in present:
+        unit, low, high = FIELD_UNITS[field.split()[-1]]
+        values = numeric[field]
+        flags = typed[f"{field} flag"]
+        nonblank = df[field].fillna("").astype(str).str.strip().ne("")
+        typed_ok = values.notna() | flags.notna()
+        out_of_range = values.notna() & ((values < low) | (values > high))
+        per_field[field] = {
+            "unit": "dollars" if unit == "cents" else "percent",
+            "typed_rate": float(typed_ok[nonblank].mean()) if nonblank.any() else None,
+            "untyped_count": int((nonblank & ~typed_ok).sum()),
+            "out_of_range": int(out_of_range.sum()),
+            "out_of_range_rows": out_of_range[out_of_range].index[:SAMPLE_ROWS].tolist(),
+            "flags": {flag.value: int((flags == flag.value).sum()) for flag in Flag},
+            "distribution": _distribution(values),
+        }
+
+    consistency = {}
+    for name, left, right in CONSISTENCY_CHECKS:
+        if left not in numeric or right not in numeric:
+            consistency[name] = {"count": None, "missing_column": True}
+            continue
+        hit = numeric[left] < numeric[right]
+        consistency[name] = {
+            "count": int(hit.sum()),
+            "compared": int((numeric[left].notna() & numeric[right].notna()).sum()),
+            "rows": hit[hit].index[:SAMPLE_ROWS].tolist(),
+        }
+    return per_field, consistency
+
+
+def _is_parquet(path: Path) -> bool:
+    return path.is_dir() or path.suffix == ".parquet"
+
+
+def _output_columns(path: Path) -> list[str]:
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        parts = sorted(path.glob("part-*.parquet")) if path.is_dir() else [path]
+        return pq.read_schema(parts[0]).names if parts else []
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _rechunk(frames: Iterable[pd.DataFrame], rows: int) -> Iterator[pd.DataFrame]:
+    # Regroups frames of any size into frames of exactly `rows` rows (the last may be
+    # shorter), so both sides of a diff cover the same row range chunk by chunk.
+    pending: list[pd.DataFrame] = []
+    size = 0
+    for frame in frames:
+        pending.append(frame)
+        size += len(frame)
+        while size >= rows:
+            merged = pd.concat(pending, ignore_index=True)
+            yield merged.iloc[:rows]
+            rest = merged.iloc[rows:]
+            pending, size = ([rest] if len(rest) else []), len(rest)
+    if size:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def _read_chunks(path: Path, columns: list[str], rows: int) -> Iterator[pd.DataFrame]:
+    # Output rows as plain strings, "" for blank, `rows` at a time.
+    if not _is_parquet(path):
+        yield from pd.read_csv(path, usecols=columns, dtype=str, keep_default_na=False, chunksize=rows)
+        return
+    import pyarrow.parquet as pq
+
+    parts = sorted(path.glob("part-*.parquet")) if path.is_dir() else [path]
+    batches = (
+        batch.to_pandas().astype(object).fillna("")
+        for part in parts
+        for batch in pq.ParquetFile(part).iter_batches(batch_size=rows, columns=columns)
+    )
+    yield from _rechunk(batches, rows)
+
+
+def _regressed_rows(rows: np.ndarray, keys: pd.DataFrame, field: str, before: np.ndarray, after: np.ndarray) -> pd.DataFrame:
+    frame = keys.reset_index(drop=True)
+    frame.insert(0, "row", rows)
+    frame["field"] = field
+    frame["before"] = before
+    frame["after"] = after
+    return frame[REGRESSED_COLUMNS]
+
+
+def diff_runs(
+    before_path: Path,
+    after_path: Path,
+    chunk_rows: int = DIFF_CHUNK_ROWS,
+    sample: int = REGRESSED_SAMPLE,
+) -> tuple[dict, pd.DataFrame]:
+    # Field-by-field comparison of two outputs of the same input. Per field, changed
+    # counts every differing value, fixed a blank that gained a value and regressed a
+    # value that went blank; an error that appeared counts as a regressed "error".
+    # Rows whose STATE or PAYER NAME/PLAN differ at the same index are not compared
+    # (the input changed between the runs). Returns the report and up to `sample`
+    # regressed (row, field) pairs.
+    before_cols = set(_output_columns(before_path))
+    after_cols = set(_output_columns(after_path))
+    missing_key = [col for col in ROW_KEY if col not in before_cols or col not in after_cols]
+    if missing_key:
+        raise ValueError(f"both outputs need the row key columns; missing {missing_key}")
+    fields = [field for field in [*KEY_FIELDS, "error"] if field in before_cols and field in after_cols]
+    columns = [*ROW_KEY, *fields]
+
+    counts = {field: {"changed": 0, "fixed": 0, "regressed": 0} for field in fields}
+    totals = {"rows_before": 0, "rows_after": 0, "compared": 0, "identical": 0, "key_mismatch": 0}
+    mismatch_rows: list[int] = []
+    regressed: list[pd.DataFrame] = []
+    kept = 0
+    start = 0
+    chunks = zip_longest(_read_chunks(before_path, columns, chunk_rows), _read_chunks(after_path, columns, chunk_rows))
+    for before, after in chunks:
+        totals["rows_before"] += 0 if before is None else len(before)
+        totals["rows_after"] += 0 if after is None else len(after)
+        n = min(len(before), len(after)) if before is not None and after is not None else 0
+        if not n:
+            continue
+        before, after = before.iloc[:n], after.iloc[:n]
+        rows = np.arange(start, start + n)
+        start += n
+        same_key = np.ones(n, dtype=bool)
+        for col in ROW_KEY:
+            same_key &= before[col].to_numpy() == after[col].to_numpy()
+        totals["compared"] += int(same_key.sum())
+        totals["key_mismatch"] += int(n - same_key.sum())
+        if len(mismatch_rows) < SAMPLE_ROWS:
+            mismatch_rows.extend(rows[~same_key][: SAMPLE_ROWS - len(mismatch_rows)].tolist())
+
+        any_diff = np.zeros(n, dtype=bool)
+        chunk_regressed = []
+        for field in fields:
+            old = before[field].to_numpy()
+            new = after[field].to_numpy()
+            changed = same_key & (old != new)
+            fixed = changed & (old == "")
+            lost = changed & (new == "")
+            # A new error is the regression for the error column; a cleared one the fix.
+            if field == "error":
+                fixed, lost = lost, fixed
+            counts[field]["changed"] += int(changed.sum())
+            counts[field]["fixed"] += int(fixed.sum())
+            counts[field]["regressed"] += int(lost.sum())
+            any_diff |= changed
+            if kept < sample and lost.any():
+                hit = np.flatnonzero(lost)[: sample - kept]
+                chunk_regressed.append(_regressed_rows(rows[hit], before[ROW_KEY].iloc[hit], field, old[hit], new[hit]))
+        totals["identical"] += int((same_key & ~any_diff).sum())
+        if chunk_regressed:
+            # Earliest rows first, whichever field regressed.
+            found = pd.concat(chunk_regressed, ignore_index=True).sort_values("row", kind="stable")
+            regressed.append(found.head(sample - kept))
+            kept += len(regressed[-1])
+
+    sample_frame = pd.concat(regressed, ignore_index=True) if regressed else pd.DataFrame(columns=REGRESSED_COLUMNS)
+    report = {
+        "before": str(before_path),
+        "after": str(after_path),
+        **totals,
+        "only_before": max(0, totals["rows_before"] - totals["rows_after"]),
+        "only_after": max(0, totals["rows_after"] - totals["rows_before"]),
+        "identical_rate": totals["identical"] / totals["compared"] if totals["compared"] else None,
+        "key_mismatch_rows": mismatch_rows,
+        "missing_columns": sorted(set(KEY_FIELDS) - set(fields)),
+        "fields": counts,
+        "regressed_sample": sample_frame.head(SAMPLE_ROWS).to_dict(orient="records"),
+    }
+    return report, sample_frame
+
+
+def build_report(df: pd.DataFrame, profile: dict | None = None) -> dict:
     total_rows = int(len(df))
     error_count = int(df["error"].fillna("").astype(str).str.strip().ne("").sum()) if "error" in df.columns else 0
     error_rate = float(error_count) / float(total_rows) if total_rows else 0.0
 
+    typed_fields, consistency = _typed_checks(df)
     fields = {}
     for field in KEY_FIELDS:
         if field in df.columns:
-            fields[field] = {"blank_rate": _blank_rate(df[field])}
+            fields[field] = {"blank_rate": _blank_rate(df[field]), **typed_fields[field]}
         else:
             fields[field] = {"blank_rate": None, "missing_column": True}
 
-    return {
+    report = {
         "rows": total_rows,
         "error_count": error_count,
         "error_rate": error_rate,
         "fields": fields,
+        "consistency": consistency,
     }
+    if profile is not None:
+        report["profile"] = _profile_summary(profile)
+    return report
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Report parse quality metrics for ACA SBC output CSV.")
-    parser.add_argument("--input", required=True, help="Extractor output CSV path")
+    parser.add_argument("--input", required=True, help="Extractor output CSV path (or Parquet directory)")
     parser.add_argument("--json-out", default=None, help="Optional JSON output path")
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="Run profile JSON from aca_sbc.cli (default: <input>.profile.json when present)",
+    )
+    parser.add_argument(
+        "--diff",
+        default=None,
+        metavar="BEFORE",
+        help="Compare --input field by field against this earlier output of the same input instead of reporting on --input alone",
+    )
+    parser.add_argument("--chunk-rows", type=int, default=DIFF_CHUNK_ROWS, help="Rows per side held in memory in --diff mode")
+    parser.add_argument("--regressed-out", default=None, help="--diff mode: CSV of regressed (row, field) pairs for review")
+    parser.add_argument("--regressed-sample", type=int, default=REGRESSED_SAMPLE, help="--diff mode: max pairs written to --regressed-out")
+    parser.add_argument("--fail-on-regression", action="store_true", help="--diff mode: exit 1 if any field regressed")
     args = parser.parse_args()
 
+    if args.diff:
+        return _main_diff(args)
+
     path = Path(args.input)
-    df = pd.read_csv(path)
-    report = build_report(df)
+    # Parquet output (--out-format parquet) is a directory of part files whose
+    # dictionary columns load as categoricals; the checks expect plain strings.
+    if path.is_dir() or path.suffix == ".parquet":
+        df = pd.read_parquet(path).astype(object)
+    else:
+        df = pd.read_csv(path)
+    profile_file = Path(args.profile) if args.profile else path.with_name(path.name + ".profile.json")
+    profile = None
+    if args.profile or profile_file.exists():
+        profile = json.loads(profile_file.read_text(encoding="utf-8"))
+    report = build_report(df, profile)
 
     print(f"rows={report['rows']}")
     print(f"error_count={report['error_count']}")
@@ -63,7 +343,31 @@ def main() -> int:
         if stats.get("missing_column"):
             print(f"{field}: missing")
         else:
-            print(f"{field}: blank_rate={stats['blank_rate']:.4%}")
+            dist = stats["distribution"]
+            typed_rate = stats["typed_rate"]
+            print(
+                f"{field}: blank_rate={stats['blank_rate']:.4%}"
+                + (f" typed_rate={typed_rate:.2%}" if typed_rate is not None else "")
+                + f" out_of_range={stats['out_of_range']}"
+                + (f" p50={dist['p50']:g} p95={dist['p95']:g} max={dist['max']:g}" if dist["count"] else "")
+            )
+    for name, check in report["consistency"].items():
+        if check.get("missing_column"):
+            print(f"{name}: missing")
+        else:
+            print(f"{name}: {check['count']} of {check['compared']}")
+    if "profile" in report:
+        prof = report["profile"]
+        rate = prof["rows_per_second"]
+        print(f"wall_seconds={prof['wall_seconds']:.1f} rows_per_second={rate:.2f}" if rate else "rows_per_second=n/a")
+        for stage, stats in [*prof["stages"].items(), ("download", prof.get("download_seconds"))]:
+            if stats and stats["count"]:
+                print(f"{stage}: p50={stats['p50']:.3f}s p95={stats['p95']:.3f}s max={stats['max']:.3f}s n={stats['count']}")
+        pages = prof["pages"]
+        if pages and pages["count"]:
+            print(f"pages: p50={pages['p50']:.0f} p95={pages['p95']:.0f} max={pages['max']:.0f}")
+        for entry in prof["slowest"][:5]:
+            print(f"slow: {entry['total']:.3f}s pages={entry['pages']} {entry['doc']}")
 
     if args.json_out:
         out_path = Path(args.json_out)
@@ -73,5 +377,29 @@ def main() -> int:
     return 0
 
 
+def _main_diff(args: argparse.Namespace) -> int:
+    report, regressed = diff_runs(Path(args.diff), Path(args.input), max(1, args.chunk_rows), max(0, args.regressed_sample))
+    print(f"rows_before={report['rows_before']} rows_after={report['rows_after']} compared={report['compared']} key_mismatch={report['key_mismatch']}")
+    if report["identical_rate"] is not None:
+        print(f"identical={report['identical']} identical_rate={report['identical_rate']:.4%}")
+    for field, stats in report["fields"].items():
+        print(f"{field}: changed={stats['changed']} fixed={stats['fixed']} regressed={stats['regressed']}")
+    for entry in report["regressed_sample"][:5]:
+        print(f"regressed: row {entry['row']} {entry['field']}: {entry['before']!r} -> {entry['after']!r}")
+
+    if args.regressed_out:
+        out_path = Path(args.regressed_out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        regressed.to_csv(out_path, index=False)
+        report["regressed_out"] = str(out_path)
+    if args.json_out:
+        out_path = Path(args.json_out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    regressions = sum(stats["regressed"] for stats in report["fields"].values())
+    return 1 if args.fail_on_regression and regressions else 0
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+import fitz
+
+# Offline generator for SBC-like PDFs with known field values, used by
+# bench_parser.py. Each layout reproduces one table shape the rules in
+# aca_sbc.parse handle; the expected values are the canonical strings the
+# parser should emit for the text that was drawn.
+
+FILLER_EVENTS = (
+    ("If you visit a health care provider's office or clinic", "Primary care visit to treat an injury or illness"),
+    ("If you have a test", "Diagnostic test (x-ray, blood work)"),
+    ("If you need drugs to treat your illness or condition", "Generic drugs"),
+    ("If you have outpatient surgery", "Facility fee (e.g., ambulatory surgery center)"),
+    ("If you need immediate medical attention", "Emergency room care"),
+    ("If you have a hospital stay", "Facility fee (e.g., hospital room)"),
+    ("If you are pregnant", "Office visits"),
+    ("If you need help recovering or have other special health needs", "Home health care"),
+)
+
+
+@dataclass
+class SyntheticDoc:
+    name: str
+    layout: str
+    pages: int
+    expected: dict[str, Optional[str]]
+    path: Optional[Path] = None
+
+
+@dataclass
+class _Values:
+    inn_ded: int
+    oon_ded: int
+    inn_oop: int
+    oon_oop: int
+    inn_coins: int
+    oon_coins: int
+    inn_copay: int
+    oon_copay: int
+    oon_covered: bool
+    extra: dict[str, str] = field(default_factory=dict)
+
+
+def _money(amount: int) -> str:
+    return f"${amount:,}"
+
+
+def _draw_table(
+    page: fitz.Page,
+    x0: float,
+    y0: float,
+    widths: list[float],
+    rows: list[list[str]],
+    row_height: float = 40,
+    font_size: float = 7,
+) -> float:
+    y = y0
+    for row in rows:
+        x = x0
+        for width, text in zip(widths, row):
+            rect = fitz.Rect(x, y, x + width, y + row_height)
+            page.draw_rect(rect, color=(0, 0, 0), width=0.7)
+            page.insert_textbox(rect + (2, 2, -2, -2), text, fontsize=font_size)
+            x += width
+        y += row_height
+    return y
+
+
+# --- Important Questions layouts -------------------------------------------------
+
+
+def _iq_labelled(v: _Values) -> tuple[str, str, dict[str, str]]:
+    # Answer cell names both networks: "In-Network: $X; Out-of-Network: $Y".
+    ded = f"In-Network: {_money(v.inn_ded)}; Out-of-Network: {_money(v.oon_ded)}"
+    oop = f"In-Network: {_money(v.inn_oop)}; Out-of-Network: {_money(v.oon_oop)}"
+    expected = {
+        "inn_deductible": _money(v.inn_ded),
+        "oon_deductible": _money(v.oon_ded),
+        "inn_oop_max": _money(v.inn_oop),
+        "oon_oop_max": _money(v.oon_oop),
+    }
+    return ded, oop, expected
+
+
+def _iq_sentence(v: _Values) -> tuple[str, str, dict[str, str]]:
+    # Prose answer: "$X individual / $2X family for in-network providers. $Y ... for
+    # out-of-network providers." Only the first amount per network is kept.
+    ded = (
+        f"{_money(v.inn_ded)} individual / {_money(v.inn_ded * 2)} family for in-network providers. "
+        f"{_money(v.oon_ded)} individual / {_money(v.oon_ded * 2)} family for out-of-network providers."
+    )
+    oop = (
+        f"{_money(v.inn_oop)} individual / {_money(v.inn_oop * 2)} family for in-network providers. "
+        f"{_money(v.oon_oop)} individual / {_money(v.oon_oop * 2)} family for out-of-network providers."
+    )
+    expected = {
+        "inn_deductible": _money(v.inn_ded),
+        "oon_deductible": _money(v.oon_ded),
+        "inn_oop_max": _money(v.inn_oop),
+        "oon_oop_max": _money(v.oon_oop),
+    }
+    return ded, oop, expected
+
+
+def _draw_important_questions(page: fitz.Page, ded: str, oop: str) -> None:
+    page.insert_text((40, 40), "Summary of Benefits and Coverage: What this Plan Covers & What You Pay for Covered Services", fontsize=8)
+    _draw_table(
+        page,
+        40,
+        60,
+        [170, 190, 170],
+        [
+            ["Important Questions", "Answers", "Why This Matters:"],
+            ["What is the overall deductible?", ded, "Generally, you must pay all of the costs from providers up to the deductible amount."],
+            ["Are there services covered before you meet your deductible?", "Yes. Preventive care is covered before you meet your deductible.", "This plan covers some items and services even if you haven't yet met the deductible amount."],
+            ["Are there other deductibles for specific services?", "No.", "You don't have to meet deductibles for specific services."],
+            ["What is the out-of-pocket limit for this plan?", oop, "The out-of-pocket limit is the most you could pay in a year for covered services."],
+        ],
+        row_height=48,
+    )
+
+
+# --- Mental health outpatient row layouts ---------------------------------------
+
+
+def _outpatient_cells(v: _Values) -> tuple[str, str, dict[str, Optional[str]]]:
+    inn = f"{_money(v.inn_copay)} copayment/visit for office visit; {v.inn_coins}% coinsurance for other outpatient"
+    expected: dict[str, Optional[str]] = {
+        "inn_coinsurance": f"{v.inn_coins}% coinsurance for other outpatient",
+        "inn_iop_copay": f"{_money(v.inn_copay)} copayment/visit",
+    }
+    if v.oon_covered:
+        oon = f"{_money(v.oon_copay)} copayment/visit; {v.oon_coins}% coinsurance"
+        expected["oon_coinsurance"] = f"{v.oon_coins}% coinsurance"
+        expected["oon_iop_copay"] = f"{_money(v.oon_copay)} copayment/visit"
+    else:
+        oon = "Not Covered"
+        expected["oon_coinsurance"] = "Not Covered"
+        expected["oon_iop_copay"] = "Not Covered"
+    return inn, oon, expected
+
+
+def _standard_rows(v: _Values) -> tuple[list[float], list[list[str]], dict[str, Optional[str]]]:
+    # Separate In-Network and Out-of-Network columns (the common 5-column layout).
+    inn, oon, expected = _outpatient_cells(v)
+    rows = [
+        ["Common Medical Event", "Services You May Need", "What You Will Pay In-Network Provider (You will pay the least)", "What You Will Pay Out-of-Network Provider (You will pay the most)", "Limitations, Exceptions, & Other Important Information"],
+        ["If you need mental health, behavioral health, or substance abuse services", "Outpatient services", inn, oon, "None"],
+        ["", "Inpatient services", f"{v.inn_coins}% coinsurance", "Not Covered" if not v.oon_covered else f"{v.oon_coins}% coinsurance", "None"],
+    ]
+    return [110, 100, 120, 120, 100], rows, expected
+
+
+def _ihcp_rows(v: _Values) -> tuple[list[float], list[list[str]], dict[str, Optional[str]]]:
+    # Indian Health Care Provider plans add an IHCP column ahead of the network
+    # columns; the header decides which column is in-network.
+    inn, oon, expected = _outpatient_cells(v)
+    rows = [
+        ["Common Medical Event", "Services You May Need", "IHCP Provider", "Non-IHCP In-Network Provider", "Out-of-Network Provider", "Limitations"],
+        ["If you need mental health, behavioral health, or substance abuse services", "Outpatient services", "No charge", inn, oon, "None"],
+        ["", "Inpatient services", "No charge", f"{v.inn_coins}% coinsurance", "Not Covered", "None"],
+    ]
+    return [95, 85, 75, 105, 105, 85], rows, expected
+
+
+def _split_cell_rows(v: _Values) -> tuple[list[float], list[list[str]], dict[str, Optional[str]]]:
+    # One cost-share column per network, with each cell repeating its network label.
+    inn = f"In-Network: {_money(v.inn_copay)} copayment/visit; {v.inn_coins}% coinsurance"
+    oon = f"Out-of-Network: {_money(v.oon_copay)} copayment/visit; {v.oon_coins}% coinsurance"
+    rows = [
+        ["Common Medical Event", "Services You May Need", "What You Will Pay", "", "Limitations"],
+        ["If you need mental health, behavioral health, or substance abuse services", "Outpatient services", inn, oon, "None"],
+    ]
+    expected = {
+        "inn_coinsurance": f"{v.inn_coins}% coinsurance",
+        "inn_iop_copay": f"{_money(v.inn_copay)} copayment/visit",
+        "oon_coinsurance": f"{v.oon_coins}% coinsurance",
+        "oon_iop_copay": f"{_money(v.oon_copay)} copayment/visit",
+    }
+    return [110, 100, 130, 130, 90], rows, expected
+
+
+IMPORTANT_QUESTIONS: dict[str, Callable[[_Values], tuple[str, str, dict[str, str]]]] = {
+    "labelled": _iq_labelled,
+    "sentence": _iq_sentence,
+}
+OUTPATIENT: dict[str, Callable[[_Values], tuple[list[float], list[list[str]], dict[str, Optional[str]]]]] = {
+    "standard": _standard_rows,
+    "ihcp": _ihcp_rows,
+    "split": _split_cell_rows,
+}
+LAYOUTS = tuple(f"{iq}/{op}" for iq in IMPORTANT_QUESTIONS for op in OUTPATIENT)
+
+
+def _values(rng: random.Random, layout: str) -> _Values:
+    inn_ded = rng.choice([0, 250, 500, 1000, 1500, 2000, 3000, 4500, 6000, 7500, 9100])
+    inn_oop = rng.choice([3000, 4500, 6000, 7900, 8700, 9100, 9450])
+    return _Values(
+        inn_ded=inn_ded,
+        oon_ded=inn_ded * 2 + rng.choice([0, 500, 1000]),
+        inn_oop=inn_oop,
+        oon_oop=inn_oop * 2,
+        inn_coins=rng.choice([0, 10, 20, 25, 30, 40, 50]),
+        oon_coins=rng.choice([30, 40, 50, 60]),
+        inn_copay=rng.choice([10, 15, 20, 25, 30, 40, 50, 60, 75]),
+        oon_copay=rng.choice([50, 75, 100, 150]),
+        # Split-cell layouts always carry an OON amount; elsewhere ~1/3 are Not Covered.
+        oon_covered=layout.endswith("/split") or rng.random() > 0.35,
+    )
+
+
+def build_doc(name: str, layout: str, rng: random.Random, pages: int = 8) -> tuple[fitz.Document, SyntheticDoc]:
+    iq_name, op_name = layout.split("/")
+    values = _values(rng, layout)
+    ded, oop, expected = IMPORTANT_QUESTIONS[iq_name](values)
+    widths, rows, op_expected = OUTPATIENT[op_name](values)
+    expected = {**expected, **op_expected}
+
+    doc = fitz.open()
+    _draw_important_questions(doc.new_page(), ded, oop)
+    # The outpatient table sits on a random middle page so page targeting is exercised.
+    outpatient_page = rng.randint(2, max(2, pages - 1))
+    for number in range(2, pages + 1):
+        page = doc.new_page()
+        page.insert_text((40, 40), f"Page {number} of {pages}: What you will pay for common medical events", fontsize=8)
+        if number == outpatient_page:
+            _draw_table(page, 40, 60, widths, rows, row_height=64)
+        else:
+            event, service = FILLER_EVENTS[number % len(FILLER_EVENTS)]
+            _draw_table(
+                page,
+                40,
+                60,
+                [110, 110, 120, 120, 100],
+                [
+                    ["Common Medical Event", "Services You May Need", "In-Network Provider", "Out-of-Network Provider", "Limitations"],
+                    [event, service, f"{_money(rng.choice([20, 30, 45]))} copay/visit", "40% coinsurance", "None"],
+                    ["", "Specialist visit", f"{_money(rng.choice([40, 60, 80]))} copay/visit", "Not Covered", "None"],
+                ],
+            )
+    return doc, SyntheticDoc(name=name, layout=layout, pages=pages, expected=expected)
+
+
+def generate_corpus(out_dir: Path, count: int, seed: int = 0, min_pages: int = 6, max_pages: int = 10) -> list[SyntheticDoc]:
+    # Deterministic for a given seed: layouts rotate so every layout is covered, and
+    # the values, page counts and outpatient page are drawn from the seeded RNG.
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    docs = []
+    for idx in range(count):
+        layout = LAYOUTS[idx % len(LAYOUTS)]
+        doc, meta = build_doc(f"sbc_{idx:04d}", layout, rng, pages=rng.randint(min_pages, max_pages))
+        meta.path = out_dir / f"{meta.name}.pdf"
+        doc.save(meta.path)
+        doc.close()
+        docs.append(meta)
+    return docs
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+HASH_CHUNK = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used);
+"""
+
+
+@dataclass
+class UrlEntry:
+    sha256: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def document_key(path: Path) -> str:
+    # Cached blobs are already named by their digest; anything else is hashed.
+    path = Path(path)
+    name = path.stem
+    if path.suffix == ".pdf" and len(name) == 64 and path.parent.name == name[:2]:
+        return name
+    return file_sha256(path)
+
+
+# Content-addressed PDF store with a persistent URL -> sha256 index. Blobs live
+# under objects/<sha[:2]>/<sha>.pdf so byte-identical SBCs served from different
+# URLs are stored once. max_bytes bounds the object store: least-recently-used
+# blobs go first, skipping any pinned by an in-flight download/parse.
+class PdfCache:
+    def __init__(self, root: Path, max_bytes: Optional[int] = None) -> None:
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._pins: Counter[str] = Counter()
+        self._fresh: set[str] = set()
+        self._db = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self.evict()
+            self._db.close()
+
+    def path_for(self, sha: str) -> Path:
+        return self.objects / sha[:2] / f"{sha}.pdf"
+
+    def lookup(self, url: str) -> Optional[UrlEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha256, etag, last_modified FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or not self.path_for(row[0]).is_file():
+            return None
+        return UrlEntry(*row)
+
+    def is_fresh(self, url: str) -> bool:
+        # A URL revalidated earlier in this process is not re-checked.
+        return url in self._fresh
+
+    def hit(self, url: str, sha: str) -> Path:
+        with self._lock:
+            now = time.time()
+            self._db.execute("UPDATE blobs SET last_used = ? WHERE sha256 = ?", (now, sha))
+            self._db.execute("UPDATE urls SET fetched_at = ? WHERE url = ?", (now, url))
+            self._db.commit()
+            self._fresh.add(url)
+            self._pins[sha] += 1
+        return self.path_for(sha)
+
+    def put(
+        self,
+        url: str,
+        src: Path,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Path:
+        # Moves a freshly downloaded file into the store and returns its cached path.
+        sha = file_sha256(src)
+        dest = self.path_for(sha)
+        with self._lock:
+            if dest.is_file():
+                Path(src).unlink(missing_ok=True)
+            else:
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(src, dest)
+            self._record(url, sha, dest.stat().st_size, etag, last_modified)
+            self._pins[sha] += 1
+            self.evict()
+        return dest
+
+    def put_bytes(
+        self,
+        url: str,
+        data: bytes,
+        sha: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        # Stores a download held in memory. Unlike put() nothing is pinned: the caller
+        # parses its own copy of the bytes.
+        dest = self.path_for(sha)
+        if not dest.is_file():
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dest.with_name(f"{dest.name}.{threading.get_ident()}.tmp")
+            try:
+                with open(tmp, "wb") as fh:
+                    fh.write(data)
+                os.replace(tmp, dest)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+        with self._lock:
+            self._record(url, sha, len(data), etag, last_modified)
+            self.evict()
+
+    def _record(self, url: str, sha: str, size: int, etag: Optional[str], last_modified: Optional[str]) -> None:
+        now = time.time()
+        self._db.execute(
+            "INSERT INTO blobs (sha256, size, last_used) VALUES (?, ?, ?) "
+            "ON CONFLICT(sha256) DO UPDATE SET last_used = excluded.last_used",
+            (sha, size, now),
+        )
+        self._db.execute(
+            "INSERT INTO urls (url, sha256, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET sha256 = excluded.sha256, etag = excluded.etag, "
+            "last_modified = excluded.last_modified, fetched_at = excluded.fetched_at",
+            (url, sha, etag, last_modified, now),
+        )
+        self._db.commit()
+        self._fresh.add(url)
+
+    def unpin(self, path: Path) -> bool:
+        path = Path(path)
+        if path.parent.parent != self.objects:
+            return False
+        with self._lock:
+            sha = path.stem
+            if self._pins[sha] > 1:
+                self._pins[sha] -= 1
+            else:
+                del self._pins[sha]
+        return True
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0])
+
+    def evict(self) -> int:
+        if self.max_bytes is None:
+            return 0
+        freed = 0
+        with self._lock:
+            excess = self.total_bytes() - self.max_bytes
+            if excess <= 0:
+                return 0
+            rows = self._db.execute("SELECT sha256, size FROM blobs ORDER BY last_used").fetchall()
+            for sha, size in rows:
+                if freed >= excess:
+                    break
+                if self._pins.get(sha):
+                    continue
+                self.path_for(sha).unlink(missing_ok=True)
+                self._db.execute("DELETE FROM blobs WHERE sha256 = ?", (sha,))
+                self._db.execute("DELETE FROM urls WHERE sha256 = ?", (sha,))
+                freed += size
+            self._db.commit()
+        return freed
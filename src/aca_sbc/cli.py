@@ -1,99 +1,225 @@
 from __future__ import annotations
 
 import argparse
+import heapq
+import sys
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Any
+from typing import Callable, Generic, Iterable, Iterator, TypeVar
 
-import pandas as pd
 from tqdm import tqdm
 
-from .download import download_pdf
-from .parse import parse_pdf
+from .cache import PdfCache, file_sha256
+from .download import PdfBytes, prefetch, release
+from .incremental import PreviousResult, RowLedger, ledger_path, load_previous, parse_field_list, reprocess_reason
+from .layouts import use_templates
+from .manifest import RunManifest, load_manifest, manifest_path
+from .output import FIELD_COLUMNS, OUTPUT_FORMATS, SINKS, ColumnBuffer, OutputRow
+from .parse import ENGINE_CHOICES, ParsedBenefits
+from .pipeline import FIELD_NAMES, field_values, pdf_key, resolve, run_inline, schedule
+from .quarantine import QUARANTINE_MODES, Quarantine, quarantine_path
+from .shard import Shard, shard_path
+from .store import ResultStore
+from .supervise import LimitExceeded, Limits, SupervisedPool
+from .timing import DocTiming, RunProfile, profile_path
+from .tracker import Row, cell, count_records, detect_url_column, get_col, iter_input, read_columns
 
+T = TypeVar("T")
 
-def detect_url_column(df: pd.DataFrame) -> str:
-    for candidate in [
-        "URLForSummaryofBenefitsCoverage",
-        "url",
-        "URL",
-        "pdf",
-        "PDF",
-        "link",
-        "Link",
-    ]:
-        if candidate in df.columns:
-            return candidate
-    return df.columns[0]
+# How many recent documents (by content hash) keep their parse result around so
+# rows pointing at the same SBC are fanned out instead of reparsed.
+DEDUP_WINDOW = 4096
 
 
-def _get_col(df: pd.DataFrame, *candidates: str) -> str | None:
-    for name in candidates:
-        if name in df.columns:
-            return name
-    return None
-
-
-def _combine_payer_plan(row: pd.Series, payer_col: str | None, plan_col: str | None) -> str:
-    payer = str(row[payer_col]).strip() if payer_col else ""
-    plan = str(row[plan_col]).strip() if plan_col else ""
+def _combine_payer_plan(row: Row, payer_col: str | None, plan_col: str | None) -> str:
+    payer = cell(row, payer_col)
+    plan = cell(row, plan_col)
     if payer and plan:
         return f"{payer} - {plan}"
     return payer or plan or ""
 
 
+_NO_VALUES = (None,) * len(FIELD_COLUMNS)
+
+
 def _build_row(
-    row: pd.Series,
+    row: Row,
     state_col: str | None,
     payer_col: str | None,
     plan_col: str | None,
-    parsed: Any = None,
+    parsed: ParsedBenefits | None = None,
     error: str | None = None,
-) -> dict[str, Any]:
-    out = {
-        "STATE": str(row[state_col]).strip() if state_col else "",
-        "NETWORK": "",
-        "PAYER NAME/PLAN": _combine_payer_plan(row, payer_col, plan_col),
-        "INN DED": "",
-        "INN OOP": "",
-        "INN COI": "",
-        "INN COP": "",
-        "OON DED": "",
-        "OON OOP": "",
-        "OON COI": "",
-        "OON COP": "",
-    }
-    if parsed is not None:
-        out.update(
-            {
-                "INN DED": parsed.inn_deductible,
-                "INN OOP": parsed.inn_oop_max,
-                "INN COI": parsed.inn_coinsurance,
-                "INN COP": parsed.inn_iop_copay,
-                "OON DED": parsed.oon_deductible,
-                "OON OOP": parsed.oon_oop_max,
-                "OON COI": parsed.oon_coinsurance,
-                "OON COP": parsed.oon_iop_copay,
-            }
-        )
-    if error:
-        out["error"] = error
-    return out
-
-
-def _append_rows(rows: list[dict[str, Any]], out_path: Path, write_header: bool) -> None:
-    if not rows:
-        return
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    pd.DataFrame(rows).to_csv(out_path, mode="a", header=write_header, index=False)
-
-
-def _count_output_rows(path: Path) -> int:
-    if not path.exists():
-        return 0
-    try:
-        return len(pd.read_csv(path))
-    except Exception:
-        return 0
+) -> OutputRow:
+    # Values in OUTPUT_COLUMNS order; None is written as a blank cell.
+    values = field_values(parsed) if parsed is not None else _NO_VALUES
+    return (
+        cell(row, state_col),
+        "",
+        _combine_payer_plan(row, payer_col, plan_col),
+        *values,
+        error or None,
+    )
+
+
+def _previous_parsed(result: PreviousResult) -> ParsedBenefits:
+    return ParsedBenefits(**dict(zip(FIELD_NAMES, result.values)))
+
+
+def _skip_quarantined(reason: str):
+    # Stands in for submit() on quarantined documents when there is no slow lane.
+    def submit(*_args) -> Future:
+        job: Future = Future()
+        job.set_exception(RuntimeError(f"quarantined:{reason}"))
+        return job
+
+    return submit
+
+
+class ParsePipeline(Generic[T]):
+    # Iterating yields (item, parsed, error) strictly in input order, whatever the
+    # worker count. done_ahead() reports results that already finished behind a
+    # slower head-of-line document, so a checkpoint can record them. on_parsed(item,
+    # key, timing) sees every item as it is taken, with its document hash (None when
+    # the download failed); timing is None for rows that reused another row's parse
+    # or a stored result.
+    #
+    # reuse(item, key) may return a result to use instead of parsing, e.g. the
+    # previous run's values for a document whose content has not changed.
+    #
+    # With active limits every parse runs in a SupervisedPool; documents that breach
+    # them are added to the quarantine and, on later runs, either skipped or sent to
+    # a one-worker slow lane with slow_limits.
+    def __init__(
+        self,
+        fetched: Iterable[tuple[T, Path | PdfBytes | BaseException]],
+        workers: int,
+        cache: PdfCache | None = None,
+        store: ResultStore | None = None,
+        engine: str = "pdfplumber",
+        on_parsed: Callable[[T, str | None, DocTiming | None], None] | None = None,
+        limits: Limits | None = None,
+        quarantine: Quarantine | None = None,
+        slow_limits: Limits | None = None,
+        label: Callable[[T], str] = str,
+        reuse: Callable[[T, str], ParsedBenefits | None] | None = None,
+    ) -> None:
+        self.fetched = fetched
+        self.workers = workers
+        self.cache = cache
+        self.store = store
+        self.engine = engine
+        self.on_parsed = on_parsed
+        self.limits = limits
+        self.quarantine = quarantine
+        self.slow_limits = slow_limits
+        self.label = label
+        self.reuse = reuse
+        self._pending: deque[tuple[T, Path | PdfBytes | None, str | None, Future | BaseException]] = deque()
+        self._saved: set[str] = set()
+        # Jobs not yet taken by any row; shared parses are reported once, against the
+        # first row that used them.
+        self._fresh: set[Future] = set()
+
+    def done_ahead(self) -> list[tuple[T, str | None, ParsedBenefits | None, str | None]]:
+        # (item, document hash, parsed, error) for each finished result still queued.
+        done = []
+        for item, _, key, job in self._pending:
+            if isinstance(job, BaseException) or job.done():
+                parsed, _, error, _ = resolve(job)
+                done.append((item, key, parsed, error))
+        return done
+
+    def _take(self) -> tuple[T, ParsedBenefits | None, str | None]:
+        item, pdf, key, job = self._pending.popleft()
+        parsed, extractions, error, timing = resolve(job)
+        if pdf is not None:
+            release(pdf, cache=self.cache)
+        first = job in self._fresh
+        self._fresh.discard(job)
+        if first and self.quarantine is not None:
+            failure = job.exception()
+            if isinstance(failure, LimitExceeded):
+                self.quarantine.add(key, failure.reason, self.label(item), failure.seconds, failure.rss_bytes)
+            elif parsed is not None:
+                self.quarantine.remove(key)
+        if self.on_parsed is not None:
+            self.on_parsed(item, key, timing if first else None)
+        if first and self.store is not None and parsed is not None and key not in self._saved:
+            self.store.put(key, parsed, extractions)
+            self._saved.add(key)
+        return item, parsed, error
+
+    def __iter__(self) -> Iterator[tuple[T, ParsedBenefits | None, str | None]]:
+        if self.limits is not None and self.limits.active:
+            pool = SupervisedPool(self.workers, self.limits)
+        elif self.workers > 1:
+            pool = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            pool = None
+        submit = pool.submit if pool is not None else run_inline
+        slow = None
+        if self.quarantine is not None and self.slow_limits is not None:
+            slow = SupervisedPool(1, self.slow_limits)
+        # Bound the number of in-flight documents so a slow head-of-line PDF
+        # cannot make the pending queue grow with the corpus.
+        window = self.workers * 4 if pool is not None else 1
+        pending = self._pending
+        by_key: OrderedDict[str, Future] = OrderedDict()
+        try:
+            for item, pdf in self.fetched:
+                if isinstance(pdf, BaseException):
+                    pending.append((item, None, None, pdf))
+                else:
+                    try:
+                        key = pdf_key(pdf)
+                    except OSError as exc:
+                        pending.append((item, pdf, None, exc))
+                        continue
+                    reused = self.reuse(item, key) if self.reuse is not None else None
+                    # Identical documents share one parse, even while it is still running.
+                    job = by_key.get(key)
+                    if reused is not None:
+                        job = run_inline(lambda: (reused, {}, None))
+                    elif job is None:
+                        lane = submit
+                        reason = self.quarantine.reason(key) if self.quarantine is not None else None
+                        if reason is not None:
+                            lane = slow.submit if slow is not None else _skip_quarantined(reason)
+                        job = by_key[key] = schedule(lane, pdf, key, self.engine, self.store, self._saved)
+                        self._fresh.add(job)
+                        if len(by_key) > DEDUP_WINDOW:
+                            by_key.popitem(last=False)
+                    else:
+                        by_key.move_to_end(key)
+                    pending.append((item, pdf, key, job))
+                while len(pending) >= window:
+                    yield self._take()
+            while pending:
+                yield self._take()
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            if slow is not None:
+                slow.shutdown(cancel_futures=True)
+
+
+def _in_order(
+    results: Iterable[tuple[tuple[int, Row], ParsedBenefits | None, str | None]],
+    completed: dict[int, OutputRow],
+    build,
+) -> Iterator[tuple[int, OutputRow]]:
+    # Interleaves rows finished before an interruption (from the manifest) back into
+    # input order around the freshly processed ones.
+    for (idx, row), parsed, error in results:
+        while completed and min(completed) < idx:
+            done_idx = min(completed)
+            yield done_idx, completed.pop(done_idx)
+        yield idx, build(row, parsed, error)
+    for done_idx in sorted(completed):
+        yield done_idx, completed.pop(done_idx)
 
 
 def main() -> int:
@@ -110,42 +236,349 @@ def main() -> int:
     parser.add_argument(
         "--resume",
         action="store_true",
-        help="Resume from existing output file row count",
+        help="Resume from the checkpoint manifest (or the output row count if none)",
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Replace an existing output instead of refusing to start (ignored with --resume)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parse PDFs in N worker processes (output order is preserved)",
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=4,
+        help="Concurrent download threads feeding the parser",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=32,
+        help="Max documents downloaded ahead of the parser",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=4,
+        help="Max concurrent downloads per host",
+    )
+    parser.add_argument(
+        "--download-to-disk",
+        action="store_true",
+        help="Spool downloads to temp files before parsing instead of parsing them from memory",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Content-addressed PDF cache directory (enables conditional re-downloads)",
+    )
+    parser.add_argument(
+        "--cache-max-gb",
+        type=float,
+        default=20.0,
+        help="Evict least-recently-used cached PDFs beyond this size",
+    )
+    parser.add_argument(
+        "--results-db",
+        default=None,
+        help="SQLite store memoizing tables and parsed results by PDF hash and parser version",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINE_CHOICES,
+        default="pdfplumber",
+        help="Table/text extraction backend; auto tries PyMuPDF and falls back to pdfplumber for blank fields",
+    )
+    parser.add_argument(
+        "--layout-templates",
+        default=None,
+        help="Layout template registry from scripts/layout_templates.py; registered layouts skip the generic table scan",
+    )
+    parser.add_argument(
+        "--doc-timeout",
+        type=float,
+        default=300.0,
+        help="Kill and recycle a parse worker after N seconds on one PDF (0 disables)",
+    )
+    parser.add_argument(
+        "--max-rss-mb",
+        type=int,
+        default=3072,
+        help="Kill and recycle a parse worker whose RSS exceeds N MB (0 disables; needs psutil off Linux)",
+    )
+    parser.add_argument(
+        "--quarantine-file",
+        default=None,
+        help="JSON list of PDFs that hit a limit (default: <out>.quarantine.json)",
+    )
+    parser.add_argument(
+        "--quarantined",
+        choices=QUARANTINE_MODES,
+        default="skip",
+        help="On reruns, skip quarantined PDFs or parse them in a one-worker slow lane",
+    )
+    parser.add_argument(
+        "--slow-timeout",
+        type=float,
+        default=1800.0,
+        help="Per-PDF timeout in the slow lane (0 disables)",
+    )
+    parser.add_argument(
+        "--out-format",
+        choices=OUTPUT_FORMATS,
+        default="csv",
+        help="csv file, or a directory of dictionary-encoded Parquet parts (one row group per checkpoint; needs pyarrow)",
+    )
+    parser.add_argument(
+        "--incremental",
+        default=None,
+        metavar="PREVIOUS_OUT",
+        help="Reuse rows from this earlier output; only new/changed URLs, failed rows and --refresh-blank rows are reprocessed",
+    )
+    parser.add_argument(
+        "--refresh-blank",
+        default="",
+        help='With --incremental, also reprocess rows blank in any of these fields, e.g. "OON COP,INN COP"',
+    )
+    parser.add_argument(
+        "--recheck-content",
+        action="store_true",
+        help="With --incremental, download unchanged URLs too and reparse those whose PDF hash changed (pair with --cache-dir)",
+    )
+    parser.add_argument(
+        "--shard",
+        default=None,
+        metavar="K/N",
+        help="Process only shard K of N (rows partitioned by URL hash); output goes to <out stem>.shardKofN, merged with python -m aca_sbc.merge",
     )
     args = parser.parse_args()
 
-    df = pd.read_csv(args.csv)
-    url_col = args.url_col or detect_url_column(df)
+    if args.layout_templates:
+        try:
+            use_templates(Path(args.layout_templates))
+        except (OSError, ValueError, KeyError) as exc:
+            parser.error(f"--layout-templates: {exc}")
 
-    state_col = _get_col(df, "StateCode", "STATE", "state")
-    payer_col = _get_col(df, "IssuerMarketPlaceMarketingName", "PAYER NAME/PLAN", "payer")
-    plan_col = _get_col(df, "PlanMarketingName", "PLAN NAME", "plan")
+    csv_path = Path(args.csv)
+    columns = read_columns(csv_path)
+    url_col = args.url_col or detect_url_column(columns)
 
-    out_path = Path(args.out)
-    start_idx = _count_output_rows(out_path) if args.resume else 0
-    write_header = not (args.resume and out_path.exists() and start_idx > 0)
+    state_col = get_col(columns, "StateCode", "STATE", "state")
+    payer_col = get_col(columns, "IssuerMarketPlaceMarketingName", "PAYER NAME/PLAN", "payer")
+    plan_col = get_col(columns, "PlanMarketingName", "PLAN NAME", "plan")
 
-    rows_buffer: list[dict[str, Any]] = []
-    checkpoint_every = max(1, args.checkpoint_every)
+    shard = None
+    if args.shard:
+        try:
+            shard = Shard.parse(args.shard)
+        except ValueError as exc:
+            parser.error(f"--shard: {exc}")
+    out_path = shard_path(Path(args.out), shard) if shard is not None else Path(args.out)
+    ckpt_path = manifest_path(out_path)
+    sink_type = SINKS[args.out_format]
+    manifest = RunManifest(
+        input_sha256=file_sha256(csv_path),
+        output_format=args.out_format,
+        shard=shard.label if shard is not None else None,
+    )
+    if not args.resume and out_path.exists() and not args.overwrite:
+        parser.error(f"{out_path} already exists; pass --resume to continue it or --overwrite to replace it")
+    try:
+        previous = load_manifest(ckpt_path) if args.resume else None
+    except ValueError as exc:
+        parser.error(str(exc))
+    if previous is not None:
+        if previous.input_sha256 != manifest.input_sha256:
+            parser.error(f"{csv_path} changed since {ckpt_path} was written; cannot resume by row index")
+        if previous.output_format != args.out_format:
+            parser.error(f"{ckpt_path} is for --out-format {previous.output_format}")
+        if previous.shard != manifest.shard:
+            parser.error(f"{ckpt_path} is for --shard {previous.shard}")
+        if not out_path.exists():
+            parser.error(f"{ckpt_path} exists but {out_path} is missing")
+        sink_type.truncate(out_path, previous.output_offset)
+        RowLedger.truncate(ledger_path(out_path), previous.ledger_offset)
+        manifest = previous
+    elif args.resume and out_path.exists():
+        # Legacy resume for outputs written before the manifest existed. Errors are
+        # not swallowed: restarting from zero would duplicate every committed row.
+        if shard is not None:
+            parser.error(f"{out_path} has no manifest; a shard cannot resume by row count")
+        manifest.committed_rows = sink_type.count_rows(out_path)
+    elif not args.resume:
+        # A manifest left by the output being replaced must not steer a later --resume.
+        ckpt_path.unlink(missing_ok=True)
+    start_idx = manifest.committed_rows
+    completed = {idx: row for idx, (_, row) in manifest.completed.items()}
+    done_keys = {idx: key for idx, (key, _) in manifest.completed.items()}
+    done = set(completed)
+
+    def owed_rows() -> Iterator[tuple[int, Row]]:
+        # Input rows past the checkpoint that belong to this run's shard.
+        for idx, row in enumerate(iter_input(csv_path, start_idx), start_idx):
+            if shard is None or shard.owns(idx, cell(row, url_col)):
+                yield idx, row
 
-    iterable = df.iloc[start_idx:].iterrows()
-    total = max(0, len(df) - start_idx)
-    for idx, row in tqdm(iterable, total=total, desc="PDFs"):
-        url = str(row[url_col]).strip()
+    previous_results: dict[str, PreviousResult] | None = None
+    refresh_blank: list[int] = []
+    if args.incremental:
+        previous_out = Path(args.incremental)
+        if previous_out.resolve() == out_path.resolve():
+            parser.error("--incremental reads the previous output while writing --out; use a new --out path")
+        if not ledger_path(previous_out).exists():
+            parser.error(f"{previous_out} has no {ledger_path(previous_out).name}; run it once without --incremental")
         try:
-            pdf_path = download_pdf(url)
-            parsed = parse_pdf(str(pdf_path))
-            rows_buffer.append(_build_row(row, state_col, payer_col, plan_col, parsed=parsed))
-        except Exception as exc:
-            rows_buffer.append(_build_row(row, state_col, payer_col, plan_col, error=str(exc)))
+            refresh_blank = parse_field_list(args.refresh_blank)
+        except ValueError as exc:
+            parser.error(f"--refresh-blank: {exc}")
+        previous_results = load_previous(previous_out)
+    elif args.refresh_blank or args.recheck_content:
+        parser.error("--refresh-blank and --recheck-content need --incremental")
+
+    def reprocess(row: Row) -> str | None:
+        # None when the row takes its previous result without a download or parse.
+        if previous_results is None:
+            return "all"
+        reason = reprocess_reason(previous_results, cell(row, url_col), refresh_blank)
+        if reason is None and args.recheck_content:
+            return "recheck"
+        return reason
+
+    if previous_results is not None:
+        plan = Counter(reprocess(row) or "reused" for idx, row in owed_rows() if idx not in done)
+        print("incremental: " + ", ".join(f"{name}={count}" for name, count in sorted(plan.items())), file=sys.stderr)
+
+    try:
+        sink = sink_type(out_path, append=args.resume)
+    except (RuntimeError, ValueError) as exc:
+        parser.error(str(exc))
+
+    if args.resume and previous is None:
+        # Legacy resume: the rows already written are the first input rows, in order.
+        # Rebuild the ledger for them; their document hashes are unknown.
+        ledger = RowLedger(ledger_path(out_path))
+        for idx, row in enumerate(islice(iter_input(csv_path), start_idx)):
+            ledger.record(idx, cell(row, url_col), None)
+    else:
+        ledger = RowLedger(ledger_path(out_path), append=args.resume)
+    # (URL, document hash) per input row until its output row is written; the ledger
+    # takes them in output order.
+    ledger_rows: dict[int, tuple[str, str | None]] = {}
+    rows_buffer = ColumnBuffer()
+    checkpoint_every = max(1, args.checkpoint_every)
+
+    def to_parse() -> Iterator[tuple[tuple[int, Row], str]]:
+        for idx, row in owed_rows():
+            url = cell(row, url_col)
+            if idx in done:
+                # Finished ahead of the last checkpoint.
+                ledger_rows[idx] = (url, done_keys[idx])
+            elif reprocess(row) is not None:
+                yield (idx, row), url
+
+    items = to_parse()
+    if shard is None:
+        total = max(0, count_records(csv_path) - start_idx)
+    else:
+        total = sum(1 for _ in owed_rows())
+    profile = RunProfile()
+    cache = None
+    if args.cache_dir:
+        cache = PdfCache(Path(args.cache_dir), max_bytes=int(args.cache_max_gb * 1024**3))
+    fetched = prefetch(
+        items,
+        workers=args.download_workers,
+        ahead=args.prefetch,
+        per_host=args.per_host,
+        cache=cache,
+        on_fetched=lambda item, seconds: profile.record_download(item[0], seconds),
+        in_memory=not args.download_to_disk,
+    )
+    store = ResultStore(Path(args.results_db), engine=args.engine) if args.results_db else None
+    max_rss = args.max_rss_mb * 1024**2 or None
+    quarantine = Quarantine(Path(args.quarantine_file) if args.quarantine_file else quarantine_path(out_path))
+
+    def on_parsed(item: tuple[int, Row], key: str | None, timing: DocTiming | None) -> None:
+        idx, row = item
+        url = cell(row, url_col)
+        ledger_rows[idx] = (url, key)
+        profile.add(idx, url, timing)
+
+    def reuse_unchanged(item: tuple[int, Row], key: str) -> ParsedBenefits | None:
+        # --recheck-content: the URL was downloaded again; skip the parse if the PDF is
+        # byte-identical to the one behind the previous result.
+        url = cell(item[1], url_col)
+        result = previous_results.get(url)
+        if result is None or result.sha256 != key or reprocess_reason(previous_results, url, refresh_blank) is not None:
+            return None
+        return _previous_parsed(result)
+
+    pipeline = ParsePipeline(
+        fetched,
+        max(1, args.workers),
+        cache=cache,
+        store=store,
+        engine=args.engine,
+        on_parsed=on_parsed,
+        limits=Limits(timeout=args.doc_timeout or None, max_rss_bytes=max_rss),
+        quarantine=quarantine,
+        slow_limits=Limits(timeout=args.slow_timeout or None, max_rss_bytes=max_rss) if args.quarantined == "slow" else None,
+        label=lambda item: cell(item[1], url_col),
+        reuse=reuse_unchanged if previous_results is not None and args.recheck_content else None,
+    )
+
+    def build(row: Row, parsed: ParsedBenefits | None, error: str | None) -> OutputRow:
+        return _build_row(row, state_col, payer_col, plan_col, parsed=parsed, error=error)
+
+    def reused_rows() -> Iterator[tuple[int, OutputRow]]:
+        for idx, row in owed_rows():
+            if idx in done or reprocess(row) is not None:
+                continue
+            url = cell(row, url_col)
+            result = previous_results[url]
+            ledger_rows[idx] = (url, result.sha256)
+            yield idx, build(row, _previous_parsed(result), None)
+
+    def checkpoint(next_idx: int) -> None:
+        sink.write(rows_buffer)
+        rows_buffer.clear()
+        ledger.flush()
+        if store is not None:
+            store.commit()
+        manifest.committed_rows = next_idx
+        manifest.output_offset = sink.tell()
+        manifest.ledger_offset = ledger.tell()
+        manifest.completed = {idx: (done_keys[idx], row) for idx, row in completed.items()}
+        for (idx, row), key, parsed, error in pipeline.done_ahead():
+            manifest.completed[idx] = (key, build(row, parsed, error))
+        manifest.save(ckpt_path)
+
+    results = _in_order(pipeline, completed, build)
+    if previous_results is not None:
+        # Both streams are in input order, so merging by index keeps the row order.
+        results = heapq.merge(results, reused_rows(), key=itemgetter(0))
 
+    next_idx = start_idx
+    for idx, out_row in tqdm(results, total=total, desc="PDFs"):
+        rows_buffer.append(out_row)
+        ledger.record(idx, *ledger_rows.pop(idx, ("", None)))
+        next_idx = idx + 1
         if len(rows_buffer) >= checkpoint_every:
-            _append_rows(rows_buffer, out_path, write_header)
-            write_header = False
-            rows_buffer.clear()
+            checkpoint(next_idx)
 
-    if rows_buffer:
-        _append_rows(rows_buffer, out_path, write_header)
+    checkpoint(next_idx)
+    sink.close()
+    ledger.close()
+    profile.write(profile_path(out_path))
+    if cache is not None:
+        cache.close()
+    if store is not None:
+        store.close()
 
     return 0
 
@@ -0,0 +1,484 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+from .cache import document_key
+from .parse import ENGINE_CHOICES, as_document, extract_document, extraction_fingerprint, table_fields
+from .store import ResultStore, pack, unpack
+
+# Searchable corpus of what the table rules see: every document's extracted tables
+# (as the engine produced them, anchor pages only) plus the text of all its pages,
+# keyed by PDF hash. Built once per extraction version; queries and rule replays
+# then never reopen a PDF. Documents imported from a result store carry only the
+# page text the parse needed (text_complete = 0) until a PDF pass fills in the rest.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    sha256 TEXT PRIMARY KEY,
+    engine TEXT NOT NULL,
+    version TEXT NOT NULL,
+    source TEXT,
+    pages INTEGER,
+    text_complete INTEGER NOT NULL DEFAULT 0,
+    tables BLOB NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cells (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    tbl INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cells_sha256 ON cells (sha256);
+CREATE VIRTUAL TABLE IF NOT EXISTS cells_fts USING fts5(text, content='cells', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS cells_ai AFTER INSERT ON cells BEGIN
+    INSERT INTO cells_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS cells_ad AFTER DELETE ON cells BEGIN
+    INSERT INTO cells_fts (cells_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_sha256 ON pages (sha256);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(text, content='pages', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN
+    INSERT INTO pages_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
+    INSERT INTO pages_fts (pages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+# Raw table-rule outputs, in replay CSV order.
+REPLAY_FIELDS = ["deductible", "oop", "inn_coi", "inn_cop", "oon_coi", "oon_cop"]
+COMMIT_EVERY = 200
+SAMPLE_ROWS = 20
+
+Tables = list[list[list[Optional[str]]]]
+
+
+def fts_phrase(text: str) -> str:
+    # Plain text as one FTS5 phrase: "non-ihcp" matches the tokens non, ihcp in order.
+    return '"' + text.replace('"', '""') + '"'
+
+
+class CorpusIndex:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(documents)")}
+        if "text_complete" not in columns:
+            # Indexes built before the column existed: which documents came from a
+            # store is unknown, so every one gets its page text again from a PDF pass.
+            self._db.execute("ALTER TABLE documents ADD COLUMN text_complete INTEGER NOT NULL DEFAULT 0")
+
+    def close(self) -> None:
+        self._db.commit()
+        self._db.close()
+
+    def commit(self) -> None:
+        self._db.commit()
+
+    def versions(self, engine: str) -> dict[str, tuple[str, bool]]:
+        # sha256 -> (extraction version, whether all page text is indexed)
+        return {
+            sha: (version, bool(complete))
+            for sha, version, complete in self._db.execute(
+                "SELECT sha256, version, text_complete FROM documents WHERE engine = ?", (engine,)
+            )
+        }
+
+    def add(
+        self,
+        sha: str,
+        engine: str,
+        version: str,
+        source: Optional[str],
+        tables: Tables,
+        page_texts: list[str],
+        text_complete: bool = True,
+    ) -> None:
+        # Replaces any earlier entry for the document.
+        self._db.execute("DELETE FROM cells WHERE sha256 = ?", (sha,))
+        self._db.execute(
+            "INSERT OR REPLACE INTO documents (sha256, engine, version, source, pages, text_complete, tables, indexed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (sha, engine, version, source, len(page_texts) or None, int(text_complete), pack(tables), time.time()),
+        )
+        self._db.executemany(
+            "INSERT INTO cells (sha256, tbl, row, col, text) VALUES (?, ?, ?, ?, ?)",
+            (
+                (sha, t, r, c, text)
+                for t, table in enumerate(tables)
+                for r, row in enumerate(table)
+                for c, cell in enumerate(row)
+                if cell and (text := " ".join(cell.split()))
+            ),
+        )
+        self._add_pages(sha, page_texts)
+
+    def add_page_texts(self, sha: str, source: str, page_texts: list[str]) -> None:
+        # All page text for a document whose tables are already indexed.
+        self._add_pages(sha, page_texts)
+        self._db.execute(
+            "UPDATE documents SET pages = ?, text_complete = 1, source = COALESCE(source, ?) WHERE sha256 = ?",
+            (len(page_texts) or None, source, sha),
+        )
+
+    def _add_pages(self, sha: str, page_texts: list[str]) -> None:
+        self._db.execute("DELETE FROM pages WHERE sha256 = ?", (sha,))
+        self._db.executemany(
+            "INSERT INTO pages (sha256, page, text) VALUES (?, ?, ?)",
+            ((sha, page, text) for page, text in enumerate(page_texts) if text.strip()),
+        )
+
+    def note_source(self, sha: str, source: str) -> None:
+        # Documents imported from a result store have no path until a PDF run finds one.
+        self._db.execute("UPDATE documents SET source = ? WHERE sha256 = ? AND source IS NULL", (source, sha))
+
+    def search(self, query: str, pages: bool = False, limit: int = 50) -> list[dict[str, Any]]:
+        # Best-ranked hits for an FTS5 query over table cells (or page text).
+        if pages:
+            sql = (
+                "SELECT p.sha256, d.source, p.page, snippet(pages_fts, 0, '[', ']', '...', 16) "
+                "FROM pages_fts JOIN pages p ON p.id = pages_fts.rowid JOIN documents d ON d.sha256 = p.sha256 "
+                "WHERE pages_fts MATCH ? ORDER BY rank LIMIT ?"
+            )
+            return [
+                {"sha256": sha, "source": source, "page": page, "text": text}
+                for sha, source, page, text in self._db.execute(sql, (query, limit))
+            ]
+        sql = (
+            "SELECT c.sha256, d.source, c.tbl, c.row, c.col, c.text "
+            "FROM cells_fts JOIN cells c ON c.id = cells_fts.rowid JOIN documents d ON d.sha256 = c.sha256 "
+            "WHERE cells_fts MATCH ? ORDER BY rank LIMIT ?"
+        )
+        return [
+            {"sha256": sha, "source": source, "table": tbl, "row": row, "col": col, "text": text}
+            for sha, source, tbl, row, col, text in self._db.execute(sql, (query, limit))
+        ]
+
+    def matching_documents(self, query: str, pages: bool = False) -> dict[str, int]:
+        # Hit count per document.
+        fts, content = ("pages_fts", "pages") if pages else ("cells_fts", "cells")
+        sql = (
+            f"SELECT c.sha256, COUNT(*) FROM {fts} JOIN {content} c ON c.id = {fts}.rowid "
+            f"WHERE {fts} MATCH ? GROUP BY c.sha256"
+        )
+        return dict(self._db.execute(sql, (query,)))
+
+    def documents(self, shas: Optional[Iterable[str]] = None) -> Iterator[tuple[str, Optional[str], Tables]]:
+        # (sha256, source, tables) for every document, or for the given hashes.
+        if shas is None:
+            for sha, source, blob in self._db.execute("SELECT sha256, source, tables FROM documents ORDER BY sha256"):
+                yield sha, source, unpack(blob)
+            return
+        for sha in sorted(shas):
+            row = self._db.execute("SELECT source, tables FROM documents WHERE sha256 = ?", (sha,)).fetchone()
+            if row is not None:
+                yield sha, row[0], unpack(row[1])
+
+    def stats(self) -> dict[str, int]:
+        return {
+            name: self._db.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+            for name in ("documents", "cells", "pages")
+        }
+
+
+def _extract_for_index(path: str, engine: str | None) -> tuple[Optional[Tables], list[str]] | str:
+    # Tables as the engine extracts them for the rules (None when engine is None: the
+    # tables are already indexed), and the text of every page from PyMuPDF (a cheap
+    # pass whichever engine built the tables). Errors come back as text so one bad PDF
+    # does not stop a pool.map.
+    try:
+        doc = as_document(path)
+        tables = None
+        if engine is not None:
+            extraction = extract_document(doc, engine)
+            if extraction.text_source is not None:
+                extraction.text_source.close()
+            tables = extraction.tables
+        with doc.open_fitz() as pdf:
+            page_texts = [page.get_text() for page in pdf]
+        return tables, page_texts
+    except Exception as exc:
+        return f"{type(exc).__name__}: {exc}"
+
+
+def _extract_job(args: tuple[str, str | None]) -> tuple[Optional[Tables], list[str]] | str:
+    return _extract_for_index(*args)
+
+
+def build_index(
+    index: CorpusIndex,
+    pdfs: list[Path],
+    engine: str,
+    workers: int = 1,
+    store: Optional[ResultStore] = None,
+    rebuild: bool = False,
+) -> dict[str, Any]:
+    # Adds documents not yet indexed at the current extraction version: first any the
+    # result store already holds tables for (no PDF is opened; page text is only what
+    # the store kept), then the PDFs, extracted on `workers` processes. A PDF whose
+    # tables came from the store is only read for its page text.
+    version = extraction_fingerprint(engine)
+    known = {} if rebuild else index.versions(engine)
+    counts = {"indexed_from_store": 0, "indexed_from_pdfs": 0, "text_from_pdfs": 0, "up_to_date": 0, "failed": 0}
+    failures: list[dict[str, str]] = []
+
+    def has_tables(sha: str) -> bool:
+        return sha in known and known[sha][0] == version
+
+    if store is not None:
+        for sha in store.extraction_shas(engine):
+            if has_tables(sha):
+                continue
+            extraction = store.get_extractions(sha).get(engine)
+            if extraction is None:
+                continue
+            index.add(sha, engine, version, None, extraction.tables, extraction.page_texts, text_complete=False)
+            known[sha] = (version, False)
+            counts["indexed_from_store"] += 1
+            if counts["indexed_from_store"] % COMMIT_EVERY == 0:
+                index.commit()
+        index.commit()
+
+    todo: list[tuple[str, str, str | None]] = []
+    for path in pdfs:
+        try:
+            sha = document_key(path)
+        except OSError as exc:
+            counts["failed"] += 1
+            failures.append({"source": str(path), "error": str(exc)})
+            continue
+        if has_tables(sha) and known[sha][1]:
+            index.note_source(sha, str(path))
+            counts["up_to_date"] += 1
+            continue
+        todo.append((sha, str(path), None if has_tables(sha) else engine))
+        known[sha] = (version, True)
+
+    jobs = ((path, job_engine) for _, path, job_engine in todo)
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(_extract_job, jobs, chunksize=4)
+    else:
+        pool = None
+        results = map(_extract_job, jobs)
+    try:
+        for done, ((sha, path, _), result) in enumerate(zip(todo, results), 1):
+            if isinstance(result, str):
+                counts["failed"] += 1
+                failures.append({"source": path, "error": result})
+                continue
+            tables, page_texts = result
+            if tables is None:
+                index.add_page_texts(sha, path, page_texts)
+                counts["text_from_pdfs"] += 1
+            else:
+                index.add(sha, engine, version, path, tables, page_texts)
+                counts["indexed_from_pdfs"] += 1
+            if done % COMMIT_EVERY == 0:
+                index.commit()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    index.commit()
+    return {**counts, "failures": failures[:SAMPLE_ROWS], **index.stats()}
+
+
+def replay_rules(tables: Tables) -> tuple[Optional[str], ...]:
+    # The table rules exactly as parse_pdf runs them, in REPLAY_FIELDS order.
+    found = table_fields(tables)
+    return found.deductible, found.oop, found.inn_coi, found.inn_cop, found.oon_coi, found.oon_cop
+
+
+def _read_replay(path: Path) -> dict[str, tuple[str, ...]]:
+    with open(path, newline="", encoding="utf-8") as fh:
+        return {row["sha256"]: tuple(row[name] for name in REPLAY_FIELDS) for row in csv.DictReader(fh)}
+
+
+def replay(
+    index: CorpusIndex,
+    match: Optional[str] = None,
+    out_path: Optional[Path] = None,
+    baseline_path: Optional[Path] = None,
+) -> dict[str, Any]:
+    # Runs the table rules over stored tables (every document, or those whose cells
+    # match an FTS5 query), optionally writing one CSV row per document and comparing
+    # against an earlier replay's CSV: changed, fixed (blank to value) and regressed
+    # (value to blank) per field.
+    shas = index.matching_documents(match) if match else None
+    baseline = _read_replay(baseline_path) if baseline_path is not None else None
+    filled = dict.fromkeys(REPLAY_FIELDS, 0)
+    changes = {name: {"changed": 0, "fixed": 0, "regressed": 0} for name in REPLAY_FIELDS}
+    changed_docs: list[dict[str, Any]] = []
+    docs = 0
+    rules_seconds = 0.0
+    writer = None
+    fh = open(out_path, "w", newline="", encoding="utf-8") if out_path is not None else None
+    try:
+        if fh is not None:
+            writer = csv.writer(fh)
+            writer.writerow(["sha256", "source", *REPLAY_FIELDS])
+        for sha, source, tables in index.documents(shas):
+            start = time.perf_counter()
+            values = replay_rules(tables)
+            rules_seconds += time.perf_counter() - start
+            docs += 1
+            cells = tuple(value or "" for value in values)
+            for name, cell in zip(REPLAY_FIELDS, cells):
+                filled[name] += bool(cell)
+            if writer is not None:
+                writer.writerow([sha, source or "", *cells])
+            before = baseline.get(sha) if baseline is not None else None
+            if before is None or before == cells:
+                continue
+            for name, old, new in zip(REPLAY_FIELDS, before, cells):
+                if old != new:
+                    changes[name]["changed"] += 1
+                    changes[name]["fixed"] += not old
+                    changes[name]["regressed"] += not new
+            if len(changed_docs) < SAMPLE_ROWS:
+                changed_docs.append({"sha256": sha, "source": source, "before": before, "after": cells})
+    finally:
+        if fh is not None:
+            fh.close()
+    report: dict[str, Any] = {
+        "documents": docs,
+        "match": match,
+        "rules_seconds": rules_seconds,
+        "documents_per_second": docs / rules_seconds if rules_seconds else None,
+        "filled": filled,
+    }
+    if baseline is not None:
+        report["baseline"] = str(baseline_path)
+        report["changes"] = changes
+        report["changed_documents"] = changed_docs
+    return report
+
+
+def _cmd_build(args: argparse.Namespace) -> dict[str, Any]:
+    pdfs = sorted(Path(args.pdf_dir).rglob("*.pdf")) if args.pdf_dir else []
+    store = ResultStore(Path(args.results_db), engine=args.engine) if args.results_db else None
+    index = CorpusIndex(Path(args.index))
+    try:
+        report = build_index(index, pdfs, args.engine, args.workers, store, args.rebuild)
+    finally:
+        index.close()
+        if store is not None:
+            store.close()
+    print(
+        f"indexed_from_pdfs={report['indexed_from_pdfs']} indexed_from_store={report['indexed_from_store']} "
+        f"text_from_pdfs={report['text_from_pdfs']} "
+        f"up_to_date={report['up_to_date']} failed={report['failed']} "
+        f"documents={report['documents']} cells={report['cells']} pages={report['pages']}"
+    )
+    for failure in report["failures"][:5]:
+        print(f"  failed: {failure['source']}: {failure['error']}")
+    return report
+
+
+def _cmd_query(args: argparse.Namespace) -> dict[str, Any]:
+    query = args.query if args.fts else fts_phrase(args.query)
+    index = CorpusIndex(Path(args.index))
+    try:
+        docs = index.matching_documents(query, pages=args.pages)
+        hits = index.search(query, pages=args.pages, limit=args.limit)
+    finally:
+        index.close()
+    print(f"query={query} documents={len(docs)} hits={sum(docs.values())}")
+    for hit in hits:
+        where = f"page {hit['page']}" if args.pages else f"t{hit['table']} r{hit['row']} c{hit['col']}"
+        print(f"  {hit['sha256'][:12]} {where}: {' '.join(hit['text'].split())[:120]}  ({hit['source'] or '-'})")
+    return {"query": query, "documents": len(docs), "hits": hits, "document_hits": docs}
+
+
+def _cmd_replay(args: argparse.Namespace) -> dict[str, Any]:
+    match = None
+    if args.match:
+        match = args.match if args.fts else fts_phrase(args.match)
+    index = CorpusIndex(Path(args.index))
+    try:
+        report = replay(
+            index,
+            match,
+            Path(args.out) if args.out else None,
+            Path(args.baseline) if args.baseline else None,
+        )
+    finally:
+        index.close()
+    rate = report["documents_per_second"]
+    print(f"documents={report['documents']} rules_seconds={report['rules_seconds']:.2f}" + (f" documents_per_second={rate:.0f}" if rate else ""))
+    for name, count in report["filled"].items():
+        line = f"  {name}: filled={count}"
+        if "changes" in report:
+            stats = report["changes"][name]
+            line += f" changed={stats['changed']} fixed={stats['fixed']} regressed={stats['regressed']}"
+        print(line)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Index SBC tables and page text for search and rule replay")
+    parser.add_argument("--index", required=True, help="Corpus index SQLite path")
+    parser.add_argument("--json-out", default=None, help="Optional JSON output path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Extract and index PDFs not yet indexed at the current extraction version")
+    build.add_argument("--pdf-dir", default=None, help="Directory of SBC PDFs, e.g. the --cache-dir blobs (searched recursively)")
+    build.add_argument("--results-db", default=None, help="Also import tables already stored by aca_sbc.cli --results-db")
+    build.add_argument("--engine", choices=[e for e in ENGINE_CHOICES if e != "auto"], default="pdfplumber", help="Extraction engine whose tables are indexed")
+    build.add_argument("--workers", type=int, default=1, help="Extract PDFs in N worker processes")
+    build.add_argument("--rebuild", action="store_true", help="Re-extract documents even if already indexed")
+
+    query = commands.add_parser("query", help="Find documents whose table cells (or pages) mention a phrase")
+    query.add_argument("query", help='Phrase to find, e.g. "intensive outpatient"')
+    query.add_argument("--pages", action="store_true", help="Search page text instead of table cells")
+    query.add_argument("--fts", action="store_true", help="Treat the query as FTS5 syntax (AND/OR/NEAR, prefix*) instead of a phrase")
+    query.add_argument("--limit", type=int, default=50, help="Max hits listed")
+
+    replay_cmd = commands.add_parser("replay", help="Run the table rules over stored tables")
+    replay_cmd.add_argument("--match", default=None, help="Only documents whose cells mention this phrase")
+    replay_cmd.add_argument("--fts", action="store_true", help="Treat --match as FTS5 syntax")
+    replay_cmd.add_argument("--out", default=None, help="CSV of rule outputs per document")
+    replay_cmd.add_argument("--baseline", default=None, help="Earlier --out CSV to compare against")
+
+    args = parser.parse_args()
+    if args.command != "build" and not Path(args.index).exists():
+        parser.error(f"{args.index} does not exist; run build first")
+    if args.command == "build" and not (args.pdf_dir or args.results_db):
+        parser.error("build needs --pdf-dir and/or --results-db")
+    handlers = {"build": _cmd_build, "query": _cmd_query, "replay": _cmd_replay}
+    try:
+        report = handlers[args.command](args)
+    except sqlite3.OperationalError as exc:
+        # Malformed FTS5 syntax surfaces here.
+        parser.error(str(exc))
+
+    if args.json_out:
+        out_path = Path(args.json_out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+from .cache import PdfCache
+
+T = TypeVar("T")
+
+DOWNLOAD_DIR = Path(tempfile.gettempdir()) / "aca_sbc_downloads"
+USER_AGENT = "aca-sbc-parser/1.0"
+TIMEOUT = (10, 60)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+FETCH_CHUNK = 64 * 1024
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+class RetryableHTTPError(requests.HTTPError):
+    pass
+
+
+@dataclass(frozen=True)
+class PdfBytes:
+    # A download held in memory and handed to the parser as-is; any cache write
+    # happens off the hot path.
+    data: bytes
+    sha256: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def make_session(pool_size: int = 16) -> requests.Session:
+    # One adapter pool per host, each holding up to pool_size keep-alive connections.
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def default_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = make_session()
+        return _session
+
+
+def is_remote(url: str) -> bool:
+    return urlsplit(url).scheme.lower() in {"http", "https"}
+
+
+_retrying = retry(
+    retry=retry_if_exception_type((requests.ConnectionError, requests.Timeout, RetryableHTTPError)),
+    stop=stop_after_attempt(4),
+    wait=wait_exponential(multiplier=0.5, max=8),
+    reraise=True,
+)
+
+
+def _modified(resp: requests.Response, url: str) -> bool:
+    # False for 304 Not Modified; raises for errors, retryable ones included.
+    if resp.status_code in RETRY_STATUS:
+        raise RetryableHTTPError(f"HTTP {resp.status_code} for {url}", response=resp)
+    if resp.status_code == 304:
+        return False
+    resp.raise_for_status()
+    return True
+
+
+@_retrying
+def _fetch(
+    session: requests.Session,
+    url: str,
+    dest: Path,
+    headers: Optional[dict[str, str]] = None,
+) -> CaseInsensitiveDict | None:
+    # Returns the response headers, or None when the server answered 304 Not Modified.
+    with session.get(url, stream=True, timeout=TIMEOUT, headers=headers) as resp:
+        if not _modified(resp, url):
+            return None
+        with open(dest, "wb") as fh:
+            for chunk in resp.iter_content(chunk_size=FETCH_CHUNK):
+                fh.write(chunk)
+        return resp.headers
+
+
+@_retrying
+def _fetch_bytes(
+    session: requests.Session,
+    url: str,
+    headers: Optional[dict[str, str]] = None,
+) -> tuple[bytes, CaseInsensitiveDict] | None:
+    # In-memory _fetch: the body and response headers, or None on 304 Not Modified.
+    with session.get(url, stream=True, timeout=TIMEOUT, headers=headers) as resp:
+        if not _modified(resp, url):
+            return None
+        return b"".join(resp.iter_content(chunk_size=FETCH_CHUNK)), resp.headers
+
+
+def _validators(etag: Optional[str], last_modified: Optional[str]) -> dict[str, str]:
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def fresh_hit(url: str, cache: Optional[PdfCache]) -> Optional[Path]:
+    # The cached blob for a URL already revalidated in this process, or None when it
+    # must be fetched (not fresh yet, or its blob was evicted since).
+    if cache is None or not cache.is_fresh(url):
+        return None
+    entry = cache.lookup(url)
+    return cache.hit(url, entry.sha256) if entry is not None else None
+
+
+def download_pdf(
+    url: str,
+    session: Optional[requests.Session] = None,
+    dest_dir: Optional[Path] = None,
+    cache: Optional[PdfCache] = None,
+) -> Path:
+    if not is_remote(url):
+        path = Path(url[7:] if url.lower().startswith("file://") else url)
+        if not path.is_file():
+            raise FileNotFoundError(f"PDF not found: {url}")
+        return path
+
+    entry = cache.lookup(url) if cache is not None else None
+    if entry is not None and cache.is_fresh(url):
+        return cache.hit(url, entry.sha256)
+
+    dest_dir = dest_dir or DOWNLOAD_DIR
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(suffix=".pdf", dir=dest_dir)
+    os.close(fd)
+    dest = Path(name)
+    try:
+        headers = _validators(entry.etag, entry.last_modified) if entry is not None else None
+        resp_headers = _fetch(session or default_session(), url, dest, headers=headers)
+        if resp_headers is None:
+            dest.unlink(missing_ok=True)
+            return cache.hit(url, entry.sha256)
+        if cache is not None:
+            return cache.put(
+                url,
+                dest,
+                etag=resp_headers.get("ETag"),
+                last_modified=resp_headers.get("Last-Modified"),
+            )
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    return dest
+
+
+def download_pdf_bytes(
+    url: str,
+    session: Optional[requests.Session] = None,
+    cache: Optional[PdfCache] = None,
+) -> Path | PdfBytes:
+    # download_pdf without the temp file: a fresh download comes back as PdfBytes and
+    # is not cached here (see PdfCache.put_bytes). Local files and cache hits are
+    # still paths, which the parser memory-maps.
+    if not is_remote(url):
+        return download_pdf(url)
+    entry = cache.lookup(url) if cache is not None else None
+    if entry is not None and cache.is_fresh(url):
+        return cache.hit(url, entry.sha256)
+    headers = _validators(entry.etag, entry.last_modified) if entry is not None else None
+    fetched = _fetch_bytes(session or default_session(), url, headers=headers)
+    if fetched is None:
+        return cache.hit(url, entry.sha256)
+    data, resp_headers = fetched
+    return PdfBytes(
+        data,
+        hashlib.sha256(data).hexdigest(),
+        etag=resp_headers.get("ETag"),
+        last_modified=resp_headers.get("Last-Modified"),
+    )
+
+
+def release(path: Path | PdfBytes, dest_dir: Optional[Path] = None, cache: Optional[PdfCache] = None) -> None:
+    # Hand back a file produced by download_pdf: cached blobs are unpinned, temp
+    # downloads are removed, and local input files are left alone.
+    if isinstance(path, PdfBytes):
+        return
+    path = Path(path)
+    if cache is not None and cache.unpin(path):
+        return
+    if path.parent == (dest_dir or DOWNLOAD_DIR):
+        path.unlink(missing_ok=True)
+
+
+class CacheWriter:
+    # Writes in-memory downloads to the cache on one background thread. Downloads whose
+    # write is still queued are kept by URL, so a repeated URL is served from memory
+    # rather than fetched again.
+    def __init__(self, cache: PdfCache) -> None:
+        self.cache = cache
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sbc-cache-write")
+        self._lock = threading.Lock()
+        self._queued: dict[str, PdfBytes] = {}
+
+    def queued(self, url: str) -> Optional[PdfBytes]:
+        with self._lock:
+            return self._queued.get(url)
+
+    def submit(self, url: str, body: PdfBytes) -> None:
+        with self._lock:
+            self._queued[url] = body
+        self._pool.submit(self._write, url, body)
+
+    def _write(self, url: str, body: PdfBytes) -> None:
+        try:
+            self.cache.put_bytes(url, body.data, body.sha256, etag=body.etag, last_modified=body.last_modified)
+        except OSError:
+            # Best effort: the document is parsed from memory either way, and an
+            # uncached URL is simply downloaded again next run.
+            pass
+        finally:
+            with self._lock:
+                self._queued.pop(url, None)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+class _HostLimiter:
+    def __init__(self, per_host: int) -> None:
+        self.per_host = max(1, per_host)
+        self._lock = threading.Lock()
+        self._sems: dict[str, threading.BoundedSemaphore] = {}
+
+    def __call__(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            sem = self._sems.get(host)
+            if sem is None:
+                sem = self._sems[host] = threading.BoundedSemaphore(self.per_host)
+            return sem
+
+
+def prefetch(
+    items: Iterable[tuple[T, str]],
+    workers: int = 4,
+    ahead: int = 32,
+    per_host: int = 4,
+    session: Optional[requests.Session] = None,
+    dest_dir: Optional[Path] = None,
+    cache: Optional[PdfCache] = None,
+    on_fetched: Optional[Callable[[T, float], None]] = None,
+    in_memory: bool = False,
+) -> Iterator[tuple[T, Path | PdfBytes | BaseException]]:
+    # Downloads up to `ahead` items beyond the consumer on a thread pool and yields
+    # (item, path-or-exception) in input order. The window bounds how many
+    # fetched-but-unparsed files can sit on disk (or, with in_memory, in memory) at
+    # once. on_fetched(item, seconds) is called from the download thread with the
+    # fetch time, including per-host waits. With in_memory, fresh downloads are
+    # yielded as PdfBytes and written to the cache by a single background writer.
+    workers = max(1, workers)
+    ahead = max(1, ahead)
+    session = session or make_session(pool_size=max(workers, per_host))
+    limiter = _HostLimiter(per_host)
+    writer = CacheWriter(cache) if in_memory and cache is not None else None
+
+    def fetch(url: str) -> Path | PdfBytes:
+        if not is_remote(url):
+            return download_pdf(url)
+        body = writer.queued(url) if writer is not None else None
+        if body is not None:
+            return body
+        hit = fresh_hit(url, cache)
+        if hit is not None:
+            return hit
+        with limiter(url):
+            if not in_memory:
+                return download_pdf(url, session=session, dest_dir=dest_dir, cache=cache)
+            body = download_pdf_bytes(url, session=session, cache=cache)
+        if isinstance(body, PdfBytes) and writer is not None:
+            writer.submit(url, body)
+        return body
+
+    def fetch_timed(item: T, url: str) -> Path | PdfBytes:
+        start = time.perf_counter()
+        try:
+            return fetch(url)
+        finally:
+            on_fetched(item, time.perf_counter() - start)
+
+    pending: deque[tuple[T, Future]] = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sbc-fetch") as pool:
+        try:
+            for item, url in items:
+                job = pool.submit(fetch_timed, item, url) if on_fetched is not None else pool.submit(fetch, url)
+                pending.append((item, job))
+                if len(pending) >= ahead:
+                    yield _take(pending)
+            while pending:
+                yield _take(pending)
+        finally:
+            # Consumer stopped early: drop queued work and clean up finished downloads.
+            for _, job in pending:
+                job.cancel()
+            pool.shutdown(wait=True)
+            for _, job in pending:
+                if job.done() and not job.cancelled() and job.exception() is None:
+                    release(job.result(), dest_dir, cache)
+            if writer is not None:
+                writer.close()
+
+
+def _take(pending: deque[tuple[T, Future]]) -> tuple[T, Path | PdfBytes | BaseException]:
+    item, job = pending.popleft()
+    try:
+        return item, job.result()
+    except Exception as exc:
+        return item, exc
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import csv
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .manifest import load_manifest, manifest_path
+from .output import FIELD_COLUMNS, SINKS, OutputRow
+
+LEDGER_COLUMNS = ["row", "url", "sha256"]
+
+
+def ledger_path(out_path: Path) -> Path:
+    return out_path.with_name(out_path.name + ".rows.csv")
+
+
+# One line per output row, in output order: input row index, URL and document sha256
+# (blank when unknown). The output itself has no URL column, so this is what lets a
+# later --incremental run match its rows to the new input, and what maps shard output
+# rows back to input rows. Written at each checkpoint together with the output; the
+# manifest records tell() so a resume truncates both to the same row.
+class RowLedger:
+    def __init__(self, path: Path, append: bool = False) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        existing = append and self.path.exists() and self.path.stat().st_size > 0
+        self._fh = open(self.path, "a" if existing else "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._fh)
+        if not existing:
+            self._writer.writerow(LEDGER_COLUMNS)
+        self._pending: list[tuple[int, str, str]] = []
+
+    def record(self, idx: int, url: str, sha256: Optional[str]) -> None:
+        self._pending.append((idx, url, sha256 or ""))
+
+    def flush(self) -> None:
+        self._writer.writerows(self._pending)
+        self._pending.clear()
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def tell(self) -> int:
+        return self._fh.tell()
+
+    def close(self) -> None:
+        self._fh.close()
+
+    @staticmethod
+    def truncate(path: Path, offset: int) -> None:
+        if path.exists() and path.stat().st_size > offset:
+            os.truncate(path, offset)
+
+
+def read_ledger(path: Path, end: Optional[int] = None) -> list[tuple[int, str, str]]:
+    # Entries up to byte offset end (the last checkpoint), or the whole file.
+    with open(path, "rb") as fh:
+        data = fh.read() if end is None else fh.read(end)
+    reader = csv.reader(data.decode("utf-8").splitlines())
+    next(reader, None)
+    return [(int(idx), url, sha256) for idx, url, sha256 in reader]
+
+
+@dataclass(slots=True)
+class PreviousResult:
+    sha256: str
+    # FIELD_COLUMNS values followed by error, as written to the previous output.
+    values: OutputRow
+
+    @property
+    def error(self) -> Optional[str]:
+        return self.values[-1]
+
+
+def load_previous(out_path: Path) -> dict[str, PreviousResult]:
+    # Previous results by URL, for rows up to the last checkpoint. A row sharing its
+    # URL with an earlier one replaces it unless it failed where the earlier one did
+    # not.
+    manifest = load_manifest(manifest_path(out_path))
+    if manifest is not None:
+        output_format, end = manifest.output_format, manifest.ledger_offset or None
+    else:
+        output_format, end = ("parquet" if out_path.is_dir() else "csv"), None
+    ledger = read_ledger(ledger_path(out_path), end)
+    rows = SINKS[output_format].read_rows(out_path)
+    previous: dict[str, PreviousResult] = {}
+    for (_, url, sha256), row in zip(ledger, rows):
+        result = PreviousResult(sha256, tuple(row[3:]))
+        known = previous.get(url)
+        if known is None or known.error or not result.error:
+            previous[url] = result
+    return previous
+
+
+def parse_field_list(text: str) -> list[int]:
+    # "OON COP,INN COP" -> positions in FIELD_COLUMNS.
+    names = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in names if name not in FIELD_COLUMNS]
+    if unknown:
+        raise ValueError(f"unknown field(s) {', '.join(unknown)}; expected some of {', '.join(FIELD_COLUMNS)}")
+    return [FIELD_COLUMNS.index(name) for name in names]
+
+
+def reprocess_reason(previous: dict[str, PreviousResult], url: str, refresh_blank: Sequence[int]) -> Optional[str]:
+    # Why a row cannot reuse its previous result, or None when it can.
+    result = previous.get(url)
+    if result is None:
+        return "new_url"
+    if result.error:
+        return "error"
+    if any(not result.values[pos] for pos in refresh_blank):
+        return "blank"
+    return None
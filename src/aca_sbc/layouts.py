@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+# Layout fingerprints and the registry of known SBC templates. Most SBCs come from a
+# few issuer templates; for a registered fingerprint parse.py reads the Important
+# Questions answers and the outpatient row at the recorded coordinates instead of
+# scanning every table row. Templates are derived and parity-checked against the
+# generic scan by scripts/layout_templates.py, which writes them to a JSON file of
+# the caller's choosing; the registry is empty (no fast path) until one is loaded
+# with use_templates().
+
+# Path of the loaded registry, inherited by worker processes (spawned ones included).
+TEMPLATES_ENV = "ACA_SBC_LAYOUT_TEMPLATES"
+
+_NUMBER_RE = re.compile(r"[0-9][0-9,.]*")
+
+# (table, row, column) and (table, row) positions inside Extraction.tables.
+Cell = tuple[int, int, int]
+Row = tuple[int, int]
+
+
+@dataclass(frozen=True)
+class LayoutTemplate:
+    name: str
+    deductible: Cell
+    oop: Cell
+    outpatient: Row
+    # Header column types of the outpatient table, as rules.column_type() infers them.
+    col_types: tuple[str, ...]
+    # cell_label() of the deductible and OOP rows' first cell and of the outpatient
+    # row's service cell.
+    labels: tuple[str, str, str]
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> LayoutTemplate:
+        return cls(
+            name=payload["name"],
+            deductible=tuple(payload["deductible"]),
+            oop=tuple(payload["oop"]),
+            outpatient=tuple(payload["outpatient"]),
+            col_types=tuple(payload["col_types"]),
+            labels=tuple(payload["labels"]),
+        )
+
+
+def cell_label(cell: Optional[str]) -> str:
+    # Plan-specific numbers (years, amounts) are masked so one template matches all
+    # of its plans.
+    return _NUMBER_RE.sub("#", " ".join((cell or "").split()).lower())
+
+
+def layout_fingerprint(tables: list[list[list[str]]], engine: str) -> str:
+    # Engine, then per table its row and column counts and header row text. Tables
+    # differ by engine, so each engine gets its own templates.
+    digest = hashlib.sha1(engine.encode("utf-8"))
+    for table in tables:
+        header = table[0] if table else []
+        digest.update(f"\n{len(table)}x{len(header)}|".encode("utf-8"))
+        digest.update("|".join(cell_label(cell) for cell in header).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def load_templates(path: Path) -> dict[str, LayoutTemplate]:
+    payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    return {fingerprint: LayoutTemplate.from_dict(entry) for fingerprint, entry in payload.items()}
+
+
+def save_templates(templates: dict[str, LayoutTemplate], path: Path) -> None:
+    payload = {fingerprint: asdict(template) for fingerprint, template in sorted(templates.items())}
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+
+
+def use_templates(path: Optional[Path]) -> None:
+    # Loads the registry for this process and the parse workers it starts; None
+    # turns the fast path off.
+    global TEMPLATES
+    if path is None:
+        TEMPLATES = {}
+        os.environ.pop(TEMPLATES_ENV, None)
+        return
+    TEMPLATES = load_templates(path)
+    os.environ[TEMPLATES_ENV] = str(Path(path).resolve())
+
+
+def templates_digest() -> str:
+    # Canonical text of the loaded registry, for the rules fingerprint.
+    return json.dumps({fingerprint: asdict(template) for fingerprint, template in sorted(TEMPLATES.items())})
+
+
+TEMPLATES: dict[str, LayoutTemplate] = {}
+if os.environ.get(TEMPLATES_ENV):
+    TEMPLATES = load_templates(Path(os.environ[TEMPLATES_ENV]))
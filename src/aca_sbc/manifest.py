@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from .output import OutputRow
+
+MANIFEST_VERSION = 2
+
+
+def manifest_path(out_path: Path) -> Path:
+    return out_path.with_name(out_path.name + ".manifest.json")
+
+
+# Sidecar written atomically after every checkpoint. committed_rows input rows are
+# durably in the output, which ends exactly at output_offset at that point (bytes for
+# CSV, part files for Parquet); the row ledger ends at ledger_offset. completed holds
+# rows that finished out of order past the checkpoint, keyed by input index, as the
+# document sha256 (None when the download failed) and the values in OUTPUT_COLUMNS
+# order, so a resumed run neither redoes them nor loses their ledger hash. shard is
+# "K/N" for --shard runs, whose output holds only that shard's rows.
+@dataclass
+class RunManifest:
+    input_sha256: str
+    output_format: str = "csv"
+    committed_rows: int = 0
+    output_offset: int = 0
+    ledger_offset: int = 0
+    shard: Optional[str] = None
+    completed: dict[int, tuple[Optional[str], OutputRow]] = field(default_factory=dict)
+    version: int = MANIFEST_VERSION
+
+    def save(self, path: Path) -> None:
+        tmp = path.with_name(path.name + ".tmp")
+        payload = asdict(self)
+        payload["completed"] = {
+            str(idx): {"sha256": sha256, "row": list(row)} for idx, (sha256, row) in self.completed.items()
+        }
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+
+def load_manifest(path: Path) -> Optional[RunManifest]:
+    if not path.exists():
+        return None
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    if payload.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"{path}: unsupported manifest version {payload.get('version')}")
+    payload["completed"] = {
+        int(idx): (entry["sha256"], tuple(entry["row"])) for idx, entry in payload.get("completed", {}).items()
+    }
+    return RunManifest(**payload)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Iterator
+
+from .cache import file_sha256
+from .incremental import RowLedger, ledger_path, read_ledger
+from .manifest import RunManifest, load_manifest, manifest_path
+from .output import SINKS, ColumnBuffer, OutputRow
+from .shard import Shard, shard_path
+from .tracker import cell, detect_url_column, iter_input, read_columns
+
+SAMPLE_ROWS = 50
+WRITE_BATCH = 1000
+
+
+def _shard_rows(
+    shard: Shard,
+    out_path: Path,
+    manifest: RunManifest,
+    info: dict[str, Any],
+) -> Iterator[tuple[int, str, str, OutputRow, Shard, dict[str, Any]]]:
+    # (input index, url, sha256, row, shard, info) for every row up to the shard's
+    # last checkpoint.
+    ledger = read_ledger(ledger_path(out_path), manifest.ledger_offset or None)
+    rows = SINKS[manifest.output_format].read_rows(out_path)
+    for (idx, url, sha256), row in zip(ledger, rows):
+        yield idx, url, sha256, row, shard, info
+
+
+def merge_shards(csv_path: Path, out_path: Path, count: int, url_col: str | None = None) -> dict[str, Any]:
+    # Reassembles the outputs of --shard 1/N .. N/N into out_path in input order and
+    # reports input rows that no shard produced, rows produced more than once, and
+    # rows that sit in the wrong shard or whose URL no longer matches the input.
+    columns = read_columns(csv_path)
+    url_col = url_col or detect_url_column(columns)
+    urls = [cell(row, url_col) for row in iter_input(csv_path)]
+    input_sha256 = file_sha256(csv_path)
+
+    shards = []
+    streams = []
+    formats = set()
+    for index in range(1, count + 1):
+        shard = Shard(index, count)
+        path = shard_path(out_path, shard)
+        manifest = load_manifest(manifest_path(path))
+        info: dict[str, Any] = {"shard": shard.label, "output": str(path)}
+        shards.append(info)
+        if manifest is None or not path.exists():
+            info["status"] = "missing"
+            continue
+        if manifest.input_sha256 != input_sha256:
+            info["status"] = "input_changed"
+            continue
+        if manifest.shard != shard.label:
+            info["status"] = f"manifest_is_for_{manifest.shard}"
+            continue
+        info["status"] = "ok"
+        info["rows"] = 0
+        formats.add(manifest.output_format)
+        streams.append(_shard_rows(shard, path, manifest, info))
+    if len(formats) > 1:
+        raise ValueError(f"shards mix output formats: {sorted(formats)}")
+    output_format = formats.pop() if formats else "csv"
+
+    seen = bytearray(len(urls))
+    duplicates: list[int] = []
+    misplaced: list[int] = []
+    written = 0
+    # The manifest of an earlier merge no longer describes what is written below.
+    manifest_path(out_path).unlink(missing_ok=True)
+    sink = SINKS[output_format](out_path, append=False)
+    ledger = RowLedger(ledger_path(out_path))
+    buffer = ColumnBuffer()
+    for idx, url, sha256, row, shard, info in heapq.merge(*streams, key=itemgetter(0)):
+        info["rows"] += 1
+        if idx >= len(urls) or url != urls[idx] or not shard.owns(idx, url):
+            misplaced.append(idx)
+            continue
+        if seen[idx]:
+            duplicates.append(idx)
+            continue
+        seen[idx] = 1
+        buffer.append(row)
+        ledger.record(idx, url, sha256)
+        written += 1
+        if len(buffer) >= WRITE_BATCH:
+            sink.write(buffer)
+            buffer.clear()
+    sink.write(buffer)
+    ledger.flush()
+    missing = [idx for idx, flag in enumerate(seen) if not flag]
+    # A complete merge is written like a finished run. With gaps there is no row
+    # count a --resume could continue from, so there is no manifest; --incremental
+    # still reads the output through its ledger, and the missing rows count as new
+    # URLs there.
+    if not (missing or duplicates or misplaced):
+        RunManifest(
+            input_sha256=input_sha256,
+            output_format=output_format,
+            committed_rows=written,
+            output_offset=sink.tell(),
+            ledger_offset=ledger.tell(),
+        ).save(manifest_path(out_path))
+    sink.close()
+    ledger.close()
+
+    return {
+        "input_rows": len(urls),
+        "written_rows": written,
+        "output": str(out_path),
+        "output_format": output_format,
+        "shards": shards,
+        "missing": len(missing),
+        "missing_rows": missing[:SAMPLE_ROWS],
+        "duplicates": len(duplicates),
+        "duplicate_rows": duplicates[:SAMPLE_ROWS],
+        "misplaced": len(misplaced),
+        "misplaced_rows": misplaced[:SAMPLE_ROWS],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Merge --shard K/N outputs back into one output in input order")
+    parser.add_argument("--csv", required=True, help="Input CSV the shards were run on")
+    parser.add_argument("--out", required=True, help="The --out path the shards were given; the merged output is written here")
+    parser.add_argument("--shards", type=int, required=True, help="Shard count N")
+    parser.add_argument("--url-col", default=None, help="URL column name")
+    parser.add_argument("--overwrite", action="store_true", help="Replace an existing merged output instead of refusing to start")
+    parser.add_argument("--json-out", default=None, help="Optional JSON report path")
+    args = parser.parse_args()
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if Path(args.out).exists() and not args.overwrite:
+        parser.error(f"{args.out} already exists; pass --overwrite to replace it")
+
+    try:
+        report = merge_shards(Path(args.csv), Path(args.out), args.shards, args.url_col)
+    except (RuntimeError, ValueError) as exc:
+        parser.error(str(exc))
+
+    print(f"input_rows={report['input_rows']} written={report['written_rows']} missing={report['missing']} duplicates={report['duplicates']} misplaced={report['misplaced']}")
+    for info in report["shards"]:
+        print(f"  shard {info['shard']}: {info['status']} rows={info.get('rows', 0)}")
+    for name in ("missing", "duplicate", "misplaced"):
+        rows = report[f"{name}_rows"]
+        if rows:
+            print(f"  {name} rows (first {len(rows)}): {', '.join(str(idx) for idx in rows)}")
+
+    if args.json_out:
+        out_path = Path(args.json_out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    return 1 if report["missing"] or report["duplicates"] or report["misplaced"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
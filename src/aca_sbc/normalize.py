@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Typed view of the display strings _normalize_value emits ("$8,500",
+# "20% coinsurance", "No charge", ...). The CSV schema stays text-only; these
+# columns are derived from it, one vectorized pass per field.
+
+
+class Flag(str, Enum):
+    NOT_COVERED = "not_covered"
+    UNLIMITED = "unlimited"
+    NO_CHARGE = "no_charge"
+
+
+# Checked in order; the first match sets the flag. "No copay"/"No coinsurance" are
+# no-charge for the cost share they name.
+FLAG_PATTERNS: tuple[tuple[Flag, str], ...] = (
+    (Flag.NOT_COVERED, r"\bnot[- ]covered\b"),
+    (Flag.UNLIMITED, r"\bunlimited\b"),
+    (Flag.NO_CHARGE, r"\b(?:no charge|no cost|covered in full|no copay(?:ment)?|no coinsurance)\b"),
+)
+AMOUNT_PATTERN = r"\$\s*(?P<dollars>[0-9][0-9,]*)(?:\.(?P<cents>[0-9]{2}))?"
+BARE_ZERO_PATTERN = r"^\s*0+(?:\.0+)?\s*$"
+PERCENT_PATTERN = r"(?P<percent>[0-9]+(?:\.[0-9]+)?)\s*%"
+
+_AMOUNT_RE = re.compile(AMOUNT_PATTERN)
+_BARE_ZERO_RE = re.compile(BARE_ZERO_PATTERN)
+_PERCENT_RE = re.compile(PERCENT_PATTERN)
+_FLAG_RES = tuple((flag, re.compile(pattern, re.I)) for flag, pattern in FLAG_PATTERNS)
+
+
+@dataclass(slots=True)
+class TypedValue:
+    amount_cents: Optional[int] = None
+    percent: Optional[float] = None
+    flag: Optional[Flag] = None
+
+
+def typed_value(text: Optional[str]) -> TypedValue:
+    # Scalar form of typed_columns(), for callers holding a single ParsedBenefits.
+    if not text:
+        return TypedValue()
+    value = TypedValue()
+    for flag, pattern in _FLAG_RES:
+        if pattern.search(text):
+            value.flag = flag
+            break
+    m = _AMOUNT_RE.search(text)
+    if m:
+        value.amount_cents = int(m.group("dollars").replace(",", "")) * 100 + int(m.group("cents") or 0)
+    elif _BARE_ZERO_RE.match(text):
+        value.amount_cents = 0
+    m = _PERCENT_RE.search(text)
+    if m:
+        value.percent = float(m.group("percent"))
+    return value
+
+
+def typed_columns(values: pd.Series) -> pd.DataFrame:
+    # Vectorized typed_value() over a whole column: nullable amount_cents (Int64),
+    # percent (Float64) and flag (category of Flag values). Output columns take few
+    # distinct values, so the regexes run once per distinct value and the results
+    # are expanded back by position.
+    codes, uniques = pd.factorize(values)
+    typed = _typed_distinct(pd.Series(uniques, dtype=object))
+    # Each array gets a trailing missing entry, which code -1 (missing input) selects.
+    amount = np.append(typed["amount_cents"].to_numpy(dtype=float, na_value=np.nan), np.nan)[codes]
+    percent = np.append(typed["percent"].to_numpy(dtype=float, na_value=np.nan), np.nan)[codes]
+    flag = np.append(typed["flag"].to_numpy(dtype=object), None)[codes]
+    return pd.DataFrame(
+        {
+            "amount_cents": pd.array(amount, dtype="Int64"),
+            "percent": pd.array(percent, dtype="Float64"),
+            "flag": pd.Categorical(flag, categories=[f.value for f in Flag]),
+        },
+        index=values.index,
+    )
+
+
+def _typed_distinct(values: pd.Series) -> pd.DataFrame:
+    text = values.astype("string")
+    amounts = text.str.extract(AMOUNT_PATTERN)
+    dollars = pd.to_numeric(amounts["dollars"].str.replace(",", "", regex=False), errors="coerce")
+    cents = pd.to_numeric(amounts["cents"], errors="coerce").fillna(0)
+    amount_cents = (dollars * 100 + cents).astype("Int64")
+    amount_cents = amount_cents.mask(amount_cents.isna() & text.str.match(BARE_ZERO_PATTERN).fillna(False), 0)
+    percent = pd.to_numeric(text.str.extract(PERCENT_PATTERN)["percent"], errors="coerce").astype("Float64")
+    conditions = [text.str.contains(pattern, case=False, regex=True).fillna(False).to_numpy(bool) for _, pattern in FLAG_PATTERNS]
+    flag = np.select(conditions, [flag.value for flag, _ in FLAG_PATTERNS], default=None)
+    return pd.DataFrame({"amount_cents": amount_cents, "percent": percent, "flag": flag}, index=values.index)
+
+
+def typed_frame(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    # One typed block per display column, named "<column> cents", "<column> pct" and
+    # "<column> flag", ready to sit next to the display strings.
+    parts = []
+    for column in columns:
+        typed = typed_columns(df[column])
+        typed.columns = [f"{column} cents", f"{column} pct", f"{column} flag"]
+        parts.append(typed)
+    return pd.concat(parts, axis=1) if parts else pd.DataFrame(index=df.index)
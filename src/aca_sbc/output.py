@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import csv
+import os
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional; only needed for --out-format parquet
+    pa = pq = None
+
+FIELD_COLUMNS = [
+    "INN DED",
+    "INN OOP",
+    "INN COI",
+    "INN COP",
+    "OON DED",
+    "OON OOP",
+    "OON COI",
+    "OON COP",
+]
+# Every output file carries the same columns in the same order, including "error",
+# so checkpoint chunks can never disagree about the header.
+OUTPUT_COLUMNS = ["STATE", "NETWORK", "PAYER NAME/PLAN", *FIELD_COLUMNS, "error"]
+# Outputs written before the error column existed; --resume keeps appending to them
+# in this layout.
+LEGACY_COLUMNS = OUTPUT_COLUMNS[:-1]
+OUTPUT_FORMATS = ("csv", "parquet")
+
+# One output row: values in OUTPUT_COLUMNS order, None for blank.
+OutputRow = tuple[Optional[str], ...]
+
+
+# Rows buffered between checkpoints, stored column-wise. Equal values share one
+# string object (the output is dominated by a few values such as "No charge" and
+# "Not Covered"), and the Parquet sink can hand each column to Arrow as-is.
+class ColumnBuffer:
+    def __init__(self, columns: Sequence[str] = OUTPUT_COLUMNS) -> None:
+        self.columns = list(columns)
+        self.data: list[list[Optional[str]]] = [[] for _ in self.columns]
+        self._strings: dict[str, str] = {}
+
+    def append(self, row: Sequence[Optional[str]]) -> None:
+        strings = self._strings
+        for column, value in zip(self.data, row):
+            column.append(strings.setdefault(value, value) if value else value)
+
+    def rows(self) -> Iterator[OutputRow]:
+        return zip(*self.data)
+
+    def clear(self) -> None:
+        for column in self.data:
+            column.clear()
+        self._strings.clear()
+
+    def __len__(self) -> int:
+        return len(self.data[0]) if self.data else 0
+
+
+def read_header(path: Path) -> Optional[list[str]]:
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        return next(csv.reader(fh), None)
+
+
+# CSV writer kept open for the whole run. write() is called once per checkpoint and
+# returns only after the rows are flushed and fsynced. With append=False an
+# existing file is replaced; with append=True (resume) its header must match, or be
+# the legacy layout, whose rows are then written without the error column.
+# tell() is the byte offset the manifest records; truncate() rolls back to it.
+class CsvSink:
+    def __init__(self, path: Path, columns: list[str] = OUTPUT_COLUMNS, append: bool = False) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        existing = read_header(self.path) if append else None
+        self.legacy = existing is not None and columns == OUTPUT_COLUMNS and existing == LEGACY_COLUMNS
+        if existing is not None and existing != columns and not self.legacy:
+            raise ValueError(f"{self.path} has columns {existing}, expected {columns}")
+        self._fh = open(self.path, "a" if append else "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._fh)
+        if existing is None:
+            self._writer.writerow(columns)
+
+    def write(self, rows: ColumnBuffer) -> None:
+        if self.legacy:
+            self._writer.writerows(row[:-1] for row in rows.rows())
+        else:
+            self._writer.writerows(rows.rows())
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def tell(self) -> int:
+        return self._fh.tell()
+
+    def close(self) -> None:
+        self._fh.close()
+
+    @staticmethod
+    def truncate(path: Path, offset: int) -> None:
+        # Drop anything written after the last checkpoint (e.g. a torn final row).
+        if path.stat().st_size > offset:
+            os.truncate(path, offset)
+
+    @staticmethod
+    def count_rows(path: Path) -> int:
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            return max(0, sum(1 for _ in csv.reader(fh)) - 1)
+
+    @staticmethod
+    def read_rows(path: Path) -> Iterator[OutputRow]:
+        # Always in OUTPUT_COLUMNS order; legacy rows get a blank error.
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            reader = csv.reader(fh)
+            pad = (None,) if next(reader, None) == LEGACY_COLUMNS else ()
+            for row in reader:
+                yield tuple(value or None for value in row) + pad
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("--out-format parquet needs pyarrow (pip install pyarrow)")
+
+
+# Parquet output as a directory of part files, one per checkpoint, each holding a
+# single row group. A part is complete (footer written and fsynced) before the
+# manifest records it, so resume just deletes parts past the recorded count; a
+# single growing file would be unreadable after a crash. Columns are stored
+# dictionary-encoded, which suits the few distinct values each field takes.
+class ParquetSink:
+    def __init__(self, path: Path, columns: list[str] = OUTPUT_COLUMNS, append: bool = False) -> None:
+        _require_pyarrow()
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.schema = pa.schema([(name, pa.dictionary(pa.int32(), pa.string())) for name in self.columns])
+        self.path.mkdir(parents=True, exist_ok=True)
+        existing = self._parts(self.path)
+        if append and existing:
+            names = pq.read_schema(existing[0]).names
+            if names != self.columns:
+                raise ValueError(f"{self.path} has columns {names}, expected {self.columns}")
+        elif not append:
+            for part in existing:
+                part.unlink()
+            existing = []
+        self._next = len(existing)
+
+    @staticmethod
+    def _parts(path: Path) -> list[Path]:
+        return sorted(path.glob("part-*.parquet")) if path.is_dir() else []
+
+    def write(self, rows: ColumnBuffer) -> None:
+        if not len(rows):
+            return
+        arrays = [pa.array(column, type=pa.string()).dictionary_encode() for column in rows.data]
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+        part = self.path / f"part-{self._next:05d}.parquet"
+        tmp = part.with_name(part.name + ".tmp")
+        pq.write_table(table, tmp, row_group_size=len(rows), use_dictionary=True, compression="zstd")
+        with open(tmp, "rb") as fh:
+            os.fsync(fh.fileno())
+        os.replace(tmp, part)
+        self._next += 1
+
+    def tell(self) -> int:
+        return self._next
+
+    def close(self) -> None:
+        pass
+
+    @staticmethod
+    def truncate(path: Path, offset: int) -> None:
+        for part in ParquetSink._parts(path)[offset:]:
+            part.unlink()
+        for tmp in path.glob("part-*.parquet.tmp"):
+            tmp.unlink()
+
+    @staticmethod
+    def count_rows(path: Path) -> int:
+        _require_pyarrow()
+        return sum(pq.read_metadata(part).num_rows for part in ParquetSink._parts(path))
+
+    @staticmethod
+    def read_rows(path: Path) -> Iterator[OutputRow]:
+        # None for blank, as CsvSink reads it back.
+        _require_pyarrow()
+        for part in ParquetSink._parts(path):
+            for batch in pq.ParquetFile(part).iter_batches():
+                for row in zip(*(column.to_pylist() for column in batch.columns)):
+                    yield tuple(value or None for value in row)
+
+
+Sink = Union[CsvSink, ParquetSink]
+SINKS: dict[str, type] = {"csv": CsvSink, "parquet": ParquetSink}
@@ -1,19 +1,32 @@
 ﻿from __future__ import annotations
 
-import re
-from dataclasses import dataclass
-from typing import Optional
-
+import hashlib
+import inspect
+import io
+import mmap
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Union
+
+import fitz
 import pdfplumber
 
-NO_COPAY_RE = re.compile(r"\b(no copay|no copayment)\b", re.I)
-NO_COINS_RE = re.compile(r"\b(no coinsurance)\b", re.I)
-NO_CHARGE_RE = re.compile(r"\b(no charge|no cost|covered in full)\b", re.I)
-UNLIMITED_RE = re.compile(r"\bunlimited\b", re.I)
-ZERO_RE = re.compile(r"^0+(?:\.0+)?$")
-MONEY_RE = re.compile(r"\$\s*([0-9][0-9,]*)")
+from . import layouts, rules, timing
+from .layouts import LayoutTemplate, cell_label, layout_fingerprint
+from .rules import MONEY_RE, NO_CHARGE_RE, NO_COINS_RE, NO_COPAY_RE, UNLIMITED_RE, ZERO_RE
 
-@dataclass
+TEXT_PAGES = 5
+ENGINE_CHOICES = ("pdfplumber", "pymupdf", "auto")
+
+# A PDF on disk, its bytes, or a binary file object positioned at its start.
+PdfSource = Union[str, os.PathLike, bytes, bytearray, BinaryIO]
+
+@dataclass(slots=True)
 class ParsedBenefits:
     inn_deductible: Optional[str]
     oon_deductible: Optional[str]
@@ -25,6 +38,95 @@ class ParsedBenefits:
     oon_iop_copay: Optional[str]
 
 
+@dataclass
+class Extraction:
+    # Raw engine output that the rules run over; expensive to produce, cheap to replay.
+    # page_texts may be a prefix of the first TEXT_PAGES pages: text is only read when
+    # a table field is unresolved, through text_source, until text_complete.
+    tables: list[list[list[str]]]
+    page_texts: list[str]
+    engine: str = "pdfplumber"
+    text_complete: bool = True
+    text_source: Optional[_PageTextSource] = field(default=None, repr=False, compare=False)
+
+    def payload(self) -> dict:
+        # Storable form; the text source is a live handle and never persisted.
+        return {
+            "tables": self.tables,
+            "page_texts": self.page_texts,
+            "engine": self.engine,
+            "text_complete": self.text_complete,
+        }
+
+
+def _map_file(path: str) -> Optional[mmap.mmap]:
+    try:
+        with open(path, "rb") as fh:
+            return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # Empty files cannot be mapped; let pdfplumber report those itself.
+        return None
+
+
+class Document:
+    # One PDF as every engine opens it. Paths are mapped rather than read through a
+    # buffered file, so pdfplumber's many small seeks hit the page cache directly;
+    # bytes (an in-memory download) are opened in place. File objects are read once.
+    def __init__(self, source: PdfSource) -> None:
+        if isinstance(source, (bytes, bytearray)):
+            self.path, self.data = None, source
+        elif hasattr(source, "read"):
+            self.path, self.data = None, source.read()
+        else:
+            self.path, self.data = os.fspath(source), None
+
+    def open_fitz(self) -> fitz.Document:
+        if self.data is None:
+            return fitz.open(self.path)
+        return fitz.open(stream=self.data, filetype="pdf")
+
+    def open_plumber(self) -> pdfplumber.PDF:
+        if self.data is not None:
+            return pdfplumber.open(io.BytesIO(self.data))
+        mapped = _map_file(self.path)
+        if mapped is None:
+            return pdfplumber.open(self.path)
+        try:
+            pdf = pdfplumber.open(mapped)
+        except BaseException:
+            mapped.close()
+            raise
+        # pdfplumber leaves caller-supplied streams open; the map is ours to release.
+        pdf.stream_is_external = False
+        return pdf
+
+
+def as_document(source: Union[PdfSource, Document]) -> Document:
+    return source if isinstance(source, Document) else Document(source)
+
+
+class _PageTextSource:
+    # Reads pdfplumber page text on demand. It takes over the PDF left open by the
+    # table pass (whose parsed page objects make text cheap) or opens it on first use,
+    # and is closed by parse_extraction once the fallbacks are settled.
+    def __init__(self, doc: Document, pdf=None) -> None:
+        self.doc = doc
+        self._pdf = pdf
+
+    def __call__(self, idx: int) -> Optional[str]:
+        with timing.stage("extract_text"):
+            if self._pdf is None:
+                self._pdf = self.doc.open_plumber()
+            if idx >= len(self._pdf.pages):
+                return None
+            return self._pdf.pages[idx].extract_text() or ""
+
+    def close(self) -> None:
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+
 def _normalize_value(value: Optional[str]) -> Optional[str]:
     if value is None:
         return None
@@ -42,14 +144,15 @@ def _normalize_value(value: Optional[str]) -> Optional[str]:
         return "No coinsurance"
     if UNLIMITED_RE.search(low):
         return "Unlimited"
-    text = re.sub(r"\$\s+([0-9])", r"$\1", text)
-    text = re.sub(r"([0-9])\s+%", r"\1%", text)
-    text = re.sub(r"\s+([,.;:])", r"\1", text)
+    text = rules.DOLLAR_GAP_RE.sub(r"$\1", text)
+    text = rules.PERCENT_GAP_RE.sub(r"\1%", text)
+    text = rules.PUNCT_GAP_RE.sub(r"\1", text)
     return text.strip()
 
 
 def _normalize(text: str) -> str:
-    return re.sub(r"\s+", " ", text).strip().lower()
+    # str.split() and the regex \s agree on what counts as whitespace; split is faster.
+    return " ".join(text.split()).lower()
 
 
 def _extract_important_questions(text: str) -> tuple[Optional[str], Optional[str]]:
@@ -78,15 +181,15 @@ def _parse_cost_share(cell: str) -> tuple[Optional[str], Optional[str]]:
     if NO_CHARGE_RE.search(text) and not copay and not coins:
         copay = "No charge"
         coins = "No charge"
-    m = re.search(r"\$[0-9,]+[^;\\n]*?copayment[^;\\n]*", text, re.I)
+    m = rules.COPAYMENT_PHRASE_RE.search(text)
     if m:
         copay = m.group(0).strip()
     # If "other outpatient" appears, prefer the last $ amount in the cell.
-    if "other outpatient" in text.lower():
-        amounts = re.findall(r"\$([0-9,]+)", text)
+    if rules.OTHER_OUTPATIENT.matches(text.lower()):
+        amounts = rules.DOLLAR_AMOUNT_RE.findall(text)
         if amounts:
             copay = f"${amounts[-1]} copayment/visit"
-    m = re.search(r"[0-9]+%\s*coinsurance[^;\n]*", text, re.I)
+    m = rules.COINSURANCE_PHRASE_RE.search(text)
     if m:
         coins = m.group(0).strip()
     return coins, copay
@@ -104,7 +207,7 @@ def _first_amount_token(text: str) -> Optional[str]:
         return f"${m.group(1)}"
     if ZERO_RE.fullmatch(text.strip()):
         return "0"
-    m = re.search(r"\b0\b", text)
+    m = rules.ZERO_TOKEN_RE.search(text)
     if m:
         return "0"
     return None
@@ -122,17 +225,17 @@ def _extract_in_out_from_sentence(text: str) -> tuple[Optional[str], Optional[st
 
     # In-network amount often appears before the "for in-network" marker.
     if "for in-network" in t_lower or "for in network" in t_lower:
-        parts = re.split(r"for in[- ]network", t, flags=re.I, maxsplit=1)
+        parts = rules.FOR_INN_RE.split(t, maxsplit=1)
         if parts:
             inn = _first_amount_token(parts[0])
 
     # Out-of-network amount often appears before the "for out-of-network" marker,
     # and after the in-network marker if both appear.
     if "for out-of-network" in t_lower or "for out of network" in t_lower:
-        m = re.split(r"for out[- ]of[- ]network", t, flags=re.I, maxsplit=1)
+        m = rules.FOR_OON_RE.split(t, maxsplit=1)
         if m:
             out_src = m[0]
-            out_src = re.split(r"for in[- ]network", out_src, flags=re.I, maxsplit=1)[-1]
+            out_src = rules.FOR_INN_RE.split(out_src, maxsplit=1)[-1]
             oon = _first_amount_token(out_src)
 
     return inn, oon
@@ -143,33 +246,70 @@ def _split_in_oon(text: Optional[str]) -> tuple[Optional[str], Optional[str]]:
         return None, None
     t = text.replace("\r", " ").replace("\n", " ")
     # Normalize separators
-    t = re.sub(r"\s+", " ", t)
+    t = rules.WHITESPACE_RE.sub(" ", t)
     inn = None
     oon = None
     # Patterns like "In Network: ... Out of Network: ..."
-    m_in = re.search(r"(In\s*Network|In-Network)\s*:\s*([^;]+)", t, re.I)
-    m_oon = re.search(r"(Out\s*of\s*Network|Out-of-Network)\s*:\s*([^;]+)", t, re.I)
+    m_in = rules.INN_LABELLED_RE.search(t)
+    m_oon = rules.OON_LABELLED_RE.search(t)
     # Fallback for "In network $X ..." without colon
     if not m_in:
-        m_in = re.search(r"(In\s*Network|In-Network)\s*([$0-9,./ ]+)", t, re.I)
+        m_in = rules.INN_AMOUNT_RE.search(t)
     if not m_oon:
-        m_oon = re.search(r"(Out\s*of\s*Network|Out-of-Network)\s*([$0-9,./ ]+)", t, re.I)
+        m_oon = rules.OON_AMOUNT_RE.search(t)
     if m_in:
         inn = m_in.group(2).strip()
     if m_oon:
         oon = m_oon.group(2).strip()
-    if inn in {"/", "-"}:
+    if inn in rules.SPLIT_PLACEHOLDERS:
         inn = None
-    if oon in {"/", "-"}:
+    if oon in rules.SPLIT_PLACEHOLDERS:
         oon = None
     if not inn and not oon:
         inn, oon = _extract_in_out_from_sentence(t)
     return inn, oon
 
 
-def _extract_tables(pdf) -> list[list[list[str]]]:
+# The row rules the table pass applies, tested against whole pages: a page the rules
+# could match is never dropped by targeting.
+_PAGE_ANCHORS = (
+    (rules.DEDUCTIBLE_ROW,),
+    (rules.OOP_ROW,),
+    (rules.OUTPATIENT_SERVICE, rules.OUTPATIENT_CONTEXT),
+)
+
+
+def _page_has_anchor(norm: str) -> tuple[bool, ...]:
+    return tuple(all(rule.matches(norm) for rule in anchor) for anchor in _PAGE_ANCHORS)
+
+
+def _anchor_pages(page_texts: list[str]) -> Optional[list[int]]:
+    # Pages holding the rows the table rules read. None (scan every page) when any
+    # anchor is missing, e.g. scanned SBCs without a text layer or unusual wording,
+    # so targeting never loses a field.
+    found = [False] * len(_PAGE_ANCHORS)
+    pages = []
+    for idx, page_text in enumerate(page_texts):
+        hits = _page_has_anchor(_normalize(page_text))
+        if any(hits):
+            pages.append(idx)
+            found = [a or b for a, b in zip(found, hits)]
+    return pages if all(found) else None
+
+
+def _locate_pages(source: Union[PdfSource, Document]) -> Optional[list[int]]:
+    # Cheap PyMuPDF text pass ahead of the (much slower) pdfplumber table pass.
+    try:
+        with as_document(source).open_fitz() as doc:
+            return _anchor_pages([page.get_text() for page in doc])
+    except Exception:
+        return None
+
+
+def _extract_tables(pdf, pages: Optional[list[int]] = None) -> list[list[list[str]]]:
     tables = []
-    for page in pdf.pages:
+    targets = pdf.pages if pages is None else [pdf.pages[i] for i in pages if i < len(pdf.pages)]
+    for page in targets:
         try:
             tables.extend(page.extract_tables() or [])
         except Exception:
@@ -177,190 +317,516 @@ def _extract_tables(pdf) -> list[list[list[str]]]:
     return tables
 
 
-def _extract_ded_oop_from_tables(tables: list[list[list[str]]]) -> tuple[Optional[str], Optional[str]]:
-    deductible = None
-    oop = None
-    in_net_re = re.compile(r"in[- ]?network", re.I)
-    for table in tables:
-        for row in table:
-            if not row:
-                continue
-            row_text = _normalize(" ".join([c or "" for c in row]))
-            if "summary of benefits and coverage" in row_text:
+@dataclass
+class TableFields:
+    deductible: Optional[str] = None
+    oop: Optional[str] = None
+    inn_coi: Optional[str] = None
+    inn_cop: Optional[str] = None
+    oon_coi: Optional[str] = None
+    oon_cop: Optional[str] = None
+    # Where each value came from, for deriving layout templates.
+    deductible_at: Optional[layouts.Cell] = None
+    oop_at: Optional[layouts.Cell] = None
+    outpatient_at: Optional[layouts.Row] = None
+    col_types: Optional[list[str]] = None
+
+
+def _answer_index(row: list[str]) -> Optional[int]:
+    # Answers may be in a later cell (e.g., "In Network: $8,500...")
+    if len(row) > 1 and row[1]:
+        return 1
+    for idx, cell in enumerate(row):
+        if cell and rules.IN_NETWORK_CELL.matches(cell.strip()):
+            return idx
+    return None
+
+
+def _first_cell(
+    cells: list[str],
+    hits: list[set[str]],
+    rule: rules.CellRule,
+    exclude: Optional[str],
+) -> Optional[str]:
+    for cell, names in zip(cells, hits):
+        if rule.name in names and cell != exclude:
+            return cell
+    return None
+
+
+def _outpatient_row(row: list[str], row_text: str, col_types: list[str]) -> tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
+    # Find INN/OON cells by content rather than position. Each cell is matched
+    # against the outpatient cell rules once; precedence is resolved afterwards.
+    cells = [c or "" for c in row]
+    hits = [{rule.name for rule in rules.OUTPATIENT_CELL_RULES if rule.matches(c)} for c in cells]
+    oon_cell = ""
+    inn_cell = ""
+
+    # Prefer header-aligned columns (IHCP layouts).
+    if col_types:
+        for idx, ctype in enumerate(col_types):
+            if idx >= len(cells):
                 continue
-            if "what is the overall" in row_text and "deductible" in row_text:
-                # Answers may be in a later cell (e.g., "In Network: $8,500...")
-                if len(row) > 1 and row[1]:
-                    deductible = row[1].strip()
-                else:
-                    for cell in row:
-                        if not cell:
-                            continue
-                        cell_txt = cell.strip()
-                        if in_net_re.search(cell_txt):
-                            deductible = cell_txt
-                            break
-            if "out-of-pocket limit" in row_text and "for this plan" in row_text:
-                if len(row) > 1 and row[1]:
-                    oop = row[1].strip()
-                else:
-                    for cell in row:
-                        if not cell:
-                            continue
-                        cell_txt = cell.strip()
-                        if in_net_re.search(cell_txt):
-                            oop = cell_txt
-                            break
-    return deductible, oop
+            if ctype == "inn" and not inn_cell:
+                inn_cell = cells[idx]
+            if ctype == "oon" and not oon_cell:
+                oon_cell = cells[idx]
+        if not inn_cell:
+            # Fall back to non-IHCP in-network mention inside row
+            inn_cell = _first_cell(cells, hits, rules.NON_IHCP_INN_CELL, exclude=None) or ""
+
+    if not oon_cell:
+        oon_cell = _first_cell(cells, hits, rules.OON_CELL, exclude=None) or ""
+    # INN candidate: "intensive outpatient" always wins, then "other outpatient",
+    # then "office visit", then any cost share cell.
+    override = _first_cell(cells, hits, rules.INN_OVERRIDE_CELL, exclude=oon_cell)
+    if override is not None:
+        inn_cell = override
+    for rule in rules.INN_CELL_RULES:
+        if inn_cell:
+            break
+        inn_cell = _first_cell(cells, hits, rule, exclude=oon_cell) or ""
+    inn_coi, inn_cop = _parse_cost_share(inn_cell)
+    oon_coi, oon_cop = _parse_cost_share(oon_cell)
+    # If OON says Not Covered (or row contains it), keep as is
+    if rules.NOT_COVERED.matches(row_text):
+        oon_coi = oon_cop = "Not Covered"
+    return inn_coi, inn_cop, oon_coi, oon_cop
 
 
-def _extract_iop_outpatient_from_tables(tables: list[list[list[str]]]) -> tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
-    inn_coi = inn_cop = oon_coi = oon_cop = None
-    for table in tables:
-        header = table[0] if table else []
-        col_types = []
-        for cell in header:
-            h = _normalize(cell or "")
-            if "non-ihcp" in h and "in-network" in h:
-                col_types.append("inn")
-            elif "non-ihcp" in h and "out-of-network" in h:
-                col_types.append("oon")
-            elif "out-of-network" in h or "out of network" in h:
-                col_types.append("oon")
-            elif "in-network" in h or "in network" in h:
-                col_types.append("inn")
-            elif "ihcp" in h:
-                col_types.append("ihcp")
-            else:
-                col_types.append("")
-        for row in table:
+def _scan_tables(tables: list[list[list[str]]]) -> TableFields:
+    # Single pass over every table row: each row's normalized text is built once and
+    # fed to both the Important Questions rules and the outpatient-row rules.
+    found = TableFields()
+    outpatient_done = False
+    for table_idx, table in enumerate(tables):
+        col_types: Optional[list[str]] = None
+        for row_idx, row in enumerate(table):
             if not row:
                 continue
+            row_text = _normalize(" ".join([c or "" for c in row]))
+            if not rules.SKIP_ROW.matches(row_text):
+                if rules.DEDUCTIBLE_ROW.matches(row_text):
+                    answer = _answer_index(row)
+                    if answer is not None:
+                        found.deductible = row[answer].strip()
+                        found.deductible_at = (table_idx, row_idx, answer)
+                if rules.OOP_ROW.matches(row_text):
+                    answer = _answer_index(row)
+                    if answer is not None:
+                        found.oop = row[answer].strip()
+                        found.oop_at = (table_idx, row_idx, answer)
             # Skip single-cell header rows that repeat large blocks of text.
-            if len(row) < 4:
+            if outpatient_done or len(row) < rules.OUTPATIENT_MIN_CELLS:
                 continue
-            row_text = _normalize(" ".join([c or "" for c in row]))
             # The actual row typically has column 2 = "Outpatient services".
-            col1 = _normalize(row[1] or "") if len(row) > 1 else ""
-            if "outpatient services" in col1 and ("mental health" in row_text or "substance" in row_text or "behavioral" in row_text):
-                # Try to find INN/OON cells by content rather than position.
-                cells = [c or "" for c in row]
-                oon_cell = ""
-                inn_cell = ""
-
-                # Prefer header-aligned columns (IHCP layouts).
-                if col_types:
-                    for idx, ctype in enumerate(col_types):
-                        if idx >= len(cells):
-                            continue
-                        if ctype == "inn" and not inn_cell:
-                            inn_cell = cells[idx]
-                        if ctype == "oon" and not oon_cell:
-                            oon_cell = cells[idx]
-                    if not inn_cell:
-                        # Fall back to non-IHCP in-network mention inside row
-                        for c in cells:
-                            if re.search(r"non-ihcp.*in[- ]network", c, re.I):
-                                inn_cell = c
-                                break
-
-                if not oon_cell:
-                    for c in cells:
-                        if re.search(r"non-participating|out[- ]of[- ]network|out of network", c, re.I):
-                            oon_cell = c
-                            break
-                # INN candidate: prioritize "intensive outpatient", then "other outpatient",
-                # then "office visit", then any cost share cell.
-                for c in cells:
-                    if c == oon_cell:
-                        continue
-                    if re.search(r"intensive outpatient", c, re.I):
-                        inn_cell = c
-                        break
-                if not inn_cell:
-                    for c in cells:
-                        if c == oon_cell:
-                            continue
-                        if re.search(r"other outpatient", c, re.I):
-                            inn_cell = c
-                            break
-                if not inn_cell:
-                    for c in cells:
-                        if c == oon_cell:
-                            continue
-                        if re.search(r"office visit", c, re.I):
-                            inn_cell = c
-                            break
-                if not inn_cell:
-                    for c in cells:
-                        if c == oon_cell:
-                            continue
-                        if re.search(r"\\$|copay|copayment|%\\s*coinsurance", c, re.I):
-                            inn_cell = c
-                            break
-                inn_coi, inn_cop = _parse_cost_share(inn_cell or "")
-                oon_coi, oon_cop = _parse_cost_share(oon_cell or "")
-                # If OON says Not Covered (or row contains it), keep as is
-                if (oon_cell or "").strip().lower().startswith("not covered") or re.search(r"not covered", row_text, re.I):
-                    oon_coi = oon_cop = "Not Covered"
-                return inn_coi, inn_cop, oon_coi, oon_cop
-    return inn_coi, inn_cop, oon_coi, oon_cop
+            col1 = _normalize(row[1] or "")
+            if rules.OUTPATIENT_SERVICE.matches(col1) and rules.OUTPATIENT_CONTEXT.matches(row_text):
+                if col_types is None:
+                    header = table[0] if table else []
+                    col_types = [rules.column_type(_normalize(cell or "")) for cell in header]
+                found.inn_coi, found.inn_cop, found.oon_coi, found.oon_cop = _outpatient_row(row, row_text, col_types)
+                found.outpatient_at = (table_idx, row_idx)
+                found.col_types = col_types
+                outpatient_done = True
+    return found
+
+
+def _row_at(tables: list[list[list[str]]], table_idx: int, row_idx: int) -> Optional[list[str]]:
+    if table_idx < len(tables) and row_idx < len(tables[table_idx]):
+        return tables[table_idx][row_idx] or None
+    return None
+
+
+def _answer_at(tables: list[list[list[str]]], at: layouts.Cell, row_rule: rules.PhraseRule, label: str) -> Optional[str]:
+    row = _row_at(tables, at[0], at[1])
+    if row is None or cell_label(row[0]) != label or _answer_index(row) != at[2]:
+        return None
+    row_text = _normalize(" ".join([c or "" for c in row]))
+    if rules.SKIP_ROW.matches(row_text) or not row_rule.matches(row_text):
+        return None
+    return row[at[2]].strip()
+
+
+def _scan_template(tables: list[list[list[str]]], template: LayoutTemplate) -> Optional[TableFields]:
+    # Fast path for a registered layout: reads the recorded rows directly instead of
+    # scanning every table. The fingerprint pins every table's row and column counts;
+    # each row must also carry the recorded label, pass the generic path's anchors and
+    # have its answer in the recorded cell, otherwise None and the caller runs
+    # _scan_tables. It does not look for other matching rows (_scan_tables keeps the
+    # last deductible/OOP match and the first outpatient match), so a template is only
+    # registered once it agrees with _scan_tables on every sampled member of its layout
+    # (scripts/layout_templates.py).
+    deductible = _answer_at(tables, template.deductible, rules.DEDUCTIBLE_ROW, template.labels[0])
+    oop = _answer_at(tables, template.oop, rules.OOP_ROW, template.labels[1])
+    row = _row_at(tables, *template.outpatient)
+    if deductible is None or oop is None or row is None or len(row) < rules.OUTPATIENT_MIN_CELLS:
+        return None
+    if cell_label(row[1]) != template.labels[2]:
+        return None
+    row_text = _normalize(" ".join([c or "" for c in row]))
+    if not (rules.OUTPATIENT_SERVICE.matches(_normalize(row[1] or "")) and rules.OUTPATIENT_CONTEXT.matches(row_text)):
+        return None
+    found = TableFields(deductible=deductible, oop=oop)
+    found.inn_coi, found.inn_cop, found.oon_coi, found.oon_cop = _outpatient_row(row, row_text, list(template.col_types))
+    return found
+
+
+def derive_template(tables: list[list[list[str]]], name: str) -> Optional[LayoutTemplate]:
+    # Template recording where the generic scan found each value in this document;
+    # None unless it found all of them.
+    found = _scan_tables(tables)
+    if found.deductible_at is None or found.oop_at is None or found.outpatient_at is None:
+        return None
+    ded_table, ded_row, _ = found.deductible_at
+    oop_table, oop_row, _ = found.oop_at
+    op_table, op_row = found.outpatient_at
+    return LayoutTemplate(
+        name=name,
+        deductible=found.deductible_at,
+        oop=found.oop_at,
+        outpatient=found.outpatient_at,
+        col_types=tuple(found.col_types or ()),
+        labels=(
+            cell_label(tables[ded_table][ded_row][0]),
+            cell_label(tables[oop_table][oop_row][0]),
+            cell_label(tables[op_table][op_row][1]),
+        ),
+    )
+
+
+def _scan_layout(extraction: Extraction) -> TableFields:
+    fingerprint = layout_fingerprint(extraction.tables, extraction.engine)
+    template = layouts.TEMPLATES.get(fingerprint)
+    found = _scan_template(extraction.tables, template) if template is not None else None
+    timing.note_layout(fingerprint, template.name if found is not None else None)
+    return found if found is not None else _scan_tables(extraction.tables)
+
+
+def table_fields(tables: list[list[list[str]]]) -> TableFields:
+    # The generic table rules on their own, for replays over stored tables.
+    return _scan_tables(tables)
+
+
+def _extract_ded_oop_from_tables(tables: list[list[list[str]]]) -> tuple[Optional[str], Optional[str]]:
+    found = _scan_tables(tables)
+    return found.deductible, found.oop
+
+
+def _extract_iop_outpatient_from_tables(tables: list[list[list[str]]]) -> tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
+    found = _scan_tables(tables)
+    return found.inn_coi, found.inn_cop, found.oon_coi, found.oon_cop
+
+
+def _extract_with_pdfplumber(source: Union[PdfSource, Document]) -> Extraction:
+    doc = as_document(source)
+    with timing.stage("locate"):
+        pages = _locate_pages(doc)
+    with timing.stage("open"):
+        pdf = doc.open_plumber()
+    try:
+        timing.note_pages(len(pdf.pages))
+        with timing.stage("extract_tables"):
+            tables = _extract_tables(pdf, pages)
+    except BaseException:
+        pdf.close()
+        raise
+    # Page text is a second layout pass; defer it until a fallback needs it.
+    return Extraction(
+        tables=tables,
+        page_texts=[],
+        engine="pdfplumber",
+        text_complete=False,
+        text_source=_PageTextSource(doc, pdf),
+    )
+
+
+def _extract_with_pymupdf(source: Union[PdfSource, Document]) -> Extraction:
+    tables = []
+    with timing.stage("open"):
+        doc = as_document(source).open_fitz()
+    with doc:
+        timing.note_pages(len(doc))
+        with timing.stage("extract_text"):
+            page_texts = [page.get_text() for page in doc]
+        with timing.stage("locate"):
+            pages = _anchor_pages(page_texts)
+        with timing.stage("extract_tables"):
+            for idx in range(len(doc)) if pages is None else pages:
+                try:
+                    tables.extend(table.extract() for table in doc[idx].find_tables().tables)
+                except Exception:
+                    continue
+    return Extraction(tables=tables, page_texts=page_texts[:TEXT_PAGES], engine="pymupdf")
+
+
+# Extraction backends. Each returns the same table shape (list of tables, each a
+# list of rows of cell strings) plus the first TEXT_PAGES pages of text.
+ENGINES: dict[str, Callable[[Union[PdfSource, Document]], Extraction]] = {
+    "pdfplumber": _extract_with_pdfplumber,
+    "pymupdf": _extract_with_pymupdf,
+}
+
+
+def extract_document(source: Union[PdfSource, Document], engine: str = "pdfplumber") -> Extraction:
+    try:
+        extractor = ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Unknown extraction engine: {engine}") from None
+    return extractor(source)
+
+
+def _fingerprint(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def engines_for(engine: str) -> tuple[str, ...]:
+    return ("pymupdf", "pdfplumber") if engine == "auto" else (engine,)
+
+
+@lru_cache(maxsize=None)
+def extraction_fingerprint(engine: str = "pdfplumber") -> str:
+    # Changes only when the code producing an Extraction (or the PDF libraries) changes,
+    # so stored tables survive edits to the rules below.
+    return _fingerprint(
+        engine,
+        inspect.getsource(_normalize),
+        inspect.getsource(_map_file),
+        inspect.getsource(Document),
+        inspect.getsource(as_document),
+        repr(_PAGE_ANCHORS),
+        inspect.getsource(_page_has_anchor),
+        inspect.getsource(_anchor_pages),
+        inspect.getsource(_locate_pages),
+        inspect.getsource(_extract_tables),
+        inspect.getsource(_PageTextSource),
+        inspect.getsource(ENGINES[engine]),
+        str(TEXT_PAGES),
+        pdfplumber.__version__,
+        fitz.VersionBind,
+    )
+
 
+def rules_fingerprint(engine: str = "pdfplumber") -> str:
+    # Any edit to this module or the rule registry may change parsed values, so it invalidates stored results.
+    # So may the layout templates in use, which are loaded at run time.
+    return _rules_fingerprint(engine, layouts.templates_digest())
 
-def parse_pdf(path: str) -> ParsedBenefits:
-    # This is a baseline parser; we can harden it once we see real PDFs.
-    full_text = []
-    with pdfplumber.open(path) as pdf:
-        tables = _extract_tables(pdf)
-        for page in pdf.pages[:5]:
-            text = page.extract_text() or ""
-            full_text.append(text)
 
-    text = _normalize(" ".join(full_text))
+@lru_cache(maxsize=None)
+def _rules_fingerprint(engine: str, templates: str) -> str:
+    return _fingerprint(
+        engine,
+        *(extraction_fingerprint(name) for name in engines_for(engine)),
+        Path(__file__).read_text(encoding="utf-8-sig"),
+        Path(rules.__file__).read_text(encoding="utf-8"),
+        Path(layouts.__file__).read_text(encoding="utf-8"),
+        templates,
+    )
 
-    def find(pattern: str) -> Optional[str]:
-        m = re.search(pattern, text)
-        return m.group(1).strip() if m else None
 
-    ded, oop = _extract_ded_oop_from_tables(tables)
-    inn_iop_coi, inn_iop_cop, oon_iop_coi, oon_iop_cop = _extract_iop_outpatient_from_tables(tables)
+def _page_text(extraction: Extraction, idx: int) -> Optional[str]:
+    # Text of page idx (within the first TEXT_PAGES), read through the source and
+    # cached on the extraction; None past the last available page.
+    if idx < len(extraction.page_texts):
+        return extraction.page_texts[idx]
+    if extraction.text_complete or extraction.text_source is None or idx >= TEXT_PAGES:
+        return None
+    text = extraction.text_source(idx)
+    if text is None:
+        extraction.text_complete = True
+        return None
+    extraction.page_texts.append(text)
+    extraction.text_complete = len(extraction.page_texts) >= TEXT_PAGES
+    return text
+
+
+def _text_fallbacks(extraction: Extraction, wanted: list[str]) -> dict[str, Optional[str]]:
+    # Runs the page-text fallbacks for the fields the tables left blank, growing the
+    # text one page at a time and stopping once every wanted pattern has matched.
+    # Until the last page, a match is only taken if it ends before the text does, so
+    # a pattern that could still extend (or relies on the end-of-text anchor) sees the
+    # same text it would have seen with all TEXT_PAGES pages read up front.
+    found: dict[str, Optional[str]] = {}
+    remaining = list(wanted)
+    idx = 0
+    while remaining:
+        more = idx < TEXT_PAGES and _page_text(extraction, idx) is not None
+        last = not more or idx + 1 >= TEXT_PAGES
+        text = _normalize(" ".join(extraction.page_texts[: idx + 1]))
+        for name in list(remaining):
+            m = rules.TEXT_FALLBACKS[name].search(text)
+            if m and (last or m.end() < len(text)):
+                found[name] = m.group(1).strip()
+                remaining.remove(name)
+        if last:
+            break
+        idx += 1
+    return found
+
+
+def parse_extraction(extraction: Extraction) -> ParsedBenefits:
+    try:
+        return _parse_extraction(extraction)
+    finally:
+        if extraction.text_source is not None:
+            extraction.text_source.close()
+
+
+def _parse_extraction(extraction: Extraction) -> ParsedBenefits:
+    found = _scan_layout(extraction)
     # If deductible/OOP include both INN and OON in one cell, split them.
-    inn_ded_split, oon_ded_split = _split_in_oon(ded)
-    inn_oop_split, oon_oop_split = _split_in_oon(oop)
+    inn_ded_split, oon_ded_split = _split_in_oon(found.deductible)
+    inn_oop_split, oon_oop_split = _split_in_oon(found.oop)
+
+    # Table candidates per field in precedence order; the page-text fallback runs
+    # only when all of them are blank.
+    candidates = {
+        "inn_deductible": (inn_ded_split, found.deductible),
+        "oon_deductible": (oon_ded_split,),
+        "inn_oop_max": (inn_oop_split, found.oop),
+        "oon_oop_max": (oon_oop_split,),
+        "inn_coinsurance": (found.inn_coi,),
+        "oon_coinsurance": (found.oon_coi,),
+        "inn_iop_copay": (found.inn_cop,),
+        "oon_iop_copay": (found.oon_cop,),
+    }
+    table_values = {name: next((v for v in options if v), None) for name, options in candidates.items()}
+    missing = [name for name, value in table_values.items() if value is None]
+    fallbacks = _text_fallbacks(extraction, missing) if missing else {}
+    return ParsedBenefits(
+        **{name: _normalize_value(value or fallbacks.get(name)) for name, value in table_values.items()}
+    )
+
 
+def _fill_blanks(primary: ParsedBenefits, fallback: ParsedBenefits) -> ParsedBenefits:
     return ParsedBenefits(
-        inn_deductible=_normalize_value(
-            inn_ded_split
-            or ded
-            or find(r"in-network annual deductible[^$]*?\$?([\w,.$/ ]+?) (?:out-of-network|oop|max|$)")
-        ),
-        oon_deductible=_normalize_value(
-            oon_ded_split
-            or find(r"out-of-network annual deductible[^$]*?\$?([\w,.$/ ]+?) (?:in-network|oop|max|$)")
-        ),
-        inn_oop_max=_normalize_value(
-            inn_oop_split
-            or oop
-            or find(r"in-network out-of-pocket limit[^$]*?\$?([\w,.$/ ]+?) (?:out-of-network|coinsurance|$)")
-        ),
-        oon_oop_max=_normalize_value(
-            oon_oop_split
-            or find(r"out-of-network out-of-pocket limit[^$]*?\$?([\w,.$/ ]+?) (?:in-network|coinsurance|$)")
-        ),
-        inn_coinsurance=_normalize_value(
-            inn_iop_coi
-            or find(r"in-network coinsurance[^%]*?([\w,.$/% ]+?) (?:out-of-network|copay|$)")
-        ),
-        oon_coinsurance=_normalize_value(
-            oon_iop_coi
-            or find(r"out-of-network coinsurance[^%]*?([\w,.$/% ]+?) (?:in-network|copay|$)")
-        ),
-        inn_iop_copay=_normalize_value(
-            inn_iop_cop
-            or find(r"in-network[^.]*?intensive outpatient program[^$]*?\$?([\w,.$/% ]+?) (?:out-of-network|limit|$)")
-        ),
-        oon_iop_copay=_normalize_value(
-            oon_iop_cop
-            or find(r"out-of-network[^.]*?intensive outpatient program[^$]*?\$?([\w,.$/% ]+?) (?:in-network|limit|$)")
-        ),
+        **{f.name: getattr(primary, f.name) or getattr(fallback, f.name) for f in fields(ParsedBenefits)}
     )
+
+
+def has_blanks(parsed: ParsedBenefits) -> bool:
+    return any(getattr(parsed, f.name) is None for f in fields(ParsedBenefits))
+
+
+def parse_with_engine(
+    source: PdfSource,
+    engine: str = "pdfplumber",
+    extractions: Optional[dict[str, Extraction]] = None,
+) -> tuple[ParsedBenefits, dict[str, Extraction]]:
+    # Returns the parsed fields plus every Extraction used, keyed by engine. Extractions
+    # passed in (e.g. from the result store) are reused instead of reopening the PDF.
+    if engine not in ENGINE_CHOICES:
+        raise ValueError(f"Unknown extraction engine: {engine}")
+    extractions = dict(extractions or {})
+    doc = Document(source)
+
+    def get(name: str) -> Extraction:
+        if name not in extractions:
+            extractions[name] = extract_document(doc, name)
+        extraction = extractions[name]
+        # Stored extractions may hold only the text pages an earlier rule set needed.
+        if not extraction.text_complete and extraction.text_source is None:
+            extraction.text_source = _PageTextSource(doc)
+        return extraction
+
+    def run_rules(extraction: Extraction) -> ParsedBenefits:
+        with timing.stage("rules"):
+            return parse_extraction(extraction)
+
+    if engine != "auto":
+        parsed = run_rules(get(engine))
+    else:
+        # auto: PyMuPDF first; pay for pdfplumber only when a field is still blank.
+        parsed = run_rules(get("pymupdf"))
+        if has_blanks(parsed):
+            parsed = _fill_blanks(parsed, run_rules(get("pdfplumber")))
+    for extraction in extractions.values():
+        if extraction.text_source is not None:
+            extraction.text_source.close()
+            extraction.text_source = None
+    return parsed, extractions
+
+
+def parse_pdf(source: PdfSource, engine: str = "pdfplumber") -> ParsedBenefits:
+    # This is a baseline parser; we can harden it once we see real PDFs. source is a
+    # path, the PDF's bytes, or a binary file object.
+    return parse_with_engine(source, engine)[0]
+
+
+ParseOutcome = tuple[str, Union[ParsedBenefits, BaseException]]
+
+
+def _parse_chunk(paths: list[str], engine: str) -> list[ParseOutcome]:
+    outcomes: list[ParseOutcome] = []
+    for path in paths:
+        try:
+            outcomes.append((path, parse_pdf(path, engine)))
+        except Exception as exc:
+            outcomes.append((path, exc))
+    return outcomes
+
+
+def _chunk_outcomes(paths: list[str], job: Future) -> list[ParseOutcome]:
+    try:
+        return job.result()
+    except Exception as exc:
+        # The chunk itself failed (e.g. a worker died or a result would not pickle).
+        return [(path, exc) for path in paths]
+
+
+def parse_many(
+    paths: Iterable[str | Path],
+    workers: Optional[int] = None,
+    chunksize: int = 4,
+    ordered: bool = True,
+    engine: str = "pdfplumber",
+    executor: Optional[Executor] = None,
+) -> Iterator[ParseOutcome]:
+    # Streams (path, ParsedBenefits-or-exception) for many PDFs. Paths are sent to
+    # worker processes in chunks of `chunksize` to amortize IPC, the workers live for
+    # the whole iteration (pdfplumber is imported once per process), and at most
+    # 2 * workers chunks are in flight so an unbounded iterable is fine. ordered=False
+    # yields chunks as they finish. Pass `executor` to reuse one pool across calls.
+    if engine not in ENGINE_CHOICES:
+        raise ValueError(f"Unknown extraction engine: {engine}")
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, chunksize)
+    source = iter(str(p) for p in paths)
+    chunks = iter(lambda: list(islice(source, chunksize)), [])
+    if executor is None and workers <= 1:
+        for chunk in chunks:
+            yield from _parse_chunk(chunk, engine)
+        return
+
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    window = 2 * workers
+    pending: deque[tuple[list[str], Future]] = deque()
+    try:
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(_parse_chunk, chunk, engine)))
+            while len(pending) >= window:
+                yield from _next_outcomes(pending, ordered)
+        while pending:
+            yield from _next_outcomes(pending, ordered)
+    finally:
+        for _, job in pending:
+            job.cancel()
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
+
+
+def _next_outcomes(pending: deque[tuple[list[str], Future]], ordered: bool) -> list[ParseOutcome]:
+    if ordered:
+        chunk, job = pending.popleft()
+        return _chunk_outcomes(chunk, job)
+    wait([job for _, job in pending], return_when=FIRST_COMPLETED)
+    for idx, (chunk, job) in enumerate(pending):
+        if job.done():
+            del pending[idx]
+            return _chunk_outcomes(chunk, job)
+    raise RuntimeError("wait() returned without a finished chunk")
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from concurrent.futures import Future
+from operator import attrgetter
+from pathlib import Path
+
+from .cache import document_key
+from .download import PdfBytes
+from .parse import Extraction, ParsedBenefits, engines_for, parse_with_engine
+from .store import ResultStore
+from .timing import DocTiming, recording
+
+# Scheduling one document's parse, shared by the CLI pipeline and the parse service:
+# a stored result is returned as is, stored tables are replayed in-process, and
+# anything else goes to submit (a worker pool, or run_inline).
+
+# ParsedBenefits attributes in FIELD_COLUMNS order.
+FIELD_NAMES = (
+    "inn_deductible",
+    "inn_oop_max",
+    "inn_coinsurance",
+    "inn_iop_copay",
+    "oon_deductible",
+    "oon_oop_max",
+    "oon_coinsurance",
+    "oon_iop_copay",
+)
+field_values = attrgetter(*FIELD_NAMES)
+
+
+def run_inline(fn, *args) -> Future:
+    job: Future = Future()
+    try:
+        job.set_result(fn(*args))
+    except Exception as exc:
+        job.set_exception(exc)
+    return job
+
+
+def parse_fresh(
+    source: str | bytes,
+    engine: str,
+    stored: dict[str, Extraction],
+    keep_extractions: bool,
+) -> tuple[ParsedBenefits, dict[str, Extraction], DocTiming]:
+    # Returns only the extractions produced here, so the parent stores nothing twice,
+    # plus the per-stage timings recorded inside the worker.
+    with recording() as timing:
+        parsed, extractions = parse_with_engine(source, engine, stored)
+    if not keep_extractions:
+        return parsed, {}, timing
+    return parsed, {name: ext for name, ext in extractions.items() if name not in stored}, timing
+
+
+def pdf_key(pdf: Path | PdfBytes) -> str:
+    return pdf.sha256 if isinstance(pdf, PdfBytes) else document_key(pdf)
+
+
+def pdf_source(pdf: Path | PdfBytes) -> str | bytes:
+    # What a worker parses: an in-memory download's bytes, otherwise the path.
+    return pdf.data if isinstance(pdf, PdfBytes) else str(pdf)
+
+
+def schedule(
+    submit,
+    pdf: Path | PdfBytes,
+    key: str,
+    engine: str,
+    store: ResultStore | None,
+    saved: set[str],
+) -> Future:
+    # May do real work before returning: store lookups, and a rules replay over stored
+    # tables (which can open the PDF for text), so callers must not hold a lock.
+    stored: dict[str, Extraction] = {}
+    if store is not None:
+        parsed = store.get_result(key)
+        if parsed is not None:
+            saved.add(key)
+            return run_inline(lambda: (parsed, {}, None))
+        # Rules changed but extraction did not: rerun the rules over the stored tables.
+        # Only the first engine must be stored: in auto mode pdfplumber was only run
+        # where PyMuPDF left a field blank, and parse_with_engine extracts it here if
+        # the current rules still need it (kept, so the store gets it).
+        stored = store.get_extractions(key)
+        if engines_for(engine)[0] in stored:
+            return run_inline(parse_fresh, pdf_source(pdf), engine, stored, True)
+    return submit(parse_fresh, pdf_source(pdf), engine, stored, store is not None)
+
+
+def resolve(
+    job: Future | BaseException,
+) -> tuple[ParsedBenefits | None, dict[str, Extraction], str | None, DocTiming | None]:
+    # (parsed, new extractions, error, timing); timing is None for stored results.
+    if isinstance(job, BaseException):
+        return None, {}, str(job), None
+    try:
+        parsed, extractions, timing = job.result()
+    except Exception as exc:
+        return None, {}, str(exc), None
+    return parsed, extractions, None, timing
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+QUARANTINE_MODES = ("skip", "slow")
+
+
+def quarantine_path(out_path: Path) -> Path:
+    return out_path.with_name(out_path.name + ".quarantine.json")
+
+
+# Documents (by content hash) that hit a timeout/RSS limit, persisted across runs so
+# a rerun does not spend another full timeout on each of them. Saved atomically on
+# every change; changes are rare, so there is no batching.
+class Quarantine:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: dict[str, dict[str, Any]] = {}
+        if path.exists():
+            self.entries = json.loads(path.read_text(encoding="utf-8"))
+
+    def reason(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        return entry["reason"] if entry is not None else None
+
+    def add(self, key: str, reason: str, url: str = "", seconds: float = 0.0, rss_bytes: Optional[int] = None) -> None:
+        previous = self.entries.get(key, {})
+        self.entries[key] = {
+            "reason": reason,
+            "url": url or previous.get("url", ""),
+            "seconds": round(seconds, 3),
+            "rss_bytes": rss_bytes,
+            "strikes": previous.get("strikes", 0) + 1,
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.save()
+
+    def remove(self, key: str) -> None:
+        if self.entries.pop(key, None) is not None:
+            self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.entries, fh, indent=2, sort_keys=True)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
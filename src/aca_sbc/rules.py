@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+# Declarative rule registry for parse.py. Everything here is compiled once at import;
+# parse.py evaluates it in a single pass per table row. Order inside each tuple is
+# the precedence order required by the spec (first match wins unless noted).
+
+
+@dataclass(frozen=True)
+class PhraseRule:
+    # Substring test on normalized (lower-cased, whitespace-collapsed) text.
+    all_of: tuple[str, ...] = ()
+    any_of: tuple[str, ...] = ()
+
+    def matches(self, text: str) -> bool:
+        for phrase in self.all_of:
+            if phrase not in text:
+                return False
+        if not self.any_of:
+            return True
+        for phrase in self.any_of:
+            if phrase in text:
+                return True
+        return False
+
+
+@dataclass(frozen=True)
+class CellRule:
+    # Regex test on a raw table cell.
+    name: str
+    pattern: re.Pattern[str]
+
+    def matches(self, cell: str) -> bool:
+        return self.pattern.search(cell) is not None
+
+
+# --- Value normalization -------------------------------------------------------
+
+NO_COPAY_RE = re.compile(r"\b(no copay|no copayment)\b", re.I)
+NO_COINS_RE = re.compile(r"\b(no coinsurance)\b", re.I)
+NO_CHARGE_RE = re.compile(r"\b(no charge|no cost|covered in full)\b", re.I)
+UNLIMITED_RE = re.compile(r"\bunlimited\b", re.I)
+ZERO_RE = re.compile(r"^0+(?:\.0+)?$")
+ZERO_TOKEN_RE = re.compile(r"\b0\b")
+MONEY_RE = re.compile(r"\$\s*([0-9][0-9,]*)")
+WHITESPACE_RE = re.compile(r"\s+")
+DOLLAR_GAP_RE = re.compile(r"\$\s+([0-9])")
+PERCENT_GAP_RE = re.compile(r"([0-9])\s+%")
+PUNCT_GAP_RE = re.compile(r"\s+([,.;:])")
+
+# --- Cost-share cells (_parse_cost_share) ---------------------------------------
+
+COPAYMENT_PHRASE_RE = re.compile(r"\$[0-9,]+[^;\\n]*?copayment[^;\\n]*", re.I)
+DOLLAR_AMOUNT_RE = re.compile(r"\$([0-9,]+)")
+COINSURANCE_PHRASE_RE = re.compile(r"[0-9]+%\s*coinsurance[^;\n]*", re.I)
+OTHER_OUTPATIENT = PhraseRule(all_of=("other outpatient",))
+
+# --- In/out-of-network splitting (_split_in_oon) --------------------------------
+
+INN_LABELLED_RE = re.compile(r"(In\s*Network|In-Network)\s*:\s*([^;]+)", re.I)
+OON_LABELLED_RE = re.compile(r"(Out\s*of\s*Network|Out-of-Network)\s*:\s*([^;]+)", re.I)
+INN_AMOUNT_RE = re.compile(r"(In\s*Network|In-Network)\s*([$0-9,./ ]+)", re.I)
+OON_AMOUNT_RE = re.compile(r"(Out\s*of\s*Network|Out-of-Network)\s*([$0-9,./ ]+)", re.I)
+FOR_INN_RE = re.compile(r"for in[- ]network", re.I)
+FOR_OON_RE = re.compile(r"for out[- ]of[- ]network", re.I)
+SPLIT_PLACEHOLDERS = frozenset({"/", "-"})
+
+# --- Important Questions rows (deductible / out-of-pocket limit) ----------------
+
+SKIP_ROW = PhraseRule(all_of=("summary of benefits and coverage",))
+DEDUCTIBLE_ROW = PhraseRule(all_of=("what is the overall", "deductible"))
+OOP_ROW = PhraseRule(all_of=("out-of-pocket limit", "for this plan"))
+IN_NETWORK_CELL = CellRule("in_network", re.compile(r"in[- ]?network", re.I))
+
+# --- Mental health / substance use outpatient row --------------------------------
+
+OUTPATIENT_MIN_CELLS = 4
+OUTPATIENT_SERVICE = PhraseRule(all_of=("outpatient services",))
+OUTPATIENT_CONTEXT = PhraseRule(any_of=("mental health", "substance", "behavioral"))
+NOT_COVERED = PhraseRule(all_of=("not covered",))
+
+# Column type from normalized header cell text.
+HEADER_COLUMN_RULES: tuple[tuple[PhraseRule, str], ...] = (
+    (PhraseRule(all_of=("non-ihcp", "in-network")), "inn"),
+    (PhraseRule(all_of=("non-ihcp", "out-of-network")), "oon"),
+    (PhraseRule(any_of=("out-of-network", "out of network")), "oon"),
+    (PhraseRule(any_of=("in-network", "in network")), "inn"),
+    (PhraseRule(all_of=("ihcp",)), "ihcp"),
+)
+
+NON_IHCP_INN_CELL = CellRule("non_ihcp_inn", re.compile(r"non-ihcp.*in[- ]network", re.I))
+OON_CELL = CellRule("oon", re.compile(r"non-participating|out[- ]of[- ]network|out of network", re.I))
+
+# In-network cell candidates. intensive_outpatient overrides any header-aligned
+# cell; the rest only apply while no in-network cell has been found.
+INN_OVERRIDE_CELL = CellRule("intensive_outpatient", re.compile(r"intensive outpatient", re.I))
+INN_CELL_RULES: tuple[CellRule, ...] = (
+    CellRule("other_outpatient", re.compile(r"other outpatient", re.I)),
+    CellRule("office_visit", re.compile(r"office visit", re.I)),
+    CellRule("cost_share", re.compile(r"\\$|copay|copayment|%\\s*coinsurance", re.I)),
+)
+OUTPATIENT_CELL_RULES: tuple[CellRule, ...] = (NON_IHCP_INN_CELL, OON_CELL, INN_OVERRIDE_CELL, *INN_CELL_RULES)
+
+# --- Page-text fallbacks, per output field --------------------------------------
+# Run over the normalized first pages only when the table pass left a field blank.
+
+TEXT_FALLBACKS: dict[str, re.Pattern[str]] = {
+    "inn_deductible": re.compile(r"in-network annual deductible[^$]*?\$?([\w,.$/ ]+?) (?:out-of-network|oop|max|$)"),
+    "oon_deductible": re.compile(r"out-of-network annual deductible[^$]*?\$?([\w,.$/ ]+?) (?:in-network|oop|max|$)"),
+    "inn_oop_max": re.compile(r"in-network out-of-pocket limit[^$]*?\$?([\w,.$/ ]+?) (?:out-of-network|coinsurance|$)"),
+    "oon_oop_max": re.compile(r"out-of-network out-of-pocket limit[^$]*?\$?([\w,.$/ ]+?) (?:in-network|coinsurance|$)"),
+    "inn_coinsurance": re.compile(r"in-network coinsurance[^%]*?([\w,.$/% ]+?) (?:out-of-network|copay|$)"),
+    "oon_coinsurance": re.compile(r"out-of-network coinsurance[^%]*?([\w,.$/% ]+?) (?:in-network|copay|$)"),
+    "inn_iop_copay": re.compile(
+        r"in-network[^.]*?intensive outpatient program[^$]*?\$?([\w,.$/% ]+?) (?:out-of-network|limit|$)"
+    ),
+    "oon_iop_copay": re.compile(
+        r"out-of-network[^.]*?intensive outpatient program[^$]*?\$?([\w,.$/% ]+?) (?:in-network|limit|$)"
+    ),
+}
+
+
+def column_type(header_norm: str) -> str:
+    for rule, col_type in HEADER_COLUMN_RULES:
+        if rule.matches(header_norm):
+            return col_type
+    return ""
@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+
+from .cache import PdfCache
+from .download import CacheWriter, PdfBytes, download_pdf, download_pdf_bytes, fresh_hit, is_remote, make_session, release
+from .layouts import use_templates
+from .output import FIELD_COLUMNS
+from .parse import ENGINE_CHOICES, ParsedBenefits
+from .pipeline import field_values, pdf_key, resolve, schedule
+from .store import ResultStore
+from .supervise import Limits, SupervisedPool
+from .timing import DocTiming, summarize
+
+# Latencies kept per endpoint for /metrics; older samples roll off.
+LATENCY_SAMPLES = 10_000
+MAX_BATCH = 1000
+# Each warm-up task holds its worker this long, so the tasks land on different workers.
+WARM_HOLD = 0.2
+
+
+def _warm() -> int:
+    # Unpickling this function imports the parser in the worker; run once per worker
+    # at startup so the first request pays for neither the spawn nor the imports.
+    time.sleep(WARM_HOLD)
+    return os.getpid()
+
+
+def _result(
+    url: str | None,
+    key: str | None,
+    parsed: ParsedBenefits | None,
+    error: str | None,
+    source: str,
+    timing: DocTiming | None = None,
+) -> dict[str, Any]:
+    # source: "parsed" (this request ran the parse), "store" (memoized result),
+    # "shared" (joined a parse already running for the same document) or "download"
+    # (the fetch failed).
+    return {
+        "url": url,
+        "sha256": key,
+        "fields": dict(zip(FIELD_COLUMNS, field_values(parsed))) if parsed is not None else None,
+        "error": error,
+        "source": source,
+        "stages": timing.stages if timing is not None else None,
+    }
+
+
+class Metrics:
+    # Latencies by group ("requests" per endpoint, "documents" per download/parse step)
+    # and name, plus plain counters.
+    def __init__(self) -> None:
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._latency: dict[tuple[str, str], deque[float]] = {}
+        self._calls: Counter[tuple[str, str]] = Counter()
+        self._errors: Counter[tuple[str, str]] = Counter()
+        self._counters: Counter[str] = Counter()
+
+    def observe(self, group: str, name: str, seconds: float, ok: bool = True) -> None:
+        key = (group, name)
+        with self._lock:
+            samples = self._latency.get(key)
+            if samples is None:
+                samples = self._latency[key] = deque(maxlen=LATENCY_SAMPLES)
+            samples.append(seconds)
+            self._calls[key] += 1
+            if not ok:
+                self._errors[key] += 1
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def to_dict(self) -> dict[str, Any]:
+        payload: dict[str, Any] = {"uptime_seconds": time.time() - self.started, "requests": {}, "documents": {}}
+        with self._lock:
+            for (group, name), samples in sorted(self._latency.items()):
+                payload[group][name] = {
+                    "count": self._calls[group, name],
+                    "errors": self._errors[group, name],
+                    "latency": summarize(samples),
+                }
+            payload["counters"] = dict(sorted(self._counters.items()))
+        return payload
+
+
+# Warm parse workers plus the PDF cache and result store, shared by every request.
+# Concurrent requests for one URL share a single download, and requests that resolve
+# to the same document (by sha256, uploads included) share a single parse. As in a
+# CLI run, a URL fetched once is treated as fresh for the life of the service.
+class ParseService:
+    def __init__(
+        self,
+        workers: int = 2,
+        engine: str = "pdfplumber",
+        cache: PdfCache | None = None,
+        store: ResultStore | None = None,
+        limits: Limits | None = None,
+        batch_workers: int = 4,
+        allow_local_paths: bool = False,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.engine = engine
+        self.cache = cache
+        self.store = store
+        self.allow_local_paths = allow_local_paths
+        self.session = make_session(pool_size=max(batch_workers, 4))
+        self.writer = CacheWriter(cache) if cache is not None else None
+        if limits is not None and limits.active:
+            self.pool = SupervisedPool(self.workers, limits)
+        else:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.batch_pool = ThreadPoolExecutor(max_workers=max(1, batch_workers), thread_name_prefix="sbc-batch")
+        self.metrics = Metrics()
+        self._lock = threading.Lock()
+        self._urls: dict[str, Future] = {}
+        self._docs: dict[str, Future] = {}
+        self._saved: set[str] = set()
+        for job in [self.pool.submit(_warm) for _ in range(self.workers)]:
+            job.result()
+
+    def close(self) -> None:
+        self.batch_pool.shutdown(wait=True)
+        self.pool.shutdown(wait=True)
+        if self.writer is not None:
+            self.writer.close()
+        if self.store is not None:
+            self.store.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def check_url(self, url: str) -> None:
+        if not url:
+            raise ValueError("missing url")
+        if not is_remote(url) and not self.allow_local_paths:
+            raise ValueError(f"not an http(s) URL: {url} (start the service with --allow-local-paths to parse local files)")
+
+    def parse_url(self, url: str) -> dict[str, Any]:
+        self.check_url(url)
+        with self._lock:
+            shared = self._urls.get(url)
+            if shared is None:
+                mine = self._urls[url] = Future()
+        if shared is not None:
+            self.metrics.count("coalesced_urls")
+            return {**shared.result(), "coalesced": True}
+        try:
+            result = self._fetch_and_parse(url)
+        except Exception as exc:
+            result = _result(url, None, None, str(exc), "parsed")
+        with self._lock:
+            del self._urls[url]
+        mine.set_result(result)
+        return {**result, "coalesced": False}
+
+    def parse_upload(self, data: bytes) -> dict[str, Any]:
+        self.metrics.count("uploads")
+        return self.parse_document(PdfBytes(data, hashlib.sha256(data).hexdigest()))
+
+    def parse_batch(self, urls: list[str]) -> list[dict[str, Any]]:
+        for url in urls:
+            self.check_url(url)
+        return list(self.batch_pool.map(self.parse_url, urls))
+
+    def _fetch(self, url: str) -> Path | PdfBytes:
+        if not is_remote(url):
+            return download_pdf(url)
+        body = self.writer.queued(url) if self.writer is not None else None
+        if body is not None:
+            return body
+        # Revalidated earlier in this process and still on disk; an evicted blob is
+        # fetched again below, through the service's own session.
+        hit = fresh_hit(url, self.cache)
+        if hit is not None:
+            return hit
+        body = download_pdf_bytes(url, session=self.session, cache=self.cache)
+        if isinstance(body, PdfBytes) and self.writer is not None:
+            self.writer.submit(url, body)
+        return body
+
+    def _fetch_and_parse(self, url: str) -> dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            pdf = self._fetch(url)
+        except Exception as exc:
+            self.metrics.observe("documents", "download", time.perf_counter() - start, ok=False)
+            return _result(url, None, None, str(exc), "download")
+        self.metrics.observe("documents", "download", time.perf_counter() - start)
+        try:
+            return self.parse_document(pdf, url)
+        finally:
+            release(pdf, cache=self.cache)
+
+    def parse_document(self, pdf: Path | PdfBytes, url: str | None = None) -> dict[str, Any]:
+        try:
+            key = pdf_key(pdf)
+        except OSError as exc:
+            return _result(url, None, None, str(exc), "parsed")
+        # The lock only guards the in-flight map; scheduling (store lookups, a rules
+        # replay) and the parse itself run outside it.
+        with self._lock:
+            shared = self._docs.get(key)
+            if shared is None:
+                mine = self._docs[key] = Future()
+        if shared is not None:
+            self.metrics.count("coalesced_parses")
+            parsed, error = shared.result()
+            return _result(url, key, parsed, error, "shared")
+        parsed, error = None, "parse did not finish"
+        try:
+            start = time.perf_counter()
+            parsed, extractions, error, timing = resolve(
+                schedule(self.pool.submit, pdf, key, self.engine, self.store, self._saved)
+            )
+            self.metrics.observe("documents", "parse", time.perf_counter() - start, ok=error is None)
+            if self.store is not None and parsed is not None and key not in self._saved:
+                self.store.put(key, parsed, extractions)
+                self.store.commit()
+                self._saved.add(key)
+        finally:
+            with self._lock:
+                del self._docs[key]
+            mine.set_result((parsed, error))
+        # schedule returns stored results without timings.
+        return _result(url, key, parsed, error, "parsed" if timing is not None or error else "store", timing)
+
+    def metrics_dict(self) -> dict[str, Any]:
+        payload = self.metrics.to_dict()
+        with self._lock:
+            payload["in_flight"] = {"urls": len(self._urls), "documents": len(self._docs)}
+        payload["workers"] = self.workers
+        payload["engine"] = self.engine
+        return payload
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: ParseService, max_upload: int) -> None:
+        super().__init__(address, _Handler)
+        self.service = service
+        self.max_upload = max_upload
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # GET  /parse?url=...          one document by URL
+    # POST /upload                 one document; the request body is the PDF
+    # POST /batch {"urls": [...]}  many URLs; results in request order
+    # GET  /metrics                latency percentiles per endpoint and service counters
+    server: _Server
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        parts = urlsplit(self.path)
+        if parts.path == "/metrics":
+            self._send(200, self.server.service.metrics_dict())
+        elif parts.path == "/parse":
+            url = parse_qs(parts.query).get("url", [""])[0]
+            self._handle("parse", lambda: self.server.service.parse_url(url))
+        else:
+            self._send(404, {"error": f"no such endpoint: {parts.path}"})
+
+    def do_POST(self) -> None:
+        path = urlsplit(self.path).path
+        header = self.headers.get("Content-Length")
+        if header is None:
+            # No length to read the body by, so the connection cannot be reused.
+            self.close_connection = True
+            self._send(411, {"error": "Content-Length required"})
+            return
+        if not (header.isascii() and header.isdigit()):
+            self.close_connection = True
+            self._send(400, {"error": f"bad Content-Length: {header!r}"})
+            return
+        length = int(header)
+        if length > self.server.max_upload:
+            self.close_connection = True
+            self._send(413, {"error": f"request body over {self.server.max_upload} bytes"})
+            return
+        # Read the body even for an unknown path, so the next request on a kept-alive
+        # connection starts where it should.
+        body = self.rfile.read(length)
+        if path not in ("/upload", "/batch"):
+            self._send(404, {"error": f"no such endpoint: {path}"})
+        elif path == "/upload":
+            self._handle("upload", lambda: self.server.service.parse_upload(body))
+        else:
+            self._handle("batch", lambda: {"results": self.server.service.parse_batch(_batch_urls(body))})
+
+    def _handle(self, name: str, run: Callable[[], dict[str, Any]]) -> None:
+        start = time.perf_counter()
+        try:
+            payload = run()
+        except ValueError as exc:
+            self.server.service.metrics.observe("requests", name, time.perf_counter() - start, ok=False)
+            self._send(400, {"error": str(exc)})
+            return
+        except Exception as exc:
+            # A store or pool failure: still answer, so the client is not left waiting.
+            self.server.service.metrics.observe("requests", name, time.perf_counter() - start, ok=False)
+            self._send(500, {"error": f"{type(exc).__name__}: {exc}"})
+            return
+        results = payload.get("results", [payload])
+        self.server.service.metrics.observe("requests", name, time.perf_counter() - start, ok=not any(r["error"] for r in results))
+        self._send(200, payload)
+
+    def _send(self, status: int, payload: dict[str, Any]) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _batch_urls(body: bytes) -> list[str]:
+    try:
+        urls = json.loads(body or b"{}").get("urls")
+    except (ValueError, AttributeError):
+        raise ValueError('expected a JSON body {"urls": [...]}') from None
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        raise ValueError('expected a JSON body {"urls": [...]}')
+    if len(urls) > MAX_BATCH:
+        raise ValueError(f"at most {MAX_BATCH} URLs per batch")
+    return urls
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serve SBC parsing over local HTTP from warm worker processes")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (0 picks a free one)")
+    parser.add_argument("--workers", type=int, default=2, help="Warm parse worker processes")
+    parser.add_argument("--batch-workers", type=int, default=4, help="Concurrent downloads per /batch request")
+    parser.add_argument("--engine", choices=ENGINE_CHOICES, default="pdfplumber", help="Table/text extraction backend")
+    parser.add_argument("--layout-templates", default=None, help="Layout template registry from scripts/layout_templates.py")
+    parser.add_argument("--cache-dir", default=None, help="Content-addressed PDF cache directory")
+    parser.add_argument("--cache-max-gb", type=float, default=20.0, help="Evict least-recently-used cached PDFs beyond this size")
+    parser.add_argument("--results-db", default=None, help="SQLite store memoizing tables and parsed results by PDF hash")
+    parser.add_argument("--doc-timeout", type=float, default=300.0, help="Kill and recycle a worker after N seconds on one PDF (0 disables)")
+    parser.add_argument("--max-rss-mb", type=int, default=3072, help="Kill and recycle a worker whose RSS exceeds N MB (0 disables)")
+    parser.add_argument("--max-upload-mb", type=float, default=50.0, help="Largest accepted request body")
+    parser.add_argument("--allow-local-paths", action="store_true", help="Also accept local file paths as /parse and /batch URLs")
+    args = parser.parse_args()
+
+    if args.layout_templates:
+        try:
+            use_templates(Path(args.layout_templates))
+        except (OSError, ValueError, KeyError) as exc:
+            parser.error(f"--layout-templates: {exc}")
+    cache = PdfCache(Path(args.cache_dir), max_bytes=int(args.cache_max_gb * 1024**3)) if args.cache_dir else None
+    store = ResultStore(Path(args.results_db), engine=args.engine) if args.results_db else None
+    service = ParseService(
+        workers=args.workers,
+        engine=args.engine,
+        cache=cache,
+        store=store,
+        limits=Limits(timeout=args.doc_timeout or None, max_rss_bytes=args.max_rss_mb * 1024**2 or None),
+        batch_workers=args.batch_workers,
+        allow_local_paths=args.allow_local_paths,
+    )
+    server = _Server((args.host, args.port), service, int(args.max_upload_mb * 1024**2))
+    host, port = server.server_address[:2]
+    print(f"serving on http://{host}:{port} workers={service.workers} engine={args.engine}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+
+
+def shard_key(idx: int, url: str) -> str:
+    # Rows are placed by URL, so every row pointing at one SBC lands on the same shard
+    # and shares its download and parse; rows without a URL are spread by position.
+    return url or f"row:{idx}"
+
+
+def shard_of(key: str, count: int) -> int:
+    # Stable across machines and Python processes (unlike hash()).
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+@dataclass(frozen=True)
+class Shard:
+    # Shard index (1-based) of count.
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, text: str) -> Shard:
+        try:
+            index, count = (int(part) for part in text.split("/"))
+        except ValueError:
+            raise ValueError(f"expected K/N, got {text!r}") from None
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"expected 1 <= K <= N, got {text!r}")
+        return cls(index, count)
+
+    @property
+    def label(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def owns(self, idx: int, url: str) -> bool:
+        return shard_of(shard_key(idx, url), self.count) == self.index - 1
+
+
+def shard_path(out_path: Path, shard: Shard) -> Path:
+    # out.csv -> out.shard2of4.csv; a Parquet directory out -> out.shard2of4. The
+    # manifest and other sidecars follow the shard's own output path.
+    return out_path.with_name(f"{out_path.stem}.shard{shard.index}of{shard.count}{out_path.suffix}")
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import zlib
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+from .parse import Extraction, ParsedBenefits, engines_for, extraction_fingerprint, rules_fingerprint
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    sha256 TEXT NOT NULL,
+    version TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (sha256, version)
+);
+CREATE TABLE IF NOT EXISTS results (
+    sha256 TEXT NOT NULL,
+    version TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (sha256, version)
+);
+"""
+
+
+def pack(value: object) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def unpack(blob: bytes) -> object:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+# Memoizes parse work by document hash. Extractions (engine tables + page text) are
+# keyed by each engine's extraction fingerprint and results by the rules fingerprint
+# of the selected engine mode, so a rule-only change replays stored tables instead of
+# reopening every PDF.
+class ResultStore:
+    def __init__(self, path: Path, engine: str = "pdfplumber") -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.engine = engine
+        self.extraction_versions = {name: extraction_fingerprint(name) for name in engines_for(engine)}
+        self.rules_version = rules_fingerprint(engine)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def get_result(self, sha: str) -> Optional[ParsedBenefits]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload FROM results WHERE sha256 = ? AND version = ?",
+                (sha, self.rules_version),
+            ).fetchone()
+        return ParsedBenefits(**json.loads(row[0])) if row else None
+
+    def get_extractions(self, sha: str) -> dict[str, Extraction]:
+        found = {}
+        with self._lock:
+            for engine, version in self.extraction_versions.items():
+                row = self._db.execute(
+                    "SELECT payload FROM extractions WHERE sha256 = ? AND version = ?",
+                    (sha, version),
+                ).fetchone()
+                if row:
+                    found[engine] = Extraction(**unpack(row[0]))
+        return found
+
+    def extraction_shas(self, engine: str) -> list[str]:
+        # Documents with stored tables for engine at its current extraction version.
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT sha256 FROM extractions WHERE version = ?",
+                (self.extraction_versions[engine],),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def put(
+        self,
+        sha: str,
+        parsed: ParsedBenefits,
+        extractions: Optional[dict[str, Extraction]] = None,
+    ) -> None:
+        with self._lock:
+            for engine, extraction in (extractions or {}).items():
+                self._db.execute(
+                    "INSERT OR REPLACE INTO extractions (sha256, version, payload) VALUES (?, ?, ?)",
+                    (sha, self.extraction_versions[engine], pack(extraction.payload())),
+                )
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (sha256, version, payload) VALUES (?, ?, ?)",
+                (sha, self.rules_version, json.dumps(asdict(parsed))),
+            )
+
+    def commit(self) -> None:
+        with self._lock:
+            self._db.commit()
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+try:
+    import psutil
+except ImportError:  # optional; /proc is used on Linux, and the RSS cap is off elsewhere
+    psutil = None
+
+# How often a busy worker's RSS is sampled (once as the task starts, then at this
+# interval). Results are picked up as soon as they arrive; this only bounds how late
+# a limit breach is noticed.
+POLL_SECONDS = 0.25
+
+
+@dataclass(frozen=True)
+class Limits:
+    timeout: Optional[float] = None
+    max_rss_bytes: Optional[int] = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.timeout) or bool(self.max_rss_bytes)
+
+
+class LimitExceeded(Exception):
+    # str() is the bare reason ("timeout", "oom", "crashed") so it lands in the
+    # output `error` column as a stable, filterable value.
+    def __init__(self, reason: str, seconds: float, rss_bytes: Optional[int] = None) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.seconds = seconds
+        self.rss_bytes = rss_bytes
+
+    def __str__(self) -> str:
+        return self.reason
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _worker_main(conn) -> None:
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            reply = (True, fn(*args))
+        except Exception as exc:
+            reply = (False, exc)
+        try:
+            conn.send(reply)
+        except Exception as exc:
+            # Unpicklable exception or result: report it as text instead.
+            conn.send((False, RuntimeError(str(reply[1]) if not reply[0] else f"unpicklable result: {exc}")))
+
+
+class _Slot:
+    # One worker process plus the thread that feeds it tasks and watches its limits.
+    def __init__(self, pool: SupervisedPool, index: int) -> None:
+        self.pool = pool
+        self.process = None
+        self.conn = None
+        self.thread = threading.Thread(target=self._run, name=f"sbc-supervise-{index}", daemon=True)
+        self.thread.start()
+
+    def _spawn(self) -> None:
+        ctx = multiprocessing.get_context()
+        parent, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.conn = parent
+
+    def _kill(self) -> None:
+        if self.process is not None:
+            self.process.kill()
+            self.process.join()
+            self.conn.close()
+        self.process = self.conn = None
+
+    def _run(self) -> None:
+        while True:
+            task = self.pool._tasks.get()
+            if task is None:
+                break
+            job, fn, args = task
+            if not job.set_running_or_notify_cancel():
+                continue
+            try:
+                if self.process is None:
+                    self._spawn()
+                self.conn.send((fn, args))
+                ok, value = self._wait()
+            except BaseException as exc:
+                self._kill()
+                job.set_exception(exc)
+                continue
+            if ok:
+                job.set_result(value)
+            else:
+                job.set_exception(value)
+        if self.process is not None:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(timeout=5)
+            self._kill()
+
+    def _wait(self) -> tuple[bool, Any]:
+        limits = self.pool.limits
+        start = time.monotonic()
+        peak = None
+        while True:
+            # RSS is sampled on every pass, including the first, so a worker that
+            # allocates quickly is checked before it can finish or be killed by the OS.
+            if limits.max_rss_bytes:
+                rss = rss_bytes(self.process.pid)
+                if rss is not None:
+                    peak = max(peak or 0, rss)
+                    if rss > limits.max_rss_bytes and not self.conn.poll():
+                        self._kill()
+                        return False, LimitExceeded("oom", time.monotonic() - start, rss)
+            elapsed = time.monotonic() - start
+            wait = POLL_SECONDS
+            if limits.timeout:
+                if elapsed >= limits.timeout:
+                    self._kill()
+                    return False, LimitExceeded("timeout", elapsed, peak)
+                wait = min(wait, limits.timeout - elapsed)
+            if self.conn.poll(wait):
+                try:
+                    reply = self.conn.recv()
+                except EOFError:
+                    pass
+                else:
+                    if limits.max_rss_bytes and (rss_bytes(self.process.pid) or 0) > limits.max_rss_bytes:
+                        # Finished over the cap: keep the result, but recycle the worker
+                        # so the memory it kept is not charged to the next document.
+                        self._kill()
+                    return reply
+            if not self.process.is_alive():
+                # Killed from outside (often the OS OOM killer) or crashed in native code.
+                code = self.process.exitcode
+                self._kill()
+                return False, LimitExceeded("crashed", time.monotonic() - start, peak) if code else RuntimeError("worker exited")
+
+
+class SupervisedPool:
+    # Drop-in for the submit()/shutdown() subset of ProcessPoolExecutor, except that
+    # each task runs under a wall-clock timeout and an RSS cap. A worker that breaches
+    # either is killed and lazily replaced; its task fails with LimitExceeded.
+    def __init__(self, max_workers: int, limits: Limits) -> None:
+        self.limits = limits
+        self._tasks: queue.SimpleQueue = queue.SimpleQueue()
+        self._slots = [_Slot(self, i) for i in range(max(1, max_workers))]
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        job: Future = Future()
+        self._tasks.put((job, fn, args))
+        return job
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        if cancel_futures:
+            while True:
+                try:
+                    task = self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is not None:
+                    task[0].cancel()
+        for _ in self._slots:
+            self._tasks.put(None)
+        if wait:
+            for slot in self._slots:
+                slot.thread.join()
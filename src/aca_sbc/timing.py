@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import heapq
+import json
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+_local = threading.local()
+
+
+@dataclass
+class DocTiming:
+    # Seconds per pipeline stage for one document, plus its page count and layout
+    # fingerprint (with the template name when the fast path handled it).
+    stages: dict[str, float] = field(default_factory=dict)
+    pages: Optional[int] = None
+    layout: Optional[str] = None
+    template: Optional[str] = None
+
+
+@contextmanager
+def recording() -> Iterator[DocTiming]:
+    # Collects stage() timings made on this thread into a fresh DocTiming.
+    previous = getattr(_local, "doc", None)
+    doc = _local.doc = DocTiming()
+    try:
+        yield doc
+    finally:
+        _local.doc = previous
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    # No-op unless a recording() is active on this thread. Stages are exclusive: time
+    # spent in a nested stage is not also charged to the enclosing one.
+    doc = getattr(_local, "doc", None)
+    if doc is None:
+        yield
+        return
+    outer_nested = getattr(_local, "nested", 0.0)
+    _local.nested = 0.0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        doc.stages[name] = doc.stages.get(name, 0.0) + elapsed - _local.nested
+        _local.nested = outer_nested + elapsed
+
+
+def note_pages(count: int) -> None:
+    doc = getattr(_local, "doc", None)
+    if doc is not None:
+        doc.pages = count
+
+
+def note_layout(fingerprint: str, template: Optional[str]) -> None:
+    # First call wins: with --engine auto that is the primary engine's layout.
+    doc = getattr(_local, "doc", None)
+    if doc is not None and doc.layout is None:
+        doc.layout = fingerprint
+        doc.template = template
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    # Nearest-rank percentile over an already sorted list.
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(q * (len(ordered) - 1)))))
+    return ordered[rank]
+
+
+def summarize(values: array) -> dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "total": sum(ordered),
+        "p50": _percentile(ordered, 0.50),
+        "p95": _percentile(ordered, 0.95),
+        "max": ordered[-1] if ordered else 0.0,
+    }
+
+
+# Aggregates DocTimings for a whole run into per-stage p50/p95/max, page-count
+# stats, the slowest-N documents and layout clusters. Only rows that were parsed in
+# this run carry a DocTiming; rows sharing another row's parse, memoized results and
+# failed rows count towards rows but not documents. Download times are a separate
+# series covering every fetch. Clusters are ranked by documents that took the
+# generic table scan, so the top ones are the templates most worth registering
+# (scripts/layout_templates.py).
+class RunProfile:
+    def __init__(self, slowest: int = 25, clusters: int = 25) -> None:
+        self.started = time.time()
+        self.slowest_n = slowest
+        self.clusters_n = clusters
+        self.rows = 0
+        self._lock = threading.Lock()
+        self._stages: dict[str, array] = {}
+        self._totals = array("d")
+        self._pages = array("d")
+        self._download_seconds = array("d")
+        self._slowest: list[tuple[float, int, dict[str, Any]]] = []
+        self._downloads: dict[Any, float] = {}
+        self._layouts: dict[str, dict[str, Any]] = {}
+
+    def record_download(self, key: Any, seconds: float) -> None:
+        # Called from download threads; merged into the document record by add().
+        with self._lock:
+            self._downloads[key] = seconds
+
+    def add(self, key: Any, label: str, timing: Optional[DocTiming]) -> None:
+        with self._lock:
+            self.rows += 1
+            download = self._downloads.pop(key, None)
+            if download is not None:
+                self._download_seconds.append(download)
+            if timing is None:
+                return
+            stages = dict(timing.stages)
+            for name, seconds in stages.items():
+                self._stages.setdefault(name, array("d")).append(seconds)
+            total = sum(stages.values())
+            self._totals.append(total)
+            pages = timing.pages
+            if pages is not None:
+                self._pages.append(pages)
+            if timing.layout is not None:
+                cluster = self._layouts.get(timing.layout)
+                if cluster is None:
+                    cluster = self._layouts[timing.layout] = {
+                        "layout": timing.layout,
+                        "docs": 0,
+                        "generic_docs": 0,
+                        "template": None,
+                        "rules_seconds": 0.0,
+                        "example": label,
+                    }
+                cluster["docs"] += 1
+                cluster["rules_seconds"] += stages.get("rules", 0.0)
+                if timing.template is None:
+                    cluster["generic_docs"] += 1
+                else:
+                    cluster["template"] = timing.template
+            entry = {"doc": label, "total": total, "stages": stages, "pages": pages, "download": download}
+            item = (total, self.rows, entry)
+            if len(self._slowest) < self.slowest_n:
+                heapq.heappush(self._slowest, item)
+            elif total > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            wall = time.time() - self.started
+            return {
+                "rows": self.rows,
+                "documents_timed": len(self._totals),
+                "wall_seconds": wall,
+                "rows_per_second": self.rows / wall if wall > 0 else None,
+                "document_seconds": summarize(self._totals),
+                "download_seconds": summarize(self._download_seconds),
+                "stages": {name: summarize(values) for name, values in sorted(self._stages.items())},
+                "pages": summarize(self._pages),
+                "slowest": [entry for _, _, entry in sorted(self._slowest, reverse=True)],
+                "layouts": self._layout_summary(),
+            }
+
+    def _layout_summary(self) -> dict[str, Any]:
+        clusters = sorted(self._layouts.values(), key=lambda c: (c["generic_docs"], c["docs"]), reverse=True)
+        docs = sum(c["docs"] for c in clusters)
+        fast = docs - sum(c["generic_docs"] for c in clusters)
+        return {
+            "distinct": len(clusters),
+            "documents": docs,
+            "fast_path_documents": fast,
+            "fast_path_share": fast / docs if docs else None,
+            "clusters": [dict(c) for c in clusters[: self.clusters_n]],
+        }
+
+    def write(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+
+
+def profile_path(out_path: Path) -> Path:
+    return out_path.with_name(out_path.name + ".profile.json")
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import csv
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, Mapping, Sequence
+
+# Reading the tracker CSV (one row per plan, with the SBC URL), shared by the CLI and
+# the shard merge so both see the same rows, columns and URLs.
+
+Row = Mapping[str, str]
+
+
+def detect_url_column(columns: Sequence[str]) -> str:
+    for candidate in [
+        "URLForSummaryofBenefitsCoverage",
+        "url",
+        "URL",
+        "pdf",
+        "PDF",
+        "link",
+        "Link",
+    ]:
+        if candidate in columns:
+            return candidate
+    return columns[0]
+
+
+def get_col(columns: Sequence[str], *candidates: str) -> str | None:
+    for name in candidates:
+        if name in columns:
+            return name
+    return None
+
+
+def cell(row: Row, col: str | None) -> str:
+    return (row.get(col) or "").strip() if col else ""
+
+
+def read_columns(path: Path) -> list[str]:
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        return next(csv.reader(fh), [])
+
+
+def iter_input(path: Path, start: int = 0) -> Iterator[dict[str, str]]:
+    # Streams input rows one at a time; memory does not grow with the tracker size.
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        yield from islice(csv.DictReader(fh), start, None)
+
+
+def count_records(path: Path) -> int:
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        return max(0, sum(1 for _ in csv.reader(fh)) - 1)
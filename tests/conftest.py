@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import csv
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+# The package runs from the source tree (PYTHONPATH=src); the synthetic corpus
+# generator lives with the other scripts.
+for path in (ROOT / "src", ROOT / "scripts"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from synthetic_sbc import generate_corpus  # noqa: E402
+
+
+# Local stand-in for the SBC hosts: serves registered bodies by path, can fail a
+# path with 503 a few times first or stall each response, and records how many
+# requests it saw and the most it handled at once.
+class StandInServer:
+    def __init__(self) -> None:
+        self.bodies: dict[str, bytes] = {}
+        self.failures: Counter[str] = Counter()
+        self.delay = 0.0
+        self.hits: Counter[str] = Counter()
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                with server._lock:
+                    server.hits[self.path] += 1
+                    server.active += 1
+                    server.peak = max(server.peak, server.active)
+                    failing = server.failures[self.path] > 0
+                    if failing:
+                        server.failures[self.path] -= 1
+                try:
+                    time.sleep(server.delay)
+                    body = server.bodies.get(self.path)
+                    if failing or body is None:
+                        self.send_error(503 if failing else 404)
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/pdf")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+            def log_message(self, *_args) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}{path}"
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def stand_in() -> Iterator[StandInServer]:
+    server = StandInServer()
+    try:
+        yield server
+    finally:
+        server.close()
+
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory: pytest.TempPathFactory):
+    # A few small synthetic SBCs, one per layout, shared by every test.
+    return generate_corpus(tmp_path_factory.mktemp("corpus"), 6, seed=7, min_pages=2, max_pages=3)
+
+
+@pytest.fixture
+def tracker(tmp_path: Path, corpus) -> Path:
+    # Tracker CSV over the corpus as local paths; every PDF appears twice, so rows
+    # share documents as in the real tracker.
+    path = tmp_path / "tracker.csv"
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["StateCode", "IssuerMarketPlaceMarketingName", "PlanMarketingName", "URLForSummaryofBenefitsCoverage"])
+        for idx in range(2 * len(corpus)):
+            doc = corpus[idx % len(corpus)]
+            writer.writerow(["TX", f"Issuer {idx}", f"Plan {idx}", str(doc.path)])
+    return path
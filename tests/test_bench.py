@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import bench_parser
+
+
+def test_rule_timings_use_the_selected_engine(monkeypatch, corpus):
+    engines: list[str] = []
+    extract_document = bench_parser.extract_document
+
+    def recording(source, engine="pdfplumber"):
+        engines.append(engine)
+        return extract_document(source, engine)
+
+    monkeypatch.setattr(bench_parser, "extract_document", recording)
+    for engine, expected in (("pymupdf", "pymupdf"), ("auto", "pymupdf"), ("pdfplumber", "pdfplumber")):
+        engines.clear()
+        report = bench_parser.run_bench(corpus[:2], engine, rule_repeat=1)
+        assert engines == [expected, expected]
+        assert report["accuracy"]["overall"] == 1.0
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+from aca_sbc import cli
+from aca_sbc.corpus import REPLAY_FIELDS, CorpusIndex, build_index, fts_phrase, replay
+from aca_sbc.store import ResultStore
+
+PHRASE = fts_phrase("what is the overall deductible")
+
+
+def _run(monkeypatch, *argv: str) -> int:
+    monkeypatch.setattr(sys, "argv", ["aca_sbc.cli", *argv])
+    return cli.main()
+
+
+@pytest.fixture
+def results_db(monkeypatch, tmp_path, tracker) -> Path:
+    path = tmp_path / "results.sqlite"
+    assert _run(monkeypatch, "--csv", str(tracker), "--out", str(tmp_path / "out.csv"), "--results-db", str(path)) == 0
+    return path
+
+
+def _build(path: Path, pdfs: list[Path], results_db: Path | None = None) -> dict:
+    store = ResultStore(results_db, engine="pdfplumber") if results_db is not None else None
+    index = CorpusIndex(path)
+    try:
+        return build_index(index, pdfs, "pdfplumber", store=store)
+    finally:
+        index.close()
+        if store is not None:
+            store.close()
+
+
+def test_pdf_pass_fills_page_text_of_documents_imported_from_the_store(tmp_path, corpus, results_db):
+    pdfs = [doc.path for doc in corpus]
+    report = _build(tmp_path / "index.sqlite", pdfs, results_db)
+    assert (report["indexed_from_store"], report["indexed_from_pdfs"], report["text_from_pdfs"]) == (6, 0, 6)
+
+    reference = _build(tmp_path / "pdfs_only.sqlite", pdfs)
+    assert reference["indexed_from_pdfs"] == 6
+    assert (report["cells"], report["pages"]) == (reference["cells"], reference["pages"])
+
+    index = CorpusIndex(tmp_path / "index.sqlite")
+    try:
+        assert len(index.matching_documents(PHRASE, pages=True)) == 6
+        assert all(hit["source"] for hit in index.search(PHRASE, pages=True))
+    finally:
+        index.close()
+
+    again = _build(tmp_path / "index.sqlite", pdfs, results_db)
+    assert (again["up_to_date"], again["indexed_from_store"], again["text_from_pdfs"]) == (6, 0, 0)
+
+
+def test_store_only_build_is_completed_by_a_later_pdf_pass(tmp_path, corpus, results_db):
+    path = tmp_path / "index.sqlite"
+    assert _build(path, [], results_db)["indexed_from_store"] == 6
+    report = _build(path, [doc.path for doc in corpus])
+    assert (report["up_to_date"], report["indexed_from_pdfs"], report["text_from_pdfs"]) == (0, 0, 6)
+
+
+def test_query_finds_table_cells(tmp_path, corpus):
+    path = tmp_path / "index.sqlite"
+    _build(path, [doc.path for doc in corpus])
+    index = CorpusIndex(path)
+    try:
+        docs = index.matching_documents(PHRASE)
+        hits = index.search(PHRASE, limit=3)
+    finally:
+        index.close()
+    assert len(docs) == 6
+    assert len(hits) == 3
+    assert all("deductible" in hit["text"].lower() for hit in hits)
+
+
+def test_replay_compares_against_a_baseline(tmp_path, corpus):
+    path = tmp_path / "index.sqlite"
+    _build(path, [doc.path for doc in corpus])
+    first = tmp_path / "replay.csv"
+    index = CorpusIndex(path)
+    try:
+        report = replay(index, out_path=first)
+        assert report["documents"] == 6
+        assert report["filled"]["deductible"] == 6
+
+        # Blank one document's deductible in the baseline: the replay fixes it.
+        with open(first, newline="", encoding="utf-8") as fh:
+            rows = list(csv.DictReader(fh))
+        rows[0]["deductible"] = ""
+        baseline = tmp_path / "baseline.csv"
+        with open(baseline, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, ["sha256", "source", *REPLAY_FIELDS])
+            writer.writeheader()
+            writer.writerows(rows)
+        report = replay(index, baseline_path=baseline)
+    finally:
+        index.close()
+    assert report["changes"]["deductible"] == {"changed": 1, "fixed": 1, "regressed": 0}
+    assert [doc["sha256"] for doc in report["changed_documents"]] == [rows[0]["sha256"]]
+    assert all(report["changes"][name]["changed"] == 0 for name in REPLAY_FIELDS[1:])
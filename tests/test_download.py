@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from aca_sbc.cache import PdfCache
+from aca_sbc.download import PdfBytes, make_session, prefetch, release
+
+
+def _serve(stand_in, count: int) -> list[str]:
+    urls = []
+    for idx in range(count):
+        stand_in.bodies[f"/sbc/{idx}.pdf"] = f"%PDF-1.4 document {idx}".encode()
+        urls.append(stand_in.url(f"/sbc/{idx}.pdf"))
+    return urls
+
+
+def _body(result) -> bytes:
+    return result.data if isinstance(result, PdfBytes) else Path(result).read_bytes()
+
+
+def test_prefetch_yields_in_input_order_within_per_host_limit(stand_in, tmp_path):
+    urls = _serve(stand_in, 12)
+    stand_in.delay = 0.05
+    items = [(idx, url) for idx, url in enumerate(urls)]
+    results = list(prefetch(items, workers=8, ahead=12, per_host=2, dest_dir=tmp_path))
+    assert [item for item, _ in results] == list(range(12))
+    for idx, result in results:
+        assert _body(result) == f"%PDF-1.4 document {idx}".encode()
+        release(result, tmp_path)
+    assert stand_in.peak == 2
+    assert not list(tmp_path.iterdir())
+
+
+def test_prefetch_stays_within_its_window(stand_in, tmp_path):
+    urls = _serve(stand_in, 10)
+    fetched = prefetch(enumerate(urls), workers=4, ahead=3, dest_dir=tmp_path)
+    idx, first = next(fetched)
+    assert idx == 0
+    assert sum(stand_in.hits.values()) <= 3
+    release(first, tmp_path)
+    fetched.close()
+    # Downloads finished ahead of an early stop are cleaned up.
+    assert not list(tmp_path.iterdir())
+
+
+def test_prefetch_retries_transient_errors_and_reports_failures(stand_in, tmp_path):
+    urls = _serve(stand_in, 2)
+    stand_in.failures["/sbc/0.pdf"] = 1
+    missing = stand_in.url("/sbc/missing.pdf")
+    results = dict(prefetch(enumerate([urls[0], missing, urls[1]]), dest_dir=tmp_path, in_memory=True))
+    assert _body(results[0]) == b"%PDF-1.4 document 0"
+    assert stand_in.hits["/sbc/0.pdf"] == 2
+    assert isinstance(results[1], Exception)
+    assert _body(results[2]) == b"%PDF-1.4 document 1"
+
+
+def test_prefetch_serves_repeated_urls_from_the_cache(stand_in, tmp_path):
+    urls = _serve(stand_in, 1)
+    cache = PdfCache(tmp_path / "cache")
+    try:
+        for in_memory in (False, True):
+            for _, result in prefetch(enumerate([urls[0]] * 3), workers=1, ahead=1, cache=cache, in_memory=in_memory):
+                assert _body(result) == b"%PDF-1.4 document 0"
+                release(result, cache=cache)
+    finally:
+        cache.close()
+    assert stand_in.hits["/sbc/0.pdf"] == 1
+
+
+def test_prefetch_refetches_evicted_blobs_through_its_own_session(stand_in, tmp_path):
+    urls = _serve(stand_in, 1)
+    cache = PdfCache(tmp_path / "cache")
+    session = make_session()
+    sent = []
+    send = session.send
+    session.send = lambda request, **kwargs: sent.append(request.url) or send(request, **kwargs)
+    try:
+        for _, result in prefetch([(0, urls[0])], cache=cache, session=session):
+            release(result, cache=cache)
+        # Still fresh for this process, but the blob is gone.
+        cache.path_for(cache.lookup(urls[0]).sha256).unlink()
+        for _, result in prefetch([(0, urls[0])], cache=cache, session=session):
+            assert _body(result) == b"%PDF-1.4 document 0"
+            release(result, cache=cache)
+    finally:
+        cache.close()
+    assert sent == [urls[0], urls[0]]
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import csv
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+from aca_sbc import cli, pipeline
+
+# Parse in-process (no limits, one worker) so the test can count parses.
+INLINE = ("--doc-timeout", "0", "--max-rss-mb", "0")
+
+
+def _run(monkeypatch, *argv: str) -> int:
+    monkeypatch.setattr(sys, "argv", ["aca_sbc.cli", *argv])
+    return cli.main()
+
+
+def _read(path: Path) -> list[dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as fh:
+        return list(csv.DictReader(fh))
+
+
+@pytest.fixture
+def parsed(monkeypatch) -> list[str]:
+    # Sources parsed by the run under test.
+    sources: list[str] = []
+    parse_fresh = pipeline.parse_fresh
+
+    def counting(source, *args):
+        sources.append(source)
+        return parse_fresh(source, *args)
+
+    monkeypatch.setattr(pipeline, "parse_fresh", counting)
+    return sources
+
+
+@pytest.fixture
+def baseline(monkeypatch, tmp_path, tracker) -> Path:
+    out = tmp_path / "baseline.csv"
+    assert _run(monkeypatch, "--csv", str(tracker), "--out", str(out), *INLINE) == 0
+    return out
+
+
+def test_unchanged_rows_are_reused_byte_for_byte(monkeypatch, capsys, tmp_path, tracker, baseline, parsed):
+    out = tmp_path / "week2.csv"
+    capsys.readouterr()
+    assert _run(monkeypatch, "--csv", str(tracker), "--out", str(out), "--incremental", str(baseline), *INLINE) == 0
+    assert parsed == []
+    assert out.read_bytes() == baseline.read_bytes()
+    captured = capsys.readouterr()
+    assert "incremental: reused=12" in captured.err
+    assert "incremental" not in captured.out
+
+
+def test_refresh_blank_reparses_rows_blank_in_the_given_fields(monkeypatch, capsys, tmp_path, tracker, baseline, parsed):
+    # Blank one document's INN DED in the previous output (both of its rows).
+    rows = _read(baseline)
+    blanked = [0, 6]  # see the tracker fixture
+    for idx in blanked:
+        rows[idx]["INN DED"] = ""
+    previous = tmp_path / "previous.csv"
+    shutil.copy(baseline.with_name(baseline.name + ".rows.csv"), previous.with_name(previous.name + ".rows.csv"))
+    with open(previous, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    argv = ["--csv", str(tracker), "--incremental", str(previous), *INLINE]
+    assert _run(monkeypatch, *argv, "--out", str(tmp_path / "kept.csv")) == 0
+    assert parsed == []
+    assert [_read(tmp_path / "kept.csv")[idx]["INN DED"] for idx in blanked] == ["", ""]
+
+    capsys.readouterr()
+    assert _run(monkeypatch, *argv, "--out", str(tmp_path / "refreshed.csv"), "--refresh-blank", "INN DED") == 0
+    assert len(parsed) == 1
+    assert (tmp_path / "refreshed.csv").read_bytes() == baseline.read_bytes()
+    assert "blank=2" in capsys.readouterr().err
+
+
+def test_recheck_content_reparses_only_documents_whose_bytes_changed(monkeypatch, tmp_path, corpus, parsed):
+    # Tracker over copies of two PDFs, so one can be replaced behind its URL.
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    paths = [shutil.copy(doc.path, docs / f"plan{idx}.pdf") for idx, doc in enumerate(corpus[:2])]
+    tracker = tmp_path / "tracker.csv"
+    with open(tracker, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["StateCode", "IssuerMarketPlaceMarketingName", "PlanMarketingName", "URLForSummaryofBenefitsCoverage"])
+        for idx, path in enumerate(paths):
+            writer.writerow(["TX", f"Issuer {idx}", f"Plan {idx}", str(path)])
+    first = tmp_path / "first.csv"
+    assert _run(monkeypatch, "--csv", str(tracker), "--out", str(first), *INLINE) == 0
+    before = _read(first)
+    assert before[0]["INN DED"] != before[1]["INN DED"]
+
+    shutil.copy(corpus[1].path, paths[0])
+    parsed.clear()
+    argv = ["--csv", str(tracker), "--incremental", str(first), *INLINE]
+    assert _run(monkeypatch, *argv, "--out", str(tmp_path / "stale.csv")) == 0
+    assert parsed == []
+    assert _read(tmp_path / "stale.csv") == before
+
+    assert _run(monkeypatch, *argv, "--out", str(tmp_path / "rechecked.csv"), "--recheck-content") == 0
+    assert parsed == [str(paths[0])]
+    after = _read(tmp_path / "rechecked.csv")
+    assert after[1] == before[1]
+    assert after[0]["INN DED"] == before[1]["INN DED"]
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import copy
+
+from aca_sbc.layouts import layout_fingerprint
+from aca_sbc.parse import _scan_tables, _scan_template, derive_template, extract_document
+
+VALUES = ("deductible", "oop", "inn_coi", "inn_cop", "oon_coi", "oon_cop")
+
+
+def _values(found) -> tuple:
+    return tuple(getattr(found, name) for name in VALUES)
+
+
+def test_template_reads_the_same_values_as_the_generic_scan(corpus):
+    for doc in corpus:
+        tables = extract_document(str(doc.path)).tables
+        template = derive_template(tables, doc.name)
+        assert template is not None
+        fast = _scan_template(tables, template)
+        assert fast is not None
+        assert _values(fast) == _values(_scan_tables(tables))
+
+
+def test_template_declines_rows_with_other_labels(corpus):
+    tables = extract_document(str(corpus[0].path)).tables
+    template = derive_template(tables, "t")
+    changed = copy.deepcopy(tables)
+    table_idx, row_idx, _ = template.deductible
+    changed[table_idx][row_idx][0] = "What is the overall deductible for a family?"
+    assert layout_fingerprint(changed, "pdfplumber") == layout_fingerprint(tables, "pdfplumber")
+    assert _scan_template(changed, template) is None
+
+
+def test_fingerprint_covers_row_counts(corpus):
+    tables = extract_document(str(corpus[0].path)).tables
+    longer = copy.deepcopy(tables)
+    longer[-1].append(list(longer[-1][-1]))
+    assert layout_fingerprint(longer, "pdfplumber") != layout_fingerprint(tables, "pdfplumber")
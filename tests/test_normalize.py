@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from aca_sbc.normalize import Flag, TypedValue, typed_columns, typed_frame, typed_value
+
+CASES = [
+    ("$8,500", TypedValue(amount_cents=850000)),
+    ("$1,234.56 individual / $2,469.12 family", TypedValue(amount_cents=123456)),
+    ("$30 copay after deductible", TypedValue(amount_cents=3000)),
+    ("$0", TypedValue(amount_cents=0)),
+    ("0", TypedValue(amount_cents=0)),
+    ("0.00", TypedValue(amount_cents=0)),
+    ("20% coinsurance", TypedValue(percent=20.0)),
+    ("12.5 % coinsurance after deductible", TypedValue(percent=12.5)),
+    ("$25 copay; 10% coinsurance", TypedValue(amount_cents=2500, percent=10.0)),
+    ("No charge", TypedValue(flag=Flag.NO_CHARGE)),
+    ("No copayment", TypedValue(flag=Flag.NO_CHARGE)),
+    ("No coinsurance after deductible", TypedValue(flag=Flag.NO_CHARGE)),
+    ("Covered in full", TypedValue(flag=Flag.NO_CHARGE)),
+    ("Not covered", TypedValue(flag=Flag.NOT_COVERED)),
+    ("Not-covered; no charge for preventive", TypedValue(flag=Flag.NOT_COVERED)),
+    ("Unlimited", TypedValue(flag=Flag.UNLIMITED)),
+    ("See policy", TypedValue()),
+    ("", TypedValue()),
+    (None, TypedValue()),
+]
+
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_typed_value(text, expected):
+    assert typed_value(text) == expected
+
+
+def test_typed_columns_agree_with_typed_value():
+    texts = [text for text, _ in CASES] * 2
+    values = pd.Series(texts, index=range(100, 100 + len(texts)), dtype=object)
+    typed = typed_columns(values)
+    assert list(typed.columns) == ["amount_cents", "percent", "flag"]
+    assert typed.index.equals(values.index)
+    assert str(typed["amount_cents"].dtype) == "Int64"
+    assert str(typed["percent"].dtype) == "Float64"
+    assert list(typed["flag"].cat.categories) == [flag.value for flag in Flag]
+    for text, (amount, percent, flag) in zip(texts, typed.itertuples(index=False)):
+        expected = typed_value(text)
+        assert (None if pd.isna(amount) else amount) == expected.amount_cents, text
+        assert (None if pd.isna(percent) else percent) == expected.percent, text
+        assert (None if pd.isna(flag) else flag) == (expected.flag and expected.flag.value), text
+
+
+def test_typed_columns_of_an_empty_or_all_missing_column():
+    assert typed_columns(pd.Series([], dtype=object)).empty
+    typed = typed_columns(pd.Series([None, None], dtype=object))
+    assert typed.isna().all().all()
+
+
+def test_typed_frame_names_one_block_per_column():
+    df = pd.DataFrame({"INN DED": ["$500", "No charge"], "INN OOP": ["$3,000", None]})
+    typed = typed_frame(df, ["INN DED", "INN OOP"])
+    assert list(typed.columns) == [
+        "INN DED cents", "INN DED pct", "INN DED flag",
+        "INN OOP cents", "INN OOP pct", "INN OOP flag",
+    ]
+    assert typed["INN DED cents"].tolist() == [50000, pd.NA]
+    assert typed["INN DED flag"].isna().tolist() == [True, False]
+    assert typed["INN DED flag"].iloc[1] == Flag.NO_CHARGE
+    assert typed["INN OOP cents"].tolist() == [300000, pd.NA]
+    assert typed_frame(df, []).index.equals(df.index)
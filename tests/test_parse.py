@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from aca_sbc.parse import _anchor_pages, _page_has_anchor
+
+QUESTIONS = "Important Questions What is the overall deductible? $500 What is the out-of-pocket limit for this plan? $3,000"
+
+
+def test_page_anchors_accept_every_outpatient_context_the_rule_accepts():
+    for context in ("mental health", "substance use disorder", "behavioral health"):
+        page = f"If you need {context} services Outpatient services $30 copay"
+        assert _page_has_anchor(page.lower()) == (False, False, True), context
+    assert _page_has_anchor("outpatient services $30 copay") == (False, False, False)
+
+
+def test_anchor_pages_keep_a_behavioral_health_page():
+    pages = ["cover", QUESTIONS, "Behavioral health services: Outpatient services 20% coinsurance", "glossary"]
+    assert _anchor_pages(pages) == [1, 2]
+    # Without an outpatient page the whole document is scanned.
+    assert _anchor_pages(pages[:2]) is None
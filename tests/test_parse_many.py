@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from aca_sbc.parse import ParsedBenefits, parse_many, parse_pdf
+
+
+@pytest.fixture(scope="module")
+def expected(corpus) -> dict[str, ParsedBenefits]:
+    return {str(doc.path): parse_pdf(str(doc.path)) for doc in corpus}
+
+
+@pytest.fixture
+def paths(corpus, tmp_path) -> list[str]:
+    # Every corpus PDF plus one that does not exist, in the middle.
+    paths = [str(doc.path) for doc in corpus]
+    paths.insert(3, str(tmp_path / "missing.pdf"))
+    return paths
+
+
+def _check(outcomes, paths, expected) -> None:
+    for path, outcome in outcomes:
+        if path in expected:
+            assert outcome == expected[path]
+        else:
+            assert isinstance(outcome, FileNotFoundError)
+    assert sorted(path for path, _ in outcomes) == sorted(paths)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_ordered_outcomes_follow_the_input(paths, expected, workers):
+    outcomes = list(parse_many(paths, workers=workers, chunksize=2))
+    assert [path for path, _ in outcomes] == paths
+    _check(outcomes, paths, expected)
+
+
+def test_unordered_outcomes_cover_every_input(paths, expected):
+    outcomes = list(parse_many(paths, workers=2, chunksize=1, ordered=False))
+    _check(outcomes, paths, expected)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_empty_input(workers):
+    assert list(parse_many([], workers=workers)) == []
+
+
+def test_closing_early_stops_reading_the_input(corpus):
+    taken = []
+
+    def endless():
+        for doc in itertools.cycle(corpus):
+            taken.append(doc.path)
+            yield doc.path
+
+    results = parse_many(endless(), workers=2, chunksize=2)
+    first = [next(results) for _ in range(3)]
+    start = time.monotonic()
+    results.close()
+    assert time.monotonic() - start < 30
+    assert [path for path, _ in first] == [str(path) for path in taken[:3]]
+    # At most 2 * workers chunks in flight, plus the chunk being submitted.
+    assert len(taken) <= (2 * 2 + 1) * 2
+
+
+def test_shared_executor_outlives_the_iteration(paths, expected):
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        for _ in range(2):
+            outcomes = list(parse_many(paths, chunksize=3, executor=pool))
+            assert [path for path, _ in outcomes] == paths
+            _check(outcomes, paths, expected)
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError):
+        next(parse_many(["a.pdf"], engine="ocr"))
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+import sys
+
+import pandas as pd
+import pytest
+
+import report_parse_quality
+from aca_sbc.output import OUTPUT_COLUMNS, ColumnBuffer, CsvSink, ParquetSink
+from report_parse_quality import diff_runs
+
+# (plan, before fields, after fields); row 6 is a different plan after the rerun and
+# row 7 exists only after it.
+ROWS = [
+    ("Plan 0", {"INN DED": "$500"}, {"INN DED": "$500"}),
+    ("Plan 1", {}, {"INN DED": "$1,000"}),
+    ("Plan 2", {"INN OOP": "$3,000"}, {}),
+    ("Plan 3", {"INN COI": "20% coinsurance"}, {"INN COI": "30% coinsurance"}),
+    ("Plan 4", {"INN DED": "$500"}, {"error": "timeout"}),
+    ("Plan 5", {"error": "timeout"}, {"INN DED": "$250"}),
+    ("Plan 6", {"INN DED": "$500"}, {"INN DED": "$500"}),
+]
+
+
+def _row(plan: str, fields: dict) -> tuple:
+    values = {"STATE": "TX", "PAYER NAME/PLAN": plan, **fields}
+    return tuple(values.get(column) for column in OUTPUT_COLUMNS)
+
+
+def _write(sink_cls, path, rows) -> None:
+    buffer = ColumnBuffer()
+    for row in rows:
+        buffer.append(row)
+    sink = sink_cls(path)
+    sink.write(buffer)
+    sink.close()
+
+
+@pytest.fixture
+def runs(tmp_path):
+    before = [_row(plan, fields) for plan, fields, _ in ROWS]
+    after = [_row(plan, fields) for plan, _, fields in ROWS]
+    after[6] = _row("Plan X", {})
+    after.append(_row("Plan 7", {"INN DED": "$100"}))
+    _write(CsvSink, tmp_path / "before.csv", before)
+    _write(CsvSink, tmp_path / "after.csv", after)
+    return tmp_path / "before.csv", tmp_path / "after.csv", after
+
+
+def _check(report) -> None:
+    assert report["rows_before"] == 7 and report["rows_after"] == 8
+    assert report["compared"] == 6 and report["key_mismatch"] == 1
+    assert report["key_mismatch_rows"] == [6]
+    assert report["identical"] == 1 and report["only_after"] == 1 and report["only_before"] == 0
+    assert report["missing_columns"] == []
+    fields = report["fields"]
+    assert fields["INN DED"] == {"changed": 3, "fixed": 2, "regressed": 1}
+    assert fields["INN OOP"] == {"changed": 1, "fixed": 0, "regressed": 1}
+    assert fields["INN COI"] == {"changed": 1, "fixed": 0, "regressed": 0}
+    # A new error regresses the row; a cleared one fixes it.
+    assert fields["error"] == {"changed": 2, "fixed": 1, "regressed": 1}
+    for field in ("INN COP", "OON DED", "OON OOP", "OON COI", "OON COP"):
+        assert fields[field] == {"changed": 0, "fixed": 0, "regressed": 0}
+
+
+@pytest.mark.parametrize("chunk_rows", [2, 3, 100])
+def test_diff_counts_do_not_depend_on_the_chunk_size(runs, chunk_rows):
+    before, after, _ = runs
+    report, regressed = diff_runs(before, after, chunk_rows=chunk_rows)
+    _check(report)
+    assert regressed[["row", "field", "before", "after"]].values.tolist() == [
+        [2, "INN OOP", "$3,000", ""],
+        [4, "INN DED", "$500", ""],
+        [4, "error", "", "timeout"],
+    ]
+    assert report["regressed_sample"] == regressed.to_dict(orient="records")
+
+
+def test_regressed_sample_keeps_the_earliest_rows(runs):
+    before, after, _ = runs
+    report, regressed = diff_runs(before, after, chunk_rows=2, sample=2)
+    _check(report)
+    assert regressed[["row", "field"]].values.tolist() == [[2, "INN OOP"], [4, "INN DED"]]
+
+
+def test_diff_reads_parquet_like_csv(runs, tmp_path):
+    pytest.importorskip("pyarrow")
+    before, after, rows = runs
+    _write(ParquetSink, tmp_path / "after.parquet", rows)
+    report, regressed = diff_runs(before, tmp_path / "after.parquet", chunk_rows=3)
+    _check(report)
+    assert regressed.equals(diff_runs(before, after, chunk_rows=3)[1])
+
+
+def test_diff_needs_the_row_key(runs, tmp_path):
+    before, _, _ = runs
+    pd.DataFrame({"INN DED": ["$500"]}).to_csv(tmp_path / "keyless.csv", index=False)
+    with pytest.raises(ValueError):
+        diff_runs(before, tmp_path / "keyless.csv")
+
+
+def _run(monkeypatch, *argv: str) -> int:
+    monkeypatch.setattr(sys, "argv", ["report_parse_quality.py", *argv])
+    return report_parse_quality.main()
+
+
+def test_diff_cli_writes_regressed_rows_and_fails_on_regression(monkeypatch, runs, tmp_path):
+    before, after, _ = runs
+    regressed_out = tmp_path / "review" / "regressed.csv"
+    json_out = tmp_path / "diff.json"
+    argv = ["--input", str(after), "--diff", str(before), "--chunk-rows", "2"]
+    assert _run(monkeypatch, *argv, "--regressed-out", str(regressed_out), "--json-out", str(json_out)) == 0
+
+    written = pd.read_csv(regressed_out, dtype=str, keep_default_na=False)
+    assert list(written.columns) == report_parse_quality.REGRESSED_COLUMNS
+    assert written.values.tolist() == [
+        ["2", "TX", "Plan 2", "INN OOP", "$3,000", ""],
+        ["4", "TX", "Plan 4", "INN DED", "$500", ""],
+        ["4", "TX", "Plan 4", "error", "", "timeout"],
+    ]
+    report = json.loads(json_out.read_text(encoding="utf-8"))
+    _check(report)
+    assert report["regressed_out"] == str(regressed_out)
+
+    assert _run(monkeypatch, *argv, "--fail-on-regression") == 1
+    # No regressions against itself.
+    assert _run(monkeypatch, "--input", str(after), "--diff", str(after), "--fail-on-regression") == 0
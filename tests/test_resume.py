@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import csv
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from aca_sbc import cli
+from aca_sbc.incremental import ledger_path, read_ledger
+from aca_sbc.manifest import load_manifest, manifest_path
+from aca_sbc.output import LEGACY_COLUMNS
+
+ROWS = 12  # two rows per corpus PDF (see the tracker fixture)
+
+
+def _run(monkeypatch, *argv: str) -> int:
+    monkeypatch.setattr(sys, "argv", ["aca_sbc.cli", *argv])
+    return cli.main()
+
+
+def _read(path: Path) -> list[list[str]]:
+    with open(path, newline="", encoding="utf-8") as fh:
+        return list(csv.reader(fh))
+
+
+@pytest.fixture
+def reference(monkeypatch, tmp_path, tracker) -> Path:
+    out = tmp_path / "reference.csv"
+    assert _run(monkeypatch, "--csv", str(tracker), "--out", str(out)) == 0
+    return out
+
+
+def test_refuses_to_replace_an_existing_output(monkeypatch, tracker, reference):
+    before = reference.read_bytes()
+    with pytest.raises(SystemExit) as exc:
+        _run(monkeypatch, "--csv", str(tracker), "--out", str(reference))
+    assert exc.value.code == 2
+    assert reference.read_bytes() == before
+    assert _run(monkeypatch, "--csv", str(tracker), "--out", str(reference), "--overwrite") == 0
+    assert reference.read_bytes() == before
+
+
+def test_resumes_an_output_written_before_the_error_column(monkeypatch, tmp_path, tracker, reference):
+    expected = [row[:-1] for row in _read(reference)[1:]]
+    out = tmp_path / "legacy.csv"
+    with open(out, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(LEGACY_COLUMNS)
+        writer.writerows(expected[:5])
+
+    assert _run(monkeypatch, "--csv", str(tracker), "--out", str(out), "--resume") == 0
+    rows = _read(out)
+    assert rows[0] == LEGACY_COLUMNS
+    assert rows[1:] == expected
+    ledger = read_ledger(ledger_path(out))
+    assert [idx for idx, _, _ in ledger] == list(range(ROWS))
+    assert [url for _, url, _ in ledger] == [url for _, url, _ in read_ledger(ledger_path(reference))]
+
+
+def test_resume_reports_an_unknown_header_as_a_usage_error(monkeypatch, tmp_path, tracker):
+    out = tmp_path / "other.csv"
+    out.write_text("a,b,c\n1,2,3\n", encoding="utf-8")
+    with pytest.raises(SystemExit) as exc:
+        _run(monkeypatch, "--csv", str(tracker), "--out", str(out), "--resume")
+    assert exc.value.code == 2
+    assert out.read_text(encoding="utf-8") == "a,b,c\n1,2,3\n"
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_resume_after_interruption_matches_an_uninterrupted_run(monkeypatch, tmp_path, tracker, reference):
+    out = tmp_path / "interrupted.csv"
+    progress = cli.tqdm
+
+    def interrupt_after_first_checkpoint(results, **kwargs):
+        for n, item in enumerate(progress(results, **kwargs)):
+            if n == 3:
+                # Let the workers finish rows queued behind the checkpoint.
+                time.sleep(1.0)
+            if n == 4:
+                raise Interrupted
+            yield item
+
+    monkeypatch.setattr(cli, "tqdm", interrupt_after_first_checkpoint)
+    with pytest.raises(Interrupted):
+        _run(monkeypatch, "--csv", str(tracker), "--out", str(out), "--workers", "2", "--checkpoint-every", "4")
+    monkeypatch.setattr(cli, "tqdm", progress)
+
+    manifest = load_manifest(manifest_path(out))
+    assert manifest.committed_rows == 4
+    assert manifest.completed
+    assert all(key for key, _ in manifest.completed.values())
+    # A row torn by the interruption is dropped on resume.
+    with open(out, "a", encoding="utf-8") as fh:
+        fh.write("TX,,Issuer 4 - Plan")
+
+    assert _run(monkeypatch, "--csv", str(tracker), "--out", str(out), "--workers", "2", "--checkpoint-every", "4", "--resume") == 0
+    assert out.read_bytes() == reference.read_bytes()
+    assert ledger_path(out).read_bytes() == ledger_path(reference).read_bytes()
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from aca_sbc.serve import ParseService, _Server
+
+CALLERS = 3
+
+
+@pytest.fixture
+def service():
+    service = ParseService(workers=1)
+    try:
+        yield service
+    finally:
+        service.close()
+
+
+def _wait_for(check, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _counters(service: ParseService) -> dict[str, int]:
+    return service.metrics.to_dict()["counters"]
+
+
+def test_concurrent_requests_for_one_url_share_a_download(service, stand_in, corpus):
+    stand_in.bodies["/a.pdf"] = corpus[0].path.read_bytes()
+    stand_in.delay = 0.5
+    url = stand_in.url("/a.pdf")
+    with ThreadPoolExecutor(CALLERS) as pool:
+        results = list(pool.map(lambda _: service.parse_url(url), range(CALLERS)))
+
+    assert stand_in.hits["/a.pdf"] == 1
+    assert sorted(result["coalesced"] for result in results) == [False] + [True] * (CALLERS - 1)
+    assert _counters(service)["coalesced_urls"] == CALLERS - 1
+    assert all(result["error"] is None for result in results)
+    assert len({json.dumps(result["fields"]) for result in results}) == 1
+
+
+def test_uploads_of_one_document_share_a_parse(service, corpus):
+    data = corpus[1].path.read_bytes()
+    # Hold the first upload's parse until the others have joined it.
+    gate = threading.Event()
+    submit = service.pool.submit
+
+    def held_submit(*args):
+        gate.wait()
+        return submit(*args)
+
+    service.pool.submit = held_submit
+    with ThreadPoolExecutor(CALLERS) as pool:
+        jobs = [pool.submit(service.parse_upload, data) for _ in range(CALLERS)]
+        try:
+            # The owner is blocked in scheduling; the service lock must not be.
+            assert service._lock.acquire(timeout=1)
+            service._lock.release()
+            _wait_for(lambda: _counters(service).get("coalesced_parses") == CALLERS - 1)
+            assert service.metrics_dict()["in_flight"]["documents"] == 1
+        finally:
+            gate.set()
+        results = [job.result() for job in jobs]
+
+    assert sorted(result["source"] for result in results) == ["parsed"] + ["shared"] * (CALLERS - 1)
+    assert len({json.dumps(result["fields"]) for result in results}) == 1
+    assert service.metrics_dict()["in_flight"] == {"urls": 0, "documents": 0}
+
+
+def test_post_to_an_unknown_path_keeps_the_connection_usable(service):
+    server = _Server(("127.0.0.1", 0), service, max_upload=1024)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        conn = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+        conn.request("POST", "/nope", body=b'{"urls": []}')
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 404
+        conn.request("POST", "/batch", body=b'{"urls": []}')
+        response = conn.getresponse()
+        assert (response.status, json.loads(response.read())) == (200, {"results": []})
+
+        conn.putrequest("POST", "/batch")
+        conn.endheaders()
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 411
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_upload_failure_is_answered_with_a_500(service, corpus):
+    def broken_submit(*_args):
+        raise RuntimeError("pool is gone")
+
+    service.pool.submit = broken_submit
+    server = _Server(("127.0.0.1", 0), service, max_upload=10 * 1024**2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        conn = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+        conn.request("POST", "/upload", body=corpus[0].path.read_bytes())
+        response = conn.getresponse()
+        assert (response.status, json.loads(response.read())) == (500, {"error": "RuntimeError: pool is gone"})
+        conn.request("GET", "/metrics")
+        response = conn.getresponse()
+        payload = json.loads(response.read())
+        assert payload["requests"]["upload"]["errors"] == 1
+        assert payload["in_flight"] == {"urls": 0, "documents": 0}
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
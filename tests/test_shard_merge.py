@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from aca_sbc import merge
+from aca_sbc.incremental import ledger_path, read_ledger
+from aca_sbc.manifest import load_manifest, manifest_path
+from aca_sbc.merge import merge_shards
+from aca_sbc.shard import Shard, shard_path
+
+ROOT = Path(__file__).resolve().parents[1]
+SHARDS = 3
+
+
+def _cli(tracker: Path, out: Path, *extra: str) -> subprocess.Popen:
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src")}
+    return subprocess.Popen(
+        [sys.executable, "-m", "aca_sbc.cli", "--csv", str(tracker), "--out", str(out), *extra],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+
+
+def _wait(procs: list[subprocess.Popen]) -> None:
+    for proc in procs:
+        _, err = proc.communicate(timeout=300)
+        assert proc.returncode == 0, err.decode()
+
+
+def _run_shards(tracker: Path, out: Path) -> None:
+    # All shards side by side, as on separate machines.
+    _wait([_cli(tracker, out, "--shard", f"{index}/{SHARDS}") for index in range(1, SHARDS + 1)])
+
+
+def test_merged_shards_match_an_unsharded_run_in_input_order(tmp_path, tracker):
+    reference = tmp_path / "reference.csv"
+    out = tmp_path / "merged.csv"
+    _wait([_cli(tracker, reference)])
+    _run_shards(tracker, out)
+
+    sizes = [len(read_ledger(ledger_path(shard_path(out, Shard(index, SHARDS))))) for index in range(1, SHARDS + 1)]
+    assert sum(sizes) == 12
+    report = merge_shards(tracker, out, SHARDS)
+    assert (report["written_rows"], report["missing"], report["duplicates"], report["misplaced"]) == (12, 0, 0, 0)
+    assert out.read_bytes() == reference.read_bytes()
+    assert ledger_path(out).read_bytes() == ledger_path(reference).read_bytes()
+    assert load_manifest(manifest_path(out)).committed_rows == 12
+
+
+def test_merge_reports_rows_of_a_missing_shard(tmp_path, tracker):
+    out = tmp_path / "merged.csv"
+    _run_shards(tracker, out)
+    # The corpus lives under a temp path, so which shard gets which rows varies; drop
+    # the largest one.
+    rows = {
+        index: sorted(idx for idx, _, _ in read_ledger(ledger_path(shard_path(out, Shard(index, SHARDS)))))
+        for index in range(1, SHARDS + 1)
+    }
+    index = max(rows, key=lambda index: len(rows[index]))
+    lost_rows = rows[index]
+    shard_path(out, Shard(index, SHARDS)).unlink()
+
+    report = merge_shards(tracker, out, SHARDS)
+    assert [info["status"] == "missing" for info in report["shards"]] == [i == index for i in range(1, SHARDS + 1)]
+    assert report["missing_rows"] == lost_rows
+    assert report["written_rows"] == 12 - len(lost_rows)
+    assert report["duplicates"] == report["misplaced"] == 0
+    # Rows after the first gap are not contiguous input rows; nothing to resume from.
+    assert not manifest_path(out).exists()
+
+
+def test_merge_refuses_to_replace_an_existing_output(monkeypatch, tmp_path, tracker):
+    out = tmp_path / "merged.csv"
+    _run_shards(tracker, out)
+    argv = ["aca_sbc.merge", "--csv", str(tracker), "--out", str(out), "--shards", str(SHARDS)]
+    monkeypatch.setattr(sys, "argv", argv)
+    assert merge.main() == 0
+    before = out.read_bytes()
+
+    with pytest.raises(SystemExit) as exc:
+        merge.main()
+    assert exc.value.code == 2
+    assert out.read_bytes() == before
+    monkeypatch.setattr(sys, "argv", [*argv, "--overwrite"])
+    assert merge.main() == 0
+    assert out.read_bytes() == before
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import sqlite3
+import sys
+
+from aca_sbc import cli, parse, pipeline
+from aca_sbc.store import ResultStore
+
+
+def _run(monkeypatch, *argv: str) -> int:
+    monkeypatch.setattr(sys, "argv", ["aca_sbc.cli", *argv])
+    return cli.main()
+
+
+def test_rules_change_replays_stored_pymupdf_tables_in_auto_mode(monkeypatch, tmp_path, tracker, corpus):
+    results_db = tmp_path / "results.sqlite"
+    argv = ["--csv", str(tracker), "--engine", "auto", "--results-db", str(results_db), "--overwrite"]
+    first = tmp_path / "first.csv"
+    assert _run(monkeypatch, *argv, "--out", str(first)) == 0
+    store = ResultStore(results_db, engine="auto")
+    try:
+        # pdfplumber only runs where PyMuPDF leaves a field blank.
+        assert len(store.extraction_shas("pymupdf")) == len(corpus)
+        assert len(store.extraction_shas("pdfplumber")) < len(corpus)
+    finally:
+        store.close()
+    # A rules change: stored results no longer match.
+    with sqlite3.connect(results_db) as db:
+        db.execute("DELETE FROM results")
+
+    replayed: list[str] = []
+    parse_fresh = pipeline.parse_fresh
+
+    def inline_only(source, *args):
+        # Runs in this process only for replays; worker parses happen elsewhere.
+        replayed.append(source)
+        return parse_fresh(source, *args)
+
+    def no_extraction(*_args):
+        raise AssertionError("replay re-extracted a stored engine")
+
+    monkeypatch.setattr(pipeline, "parse_fresh", inline_only)
+    monkeypatch.setattr(parse, "extract_document", no_extraction)
+    second = tmp_path / "second.csv"
+    assert _run(monkeypatch, *argv, "--out", str(second)) == 0
+    assert sorted(replayed) == sorted(str(doc.path) for doc in corpus)
+    assert second.read_bytes() == first.read_bytes()
+
+
+def test_store_round_trips_results_and_extractions(tmp_path, corpus):
+    source = str(corpus[0].path)
+    parsed, extractions = parse.parse_with_engine(source, "pdfplumber")
+    store = ResultStore(tmp_path / "results.sqlite")
+    try:
+        store.put("abc", parsed, extractions)
+        store.commit()
+        assert store.get_result("abc") == parsed
+        assert store.get_extractions("abc")["pdfplumber"].tables == extractions["pdfplumber"].tables
+        assert store.extraction_shas("pdfplumber") == ["abc"]
+    finally:
+        store.close()
+    # The rules over the stored tables give the same fields.
+    store = ResultStore(tmp_path / "results.sqlite")
+    try:
+        stored = store.get_extractions("abc")
+    finally:
+        store.close()
+    assert parse.parse_with_engine(source, "pdfplumber", stored)[0] == parsed
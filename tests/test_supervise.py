@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from aca_sbc import cli, pipeline
+from aca_sbc.quarantine import quarantine_path
+from aca_sbc.supervise import LimitExceeded, Limits, SupervisedPool, rss_bytes
+
+MB = 1024**2
+
+pytestmark = pytest.mark.skipif(rss_bytes(os.getpid()) is None, reason="no RSS source (needs /proc or psutil)")
+
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def _hold(size: int, seconds: float) -> int:
+    block = bytearray(size)
+    block[:: 4096] = b"x" * len(block[:: 4096])
+    time.sleep(seconds)
+    return len(block)
+
+
+_kept: list[bytearray] = []
+
+
+def _keep(size: int) -> int:
+    # Allocates and returns at once, leaving the memory behind in the worker.
+    block = bytearray(size)
+    block[:: 4096] = b"x" * len(block[:: 4096])
+    _kept.append(block)
+    return os.getpid()
+
+
+def _crash() -> None:
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def _fail() -> None:
+    raise KeyError("bad table")
+
+
+@pytest.fixture
+def pool_factory():
+    pools = []
+
+    def make(limits: Limits) -> SupervisedPool:
+        pool = SupervisedPool(1, limits)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+
+def _failure(job) -> BaseException:
+    exc = job.exception(timeout=30)
+    assert exc is not None
+    return exc
+
+
+def test_timeout_kills_the_worker_and_the_next_task_gets_a_new_one(pool_factory):
+    pool = pool_factory(Limits(timeout=0.5))
+    start = time.monotonic()
+    exc = _failure(pool.submit(_sleep, 30))
+    assert isinstance(exc, LimitExceeded) and str(exc) == "timeout"
+    assert time.monotonic() - start < 5
+    assert pool.submit(_sleep, 0).result(timeout=30) == 0
+
+
+def test_rss_cap_kills_the_worker(pool_factory):
+    pool = pool_factory(Limits(max_rss_bytes=200 * MB))
+    exc = _failure(pool.submit(_hold, 400 * MB, 30))
+    assert isinstance(exc, LimitExceeded) and exc.reason == "oom"
+    assert exc.rss_bytes > 200 * MB
+    assert pool.submit(_hold, MB, 0).result(timeout=30) == MB
+
+
+def test_worker_left_over_the_cap_is_recycled_before_the_next_task(pool_factory):
+    # The task finishes inside one POLL_SECONDS interval: its result is kept, and the
+    # memory it left behind is not charged to the next task.
+    pool = pool_factory(Limits(max_rss_bytes=200 * MB))
+    pid = pool.submit(_keep, 400 * MB).result(timeout=30)
+    assert pool.submit(_sleep, 0.6).result(timeout=30) == 0.6
+    assert pool.submit(os.getpid).result(timeout=30) != pid
+
+
+def test_crashed_worker_is_reported_and_replaced(pool_factory):
+    pool = pool_factory(Limits(timeout=30))
+    exc = _failure(pool.submit(_crash))
+    assert isinstance(exc, LimitExceeded) and exc.reason == "crashed"
+    assert pool.submit(_sleep, 0).result(timeout=30) == 0
+
+
+def test_task_exceptions_pass_through_without_recycling(pool_factory):
+    pool = pool_factory(Limits(timeout=30))
+    exc = _failure(pool.submit(_fail))
+    assert isinstance(exc, KeyError)
+    assert pool.submit(os.getpid).result(timeout=30) == pool.submit(os.getpid).result(timeout=30)
+
+
+# One corpus PDF whose parse stalls; set per test and inherited by forked workers.
+SLOW_SOURCE = ""
+SLOW_SECONDS = 3.0
+parse_fresh = pipeline.parse_fresh
+
+
+def _stalling_parse(source, *args):
+    if source == SLOW_SOURCE:
+        time.sleep(SLOW_SECONDS)
+    return parse_fresh(source, *args)
+
+
+def _run(monkeypatch, *argv: str) -> int:
+    monkeypatch.setattr(sys, "argv", ["aca_sbc.cli", *argv])
+    return cli.main()
+
+
+def _errors(path: Path) -> list[str]:
+    with open(path, newline="", encoding="utf-8") as fh:
+        return [row["error"] for row in csv.DictReader(fh)]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="workers must inherit the patched parse (fork)")
+def test_quarantined_documents_are_skipped_then_cleared_by_the_slow_lane(monkeypatch, tmp_path, tracker, corpus):
+    slow = str(corpus[0].path)
+    monkeypatch.setattr(sys.modules[__name__], "SLOW_SOURCE", slow)
+    monkeypatch.setattr(pipeline, "parse_fresh", _stalling_parse)
+    out = tmp_path / "out.csv"
+    base = ["--csv", str(tracker), "--out", str(out), "--overwrite", "--doc-timeout", "1"]
+    slow_rows = [idx for idx in range(12) if idx % len(corpus) == 0]
+
+    assert _run(monkeypatch, *base) == 0
+    errors = _errors(out)
+    assert [errors[idx] for idx in slow_rows] == ["timeout"] * len(slow_rows)
+    assert sum(bool(error) for error in errors) == len(slow_rows)
+    entries = json.loads(quarantine_path(out).read_text(encoding="utf-8"))
+    assert [(entry["reason"], entry["strikes"]) for entry in entries.values()] == [("timeout", 1)]
+
+    start = time.monotonic()
+    assert _run(monkeypatch, *base, "--quarantined", "skip") == 0
+    assert time.monotonic() - start < SLOW_SECONDS
+    errors = _errors(out)
+    assert [errors[idx] for idx in slow_rows] == ["quarantined:timeout"] * len(slow_rows)
+
+    assert _run(monkeypatch, *base, "--quarantined", "slow", "--slow-timeout", "30") == 0
+    assert not any(_errors(out))
+    assert json.loads(quarantine_path(out).read_text(encoding="utf-8")) == {}